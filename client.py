@@ -0,0 +1,7 @@
+import sys
+
+from data_agent.agent.daemon import main
+
+if __name__ == "__main__":
+    # Thin client of the resident daemon (make daemon): submits a run and streams its trace
+    main(["run", *sys.argv[1:]])
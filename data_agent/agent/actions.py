@@ -1,13 +1,31 @@
 import datetime
 import os
 import pathlib
-from typing import Any, Callable, Dict, List, Union
+from typing import Any, Callable, Dict, List, Literal, MutableMapping, Optional, Union
 
 import numpy as np
 import pandas as pd
-from langchain_core.utils.function_calling import convert_to_openai_function
 from pydantic import BaseModel, Field
 
+from ..utils.io_utils import read_frame
+from .dataset import is_dataset_path, read_dataset
+from .drift import DriftThresholds, drift_report
+from .filters import (
+    FilterCondition,
+    apply_filters,
+    parse_filters,
+    read_csv_chunked,
+    read_parquet_pushdown,
+)
+from .history import HISTORY_DIR, HistoryStore
+from .key_index import KEY_INDEXES, check_duplicate_keys, check_merge_size, merge_on_key
+from .merge_plan import MergePlan
+from .parallel_describe import describe_frame
+from .prefetch import get_prefetcher
+from .query import MAX_QUERY_ROWS, QueryPipeline
+from .registry import FRAME_STORE, RegistryProxy
+from .schema_cache import get_tool_parameters
+
 
 class TerminateParams(BaseModel):
     """Terminates the conversation and provides the final analysis to the user."""
@@ -29,7 +47,19 @@ class Action:
         self.description = description
         self.terminal = terminal
         self.pydantic_base_model = pydantic_base_model
-        self.parameters = convert_to_openai_function(pydantic_base_model)["parameters"]
+        self._parameters = None
+
+    @property
+    def parameters(self) -> dict:
+        """JSON schema of the arguments, generated (or read from the schema cache) on first use."""
+        if self._parameters is None:
+            self._parameters = get_tool_parameters(self.pydantic_base_model)
+        return self._parameters
+
+    def validate_args(self, args: dict) -> dict:
+        """Validate arguments against the pydantic model; raises pydantic.ValidationError."""
+        validated = self.pydantic_base_model.model_validate(args or {})
+        return validated.model_dump(exclude_unset=True)
 
     def execute(self, **args) -> Any:
         """Execute the action's function"""
@@ -64,9 +94,13 @@ DATA_DIR = "data/"
 
 # NEW: flexible pandas tools
 # Tools that give the assistant the power to call a wide range of pandas functions, and
-# save the result in a dictionary.
-DATAFRAMES: Dict[str, pd.DataFrame] = {}
+# save the result in a dictionary. Merged aliases are stored as lazy MergePlans.
+# Each session (Environment with its own registry) sees its own aliases.
+DATAFRAMES: MutableMapping[str, Union[pd.DataFrame, MergePlan]] = RegistryProxy()
 ALLOWED_METHODS = {"head", "describe", "mean", "sum", "info", "columns", "min", "max"}
+COLUMN_METHODS = ["mean", "sum", "median", "std", "min", "max"]
+DATETIME_METHODS = ["mean", "median", "min", "max"]
+BATCH_STATISTICS = COLUMN_METHODS + ["null_rate", "distinct_count"]
 
 
 def _json_safe(obj):
@@ -99,22 +133,85 @@ def _json_safe(obj):
     return obj
 
 
-def load_dataframe(path: str, alias: str):
-    """Load a dataframe from a path and register it with an alias."""
+def _lookup(alias: str) -> Union[pd.DataFrame, MergePlan]:
+    """Return the registered dataframe or merge plan for an alias."""
+    if alias not in DATAFRAMES:
+        raise ValueError(f"No dataframe registered with alias '{alias}'")
+    return DATAFRAMES[alias]
+
+
+def _get_dataframe(alias: str, columns: List[str] = None) -> pd.DataFrame:
+    """Return the dataframe for an alias, materializing only ``columns`` for merge plans."""
+    frame = _lookup(alias)
+    if isinstance(frame, MergePlan):
+        return frame.materialize(columns)
+    return frame if columns is None else frame[columns]
+
+
+def _read_file(full_path: str) -> pd.DataFrame:
+    """Read a data file. Sessions share one (copy-on-write) copy of every file they load."""
+    return FRAME_STORE.get(full_path, _load_file)
+
+
+def _load_file(full_path: str) -> pd.DataFrame:
+    """Read a data file, served from the prefetcher when it already loaded the file."""
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        df = prefetcher.get(full_path)
+        if df is not None:
+            return df
+    return read_frame(full_path)
+
+
+def _read_file_pushdown(full_path: str, columns: List[str], filters) -> tuple:
+    """Read only the requested rows and columns of a file. Returns the frame and a scan note."""
+    prefetcher = get_prefetcher()
+    df = prefetcher.get(full_path) if prefetcher is not None else None
+    if df is not None:
+        return apply_filters(df, columns, filters), "filtered in memory"
+    if full_path.endswith(".parquet"):
+        df, stats = read_parquet_pushdown(full_path, columns, filters)
+        return df, f"{stats['row_groups_read']} of {stats['row_groups']} row group(s) read"
+    df, stats = read_csv_chunked(full_path, columns, filters)
+    return df, f"{stats['rows_scanned']} row(s) scanned"
+
+
+def load_dataframe(
+    path: str,
+    alias: str,
+    partition_filter: Optional[str] = None,
+    columns: List[str] = None,
+    filters: List[Dict[str, Any]] = None,
+):
+    """Load a dataframe from a path and register it with an alias.
+
+    The path may also be a glob or a (hive-partitioned) dataset directory, whose files are read
+    in parallel after pruning partitions with ``partition_filter``. ``columns`` and ``filters``
+    (column/op/value conditions) are pushed down to the readers, so that only the matching rows
+    and requested columns are loaded.
+    """
+    filters = parse_filters(filters)
     if not os.path.isabs(path):
         full_path = os.path.join(DATA_DIR, path)
     else:  # make it accept a full path too for pytest.fixture
         full_path = path
+    if is_dataset_path(full_path):
+        df, report = read_dataset(full_path, partition_filter, columns=columns, filters=filters)
+        DATAFRAMES[alias] = df
+        return f"Dataframe '{alias}' loaded with shape {df.shape} from {report.summary()}"
+    if partition_filter:
+        raise ValueError("partition_filter only applies to globs and dataset directories")
     if not os.path.exists(full_path):
         raise ValueError(f"File not found at path: {full_path}")
 
-    if path.endswith(".csv"):
-        df = pd.read_csv(full_path)
-    elif path.endswith(".parquet"):
-        df = pd.read_parquet(full_path)
-    else:
+    if not (path.endswith(".csv") or path.endswith(".parquet")):
         print(f"path: {path}. path endswith csv: {path.endswith('.csv')}")
         raise NotImplementedError("Only .parquet and .csv implemented for reading.")
+    if columns or filters:
+        df, note = _read_file_pushdown(full_path, columns, filters)
+        DATAFRAMES[alias] = df
+        return f"Dataframe '{alias}' loaded with shape {df.shape} ({note})"
+    df = _read_file(full_path)
     DATAFRAMES[alias] = df
     return f"Dataframe '{alias}' loaded with shape {df.shape}"
 
@@ -124,16 +221,18 @@ def call_dataframe_method(alias: str, method: str, *args, **kwargs):
     Call a whitelisted Pandas method on a DataFrame stored in DATAFRAMES.
     Return JSON-safe result.
     """
-    if alias not in DATAFRAMES:
-        raise ValueError(f"No dataframe registered with alias '{alias}'")
-
-    df = DATAFRAMES[alias]
+    frame = _lookup(alias)
 
     # Whitelist
     allowed = {"head", "describe", "info", "shape", "columns", "mean", "sum"}
     if method not in allowed:
         raise ValueError(f"Method {method} not allowed")
 
+    # Merge plans answer structural questions without materializing the merge
+    if isinstance(frame, MergePlan) and method in {"shape", "columns"}:
+        return _json_safe(getattr(frame, method))
+
+    df = _get_dataframe(alias)
     func = getattr(df, method)
 
     # Special case: df.info() prints to stdout → capture as string
@@ -157,38 +256,92 @@ def call_dataframe_method(alias: str, method: str, *args, **kwargs):
 
 def call_column_method(alias: str, column: str, method: str):
     """Call selected functions on a dataframe column."""
-    if alias not in DATAFRAMES:
-        raise ValueError(f"No dataframe registered with alias '{alias}'")
-    df = DATAFRAMES[alias]
-    if column not in df.columns:
+    frame = _lookup(alias)
+    if column not in frame.columns:
         raise ValueError(f"Column {column} not found")
 
-    if method not in {"mean", "sum", "median", "std", "min", "max"}:
+    if method not in COLUMN_METHODS:
         raise ValueError(f"Method {method} not allowed")
 
-    return _json_safe(getattr(df[column], method)())
+    series = _get_dataframe(alias, [column])[column]
+    return _json_safe(getattr(series, method)())
 
 
-def merge_dataframes(left: str, right: str, on: str, how: str = "inner", alias: str = None):
+def _nan_to_none(value):
+    return None if isinstance(value, float) and np.isnan(value) else value
+
+
+def compute_column_statistics(alias: str, columns: List[str] = None, statistics: List[str] = None):
+    """
+    Compute several whitelisted statistics for several columns in one call.
+    Statistics are computed in a single vectorized pass per dtype group (numeric, datetime);
+    statistics that do not apply to a column's dtype are returned as None.
+    Returns a compact matrix: one row per column, one value per statistic.
+    """
+    frame = _lookup(alias)
+    columns = list(dict.fromkeys(columns or frame.columns))
+    missing = [c for c in columns if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Columns {missing} not found")
+    statistics = list(dict.fromkeys(statistics or BATCH_STATISTICS))
+    not_allowed = [s for s in statistics if s not in BATCH_STATISTICS]
+    if not_allowed:
+        raise ValueError(f"Statistics {not_allowed} not allowed")
+
+    df = _get_dataframe(alias, columns)
+    table = pd.DataFrame(index=statistics, columns=columns, dtype=object)
+
+    numeric = [c for c in columns if pd.api.types.is_numeric_dtype(df[c])]
+    datetimes = [c for c in columns if pd.api.types.is_datetime64_any_dtype(df[c])]
+    for group, allowed in ((numeric, COLUMN_METHODS), (datetimes, DATETIME_METHODS)):
+        methods = [s for s in statistics if s in allowed]
+        if group and methods:
+            table.loc[methods, group] = df[group].agg(methods).astype(object)
+
+    if "null_rate" in statistics:
+        table.loc["null_rate"] = df.isna().mean().to_numpy()
+    if "distinct_count" in statistics:
+        table.loc["distinct_count"] = df.nunique().to_numpy()
+
+    data = [[_nan_to_none(_json_safe(v)) for v in table[c]] for c in columns]
+    return {"statistics": statistics, "columns": columns, "data": data}
+
+
+def merge_dataframes(
+    left: str,
+    right: str,
+    on: str,
+    how: str = "inner",
+    alias: str = None,
+    columns: List[str] = None,
+    compact: bool = False,
+    max_output_rows: Optional[int] = None,
+):
     """
     Merge two dataframes by their alias and store result under a new alias.
+    The merge is stored as a lazy plan: columns are only merged once they are accessed.
+    With ``columns``, only these columns (plus the key) are merged. With ``compact``, string
+    keys are merged as integer codes.
     """
-    df_left = DATAFRAMES[left]
-    df_right = DATAFRAMES[right]
-    merged = pd.merge(df_left, df_right, on=on, how=how)
+    plan = MergePlan(
+        _lookup(left), _lookup(right), on=on, how=how, columns=columns, encode_keys=compact
+    )
+    # Count the output rows from the key indexes before merging anything
+    warning = check_merge_size(*plan.merge_key_indexes(), how=how, max_rows=max_output_rows)
     alias = alias or f"{left}_{right}_merged"
-    DATAFRAMES[alias] = merged
-    return f"Merged dataframe stored as '{alias}' with shape {merged.shape}"
+    DATAFRAMES[alias] = plan
+    message = f"Merged dataframe stored as '{alias}' with shape {plan.shape}"
+    return f"{message}\n{warning}" if warning else message
 
 
 def load_df_from_path(path: str):
     full_path = pathlib.Path(DATA_DIR) / path
+    if is_dataset_path(str(full_path)):
+        return read_dataset(str(full_path))[0]
     if not os.path.exists(full_path):
         raise ValueError(f"File not found at path: {full_path}")
-    if path.endswith(".csv"):
-        return pd.read_csv(full_path)
-    elif path.endswith(".parquet"):
-        return pd.read_parquet(full_path)
+    if path.endswith(".csv") or path.endswith(".parquet"):
+        return _read_file(str(full_path))
     else:
         raise NotImplementedError("Extension not implemented for reading.")
 
@@ -198,6 +351,19 @@ class LoadDataFrameParams(BaseModel):
 
     alias: str = Field(..., description="The alias to assign the dataframe to.")
     path: str = Field(..., describe_column="The path to load the dataframe from.")
+    partition_filter: Optional[str] = Field(
+        None,
+        description="For globs and partitioned dataset directories only: a filter on partition "
+        'keys that skips the other files, e.g. "year>=2024 and region in (EU, US)"',
+    )
+    columns: List[str] = Field(
+        default_factory=list, description="Only load these columns (all columns if empty)"
+    )
+    filters: List[FilterCondition] = Field(
+        default_factory=list,
+        description="Only load the rows matching all of these conditions, e.g. "
+        '[{"column": "sector", "op": "==", "value": "Banks"}]',
+    )
 
 
 class CallDataFrameMethodParams(BaseModel):
@@ -219,6 +385,15 @@ class MergeDataFramesParams(BaseModel):
     on: str = Field(..., description="On which column merge the two dataframes")
     how: str = Field(..., description="How to merge the two dataframes (per default: 'inner')")
     alias: str = Field(..., description="The alias to store the result under.")
+    columns: List[str] = Field(
+        default_factory=list, description="Only merge these columns plus the key (all if empty)"
+    )
+    compact: bool = Field(
+        False, description="Merge string keys as integer codes to lower the peak memory"
+    )
+    max_output_rows: Optional[int] = Field(
+        None, description="Refuse the merge above this many output rows (default: 10 million)"
+    )
 
 
 class CallColumnMethodParams(BaseModel):
@@ -229,6 +404,19 @@ class CallColumnMethodParams(BaseModel):
     method: str = Field(..., description="The name of the pandas method to call")
 
 
+class ComputeColumnStatisticsParams(BaseModel):
+    """Compute several statistics for several columns of a dataframe in a single call."""
+
+    alias: str = Field(..., description="Alias of the dataframe to operate on")
+    columns: List[str] = Field(
+        default_factory=list, description="The columns to describe (all columns if empty)"
+    )
+    statistics: List[str] = Field(
+        default_factory=list,
+        description=f"Statistics to compute, any of {BATCH_STATISTICS} (all if empty)",
+    )
+
+
 # Parameter definitions in Pydantic.
 class ListFilesParams(BaseModel):
     """List files in the data directory"""
@@ -251,9 +439,9 @@ def list_column_names_of_dataframe(path: str) -> List[str]:
 
 
 def describe_dataframe(path: str) -> str:
-    """Describe the contents of a pandas DataFrame."""
+    """Describe the contents of a pandas DataFrame. Wide frames are described in parallel."""
     df = load_df_from_path(path)
-    return df.describe(include="all").T[["count", "unique", "freq", "mean", "std"]].to_string()
+    return describe_frame(df).T[["count", "unique", "freq", "mean", "std"]].to_string()
 
 
 def show_datatype_of_column(path: str, column_name: str) -> str:
@@ -285,7 +473,20 @@ def translate_pd_to_human(message) -> None:
 def outer_join_on_key(df_1_path: str, df_2_path: str, join_key="sbti_id"):
     df_1 = load_df_from_path(df_1_path)
     df_2 = load_df_from_path(df_2_path)
-    return df_1.merge(df_2, how="outer", on="sbti_id", suffixes=("_prev", "_curr"), indicator=True)
+    # Key indexes are cached per file, so repeated comparisons skip re-sorting the keys
+    index_1 = KEY_INDEXES.for_file(os.path.join(DATA_DIR, df_1_path), join_key, df_1)
+    index_2 = KEY_INDEXES.for_file(os.path.join(DATA_DIR, df_2_path), join_key, df_2)
+    check_duplicate_keys(index_1, index_2, allow_one_to_many=False)
+    return merge_on_key(
+        df_1,
+        df_2,
+        on=join_key,
+        how="outer",
+        suffixes=("_prev", "_curr"),
+        indicator=True,
+        left_index=index_1,
+        right_index=index_2,
+    )
 
 
 def compare_similarity_column_joined_on_key(
@@ -316,6 +517,94 @@ def compare_similarity_column_joined_on_key(
     return f"Analyzed similarity of column {column_name}: {merge_str}. {identical_str}."
 
 
+def _frame_from_alias_or_path(name: str) -> pd.DataFrame:
+    if name in DATAFRAMES:
+        return _get_dataframe(name)
+    return load_df_from_path(name)
+
+
+def compare_distributions(
+    prev: str, curr: str, columns: List[str] = None, thresholds: Dict[str, float] = None
+) -> dict:
+    """
+    Compare the distribution of every column between two snapshots (aliases or file paths).
+    Numeric columns get mean/quantile shifts, a KS statistic and PSI; other columns get
+    category share changes and new/vanished categories; all columns get the null-rate change.
+    Columns are ranked by severity: the largest ratio of a drift metric to its threshold.
+    """
+    return drift_report(
+        _frame_from_alias_or_path(prev),
+        _frame_from_alias_or_path(curr),
+        columns=columns,
+        thresholds=DriftThresholds(**(thresholds or {})),
+    )
+
+
+def query_dataframe(alias: str, **pipeline) -> dict:
+    """
+    Run a select -> filter -> group by/aggregate -> sort -> head pipeline over an alias in one
+    call. Only the columns the pipeline reads are materialized, no intermediate alias is
+    stored, and at most ``limit`` rows are returned (with the total number of result rows).
+    """
+    query = QueryPipeline.model_validate(pipeline)
+    frame = _lookup(alias)
+    query.validate_columns(list(frame.columns))
+    result = query.run(_get_dataframe(alias, query.input_columns(list(frame.columns))))
+    return _table_result(result, query.limit)
+
+
+def _table_result(result: pd.DataFrame, limit: int) -> dict:
+    head = result.head(limit)
+    return {
+        "columns": [_json_safe(c) for c in head.columns],
+        "data": [[_nan_to_none(_json_safe(v)) for v in row] for row in head.itertuples(False)],
+        "total_rows": len(result),
+        "truncated": len(result) > limit,
+    }
+
+
+def update_history(pattern: str = "sbti_*.parquet") -> dict:
+    """
+    Ingest the dated snapshots in the data directory that are newer than the last ingested one
+    into the history store, and return the summary of every snapshot in the store.
+    """
+    store = HistoryStore(HISTORY_DIR)
+    added = store.ingest_new(DATA_DIR, pattern)
+    return {"ingested": [s["snapshot"] for s in added], **store.summary()}
+
+
+def query_history(
+    query: str,
+    key: Any = None,
+    column: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 20,
+) -> dict:
+    """
+    Answer trend and "when did this change" questions from the history store:
+    "key_history" lists the events (added, removed, changed column) of one key,
+    "change_counts" lists the snapshots in which a column (or any column) changed, and
+    "column_trend" lists the statistics of a column in every snapshot.
+    """
+    store = HistoryStore(HISTORY_DIR)
+    if not store.snapshots:
+        raise ValueError("The history store is empty; call update_history first")
+    if query == "key_history":
+        if key is None:
+            raise ValueError("key_history needs a key")
+        result = store.key_history(key, column, since, until)
+    elif query == "change_counts":
+        result = store.change_counts(column, since, until)
+    elif query == "column_trend":
+        if column is None:
+            raise ValueError("column_trend needs a column")
+        result = store.column_trend(column, since=since, until=until)
+    else:
+        raise ValueError(f"Unknown history query '{query}'")
+    return _table_result(result, limit)
+
+
 class ListColumnNamesOfDataFrameParams(BaseModel):
     """List column names of a pandas DataFrame."""
 
@@ -348,3 +637,45 @@ class CompareSimilarityColumnJoinedOnKeyParams(BaseModel):
     path_df_prev: str = Field(..., description="The path to the previous data.")
     path_df_curr: str = Field(..., description="The path to the current data")
     column_name: str = Field(..., description="The name of the column to compare.")
+
+
+class QueryDataFrameParams(QueryPipeline):
+    """Filter, group, aggregate and sort a dataframe in a single call."""
+
+    alias: str = Field(..., description="Alias of the dataframe to query")
+
+
+class UpdateHistoryParams(BaseModel):
+    """Ingest new dated snapshots into the history store."""
+
+    pattern: str = Field(
+        "sbti_*.parquet", description="File name pattern of the dated snapshots (YYYYMMDD)"
+    )
+
+
+class QueryHistoryParams(BaseModel):
+    """Query the history of all ingested snapshots."""
+
+    query: Literal["key_history", "change_counts", "column_trend"] = Field(
+        ...,
+        description="key_history: events of one key; change_counts: snapshots in which a column "
+        "changed and how many keys changed; column_trend: statistics of a column per snapshot",
+    )
+    key: Optional[Union[int, str]] = Field(None, description="The key (for key_history)")
+    column: Optional[str] = Field(None, description="Only this column")
+    since: Optional[str] = Field(None, description="First snapshot date (YYYYMMDD) to include")
+    until: Optional[str] = Field(None, description="Last snapshot date (YYYYMMDD) to include")
+    limit: int = Field(20, ge=1, le=MAX_QUERY_ROWS, description="Rows to return")
+
+
+class CompareDistributionsParams(BaseModel):
+    """Rank all columns by distribution drift between two snapshots."""
+
+    prev: str = Field(..., description="Alias or path of the previous data.")
+    curr: str = Field(..., description="Alias or path of the current data.")
+    columns: List[str] = Field(
+        default_factory=list, description="The columns to compare (all shared columns if empty)"
+    )
+    thresholds: DriftThresholds = Field(
+        default_factory=DriftThresholds, description="Thresholds above which drift is flagged"
+    )
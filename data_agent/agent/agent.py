@@ -1,19 +1,29 @@
 import json
+import os
 import pickle
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List
+from typing import Any, Callable, Dict, List, Union
 
-from litellm import completion
+from pydantic import ValidationError
 
 from ..utils.logger import CustomLogger
 from .actions import Action, ActionRegistry
+from .checkpoint import Checkpointer
 from .environment import Environment
 from .goals import Goal
+from .invocation import ToolInvocation
+from .llm_client import get_client
+from .loop_guard import LoopGuard, LoopPolicy
 from .memory import Memory
+from .registry import registry_changed, registry_snapshot, use_registry
 
 logger = CustomLogger(console_level="INFO", file_level="DEBUG")
 
+TEXT_MODEL = os.environ.get("DATA_AGENT_TEXT_MODEL", "openai/gpt-4o")
+TOOL_MODEL = os.environ.get("DATA_AGENT_TOOL_MODEL", "openai/gpt-4-turbo-2024-04-09")
+
 
 @dataclass
 class Prompt:
@@ -22,26 +32,27 @@ class Prompt:
     metadata: dict = field(default_factory=dict)  # Fixing mutable default issue
 
 
-def generate_response(prompt: Prompt) -> str:
-    """Call LLM to get response"""
+def generate_response(prompt: Prompt) -> Union[str, ToolInvocation]:
+    """Call LLM to get response: a ToolInvocation for tool calls, the text otherwise.
+    Requests go through the shared LLMClient, which applies the rate limits and retries.
+    A ``model`` in the prompt metadata overrides the default model, and the token usage of
+    the response is stored as ``usage`` in the metadata."""
+    completion = get_client().completion
+
     messages = prompt.messages
     tools = prompt.tools
 
     result = None
 
     if not tools:
-        response = completion(
-            model="openai/gpt-4o", messages=messages, temperature=0.1, max_tokens=1024
-        )
+        model = prompt.metadata.get("model") or TEXT_MODEL
+        response = completion(model=model, messages=messages)
+        prompt.metadata["usage"] = getattr(response, "usage", None)
         result = response.choices[0].message.content
     else:
-        response = completion(
-            model="openai/gpt-4-turbo-2024-04-09",
-            messages=messages,
-            temperature=0.1,
-            tools=tools,
-            max_tokens=1024,
-        )
+        model = prompt.metadata.get("model") or TOOL_MODEL
+        response = completion(model=model, messages=messages, tools=tools)
+        prompt.metadata["usage"] = getattr(response, "usage", None)
 
         # --- Save the raw response object to disk ---
         # Use a timestamp for the filename
@@ -63,13 +74,10 @@ def generate_response(prompt: Prompt) -> str:
             )
         # --- End of saving ---
 
-        if response.choices[0].message.tool_calls:
-            tool = response.choices[0].message.tool_calls[0]
-            result = {
-                "tool": tool.function.name,
-                "args": json.loads(tool.function.arguments),
-            }
-            result = json.dumps(result)
+        message = response.choices[0].message
+        if message.tool_calls:
+            # Only the first tool call is executed per turn
+            result = ToolInvocation.from_tool_call(message.tool_calls[0], message.content)
 
         else:
             result = response.choices[0].message.content
@@ -92,7 +100,7 @@ class AgentLanguage:
     ) -> Prompt:
         raise NotImplementedError("Subclasses must implement this method")
 
-    def parse_response(self, response: str) -> dict:
+    def parse_response(self, response: Union[str, ToolInvocation]) -> ToolInvocation:
         raise NotImplementedError("Subclasses must implement this method")
 
 
@@ -114,9 +122,23 @@ class AgentFunctionCallingActionLanguage(AgentLanguage):
         # Map all environment results to a role:user messages
         # Map all assistant messages to a role:assistant messages
         # Map all user messages to a role:user messages
+        # Tool calls and their results are kept as provider-native tool messages
         items = memory.get_memories()
         mapped_items = []
         for item in items:
+            if item["type"] == "tool_call":
+                mapped_items.append(item["invocation"].to_message())
+                continue
+            if item["type"] == "tool_result":
+                mapped_items.append(
+                    {
+                        "role": "tool",
+                        "tool_call_id": item["tool_call_id"],
+                        "content": item["content"],
+                    }
+                )
+                continue
+
             content = item.get("content", None)
             if not content:
                 content = json.dumps(item, indent=4)
@@ -173,16 +195,17 @@ class AgentFunctionCallingActionLanguage(AgentLanguage):
     ) -> Prompt:
         return prompt
 
-    def parse_response(self, response: str) -> dict:
-        """Parse LLM response into structured format by extracting the ```json block"""
+    def parse_response(self, response: Union[str, ToolInvocation]) -> ToolInvocation:
+        """Parse LLM response into a ToolInvocation. Native tool calls are passed through,
+        text responses are only accepted when they hold a {"tool": ..., "args": ...} JSON."""
+        if isinstance(response, ToolInvocation):
+            return response
         try:
-            return json.loads(response)
+            parsed = json.loads(response)
+            return ToolInvocation(tool=parsed["tool"], args=parsed.get("args") or {})
         except Exception:
             logger.debug(f"DEBUG parse_response === response: {response}.")
-            return {
-                "tool": "escalate_incorrect_response",
-                "args": {"message": response},
-            }
+            return ToolInvocation.escalate(response)
 
 
 class Agent:
@@ -191,17 +214,22 @@ class Agent:
         goals: List[Goal],
         agent_language: AgentLanguage,
         action_registry: ActionRegistry,
-        generate_response: Callable[[Prompt], str],
+        generate_response: Callable[[Prompt], Union[str, ToolInvocation]],
         environment: Environment,
+        loop_policy: LoopPolicy = None,
     ):
         """
-        Initialize an agent with its core GAME components
+        Initialize an agent with its core GAME components. The loop policy decides when
+        repeated calls are answered from earlier results and when a stalled run is stopped.
         """
         self.goals = goals
         self.generate_response = generate_response
         self.agent_language = agent_language
         self.actions = action_registry
         self.environment = environment
+        self.loop_policy = loop_policy or LoopPolicy()
+        self.loop_guard = LoopGuard(self.loop_policy)
+        self._dispatcher = None  # executor for tool calls dispatched while still streaming
 
     def construct_prompt(
         self, goals: List[Goal], memory: Memory, actions: ActionRegistry
@@ -214,91 +242,245 @@ class Agent:
             memory=memory,
         )
 
-    def get_action(self, response):
+    def get_action(self, response: Union[str, ToolInvocation]):
         invocation = self.agent_language.parse_response(response)
-        action = self.actions.get_action(invocation["tool"])
+        action = self.actions.get_action(invocation.tool)
         return action, invocation
 
-    def should_terminate(self, response: str) -> bool:
+    def should_terminate(self, response: Union[str, ToolInvocation]) -> bool:
         action_def, _ = self.get_action(response)
         try:
             return action_def.terminal
         except AttributeError:
             return True
 
+    def validate_invocation(self, action: Action, invocation: ToolInvocation) -> Union[str, None]:
+        """Validate the arguments once against the action's model. Returns an error, if any."""
+        if action is None:
+            return f"Unknown tool '{invocation.tool}'."
+        try:
+            invocation.args = action.validate_args(invocation.args)
+        except ValidationError as e:
+            return f"Invalid arguments for tool '{invocation.tool}': {e}"
+        return None
+
+    def dispatch_early(self, invocation: ToolInvocation, dispatched: Dict[str, Future]):
+        """Start executing a complete tool call while the LLM is still generating.
+
+        Called by streaming response generators. Terminal and invalid calls are left to the
+        main loop, so only valid, non-terminal calls with a call id are dispatched.
+        """
+        action = self.actions.get_action(invocation.tool)
+        if invocation.call_id is None or action is None or action.terminal:
+            return
+        if self.validate_invocation(action, invocation) is not None:
+            return
+        if self._dispatcher is None:
+            self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dispatch")
+        logger.info(f"Dispatching tool {invocation.tool} while the response is streaming")
+        dispatched[invocation.call_id] = self._dispatcher.submit(
+            self.environment.execute_invocation, action, invocation
+        )
+
     def set_current_task(self, memory: Memory, task: str):
         memory.add_memory({"type": "user", "content": task})
 
-    def update_memory(self, memory: Memory, response: str, result: dict):
+    def update_memory(self, memory: Memory, invocation: ToolInvocation, result: Any):
         """
         Update memory with the agent's decision and the environment's response.
         """
-        new_memories = [
-            {"type": "assistant", "content": response},
-            {"type": "user", "content": json.dumps(result)},
-        ]
+        if invocation.call_id is not None:
+            new_memories = [
+                {"type": "tool_call", "invocation": invocation},
+                {
+                    "type": "tool_result",
+                    "tool_call_id": invocation.call_id,
+                    "content": json.dumps(result),
+                },
+            ]
+        else:
+            if invocation.is_escalation:
+                content = str(invocation.args["message"])  # keep the unparsable response as-is
+            else:
+                content = json.dumps(invocation.to_dict())
+            new_memories = [
+                {"type": "assistant", "content": content},
+                {"type": "user", "content": json.dumps(result)},
+            ]
         for m in new_memories:
             memory.add_memory(m)
 
-    def prompt_llm_for_action(self, full_prompt: Prompt) -> str:
+    def prompt_llm_for_action(self, full_prompt: Prompt) -> Union[str, ToolInvocation]:
         response = self.generate_response(full_prompt)
         logger.debug(f"===DEBUG response ==== : {response} === DEBUG response END===")
         return response
 
-    def run(self, user_input: str, memory=None, max_iterations: int = 50) -> Memory:
+    def run(
+        self,
+        user_input: str,
+        memory=None,
+        max_iterations: int = 50,
+        checkpointer: Checkpointer = None,
+    ) -> Memory:
         """
         Execute the GAME loop for this agent with a maximum iteration limit.
+        With a Checkpointer, the session is checkpointed after every iteration.
         """
         memory = memory or Memory()
         self.set_current_task(memory, user_input)
+        with use_registry(getattr(self.environment, "registry", None)):
+            return self._loop(user_input, memory, 0, max_iterations, checkpointer)
 
-        for i in range(max_iterations):
+    def resume(self, checkpointer: Checkpointer, max_iterations: int = 50) -> Memory:
+        """
+        Continue the session of the latest checkpoint: the memory and the dataframes are
+        restored, and the loop resumes after the last completed iteration.
+        """
+        with use_registry(getattr(self.environment, "registry", None)):
+            state = checkpointer.load()
+            memory = state["memory"]
+            if state["finished"]:
+                logger.info("The checkpointed session already finished.")
+                return memory
+            return self._loop(
+                state["task"], memory, state["iteration"], max_iterations, checkpointer
+            )
+
+    def run_metrics(self) -> dict:
+        """Loop metrics of the last run, plus the accounting of response generators that keep
+        one (e.g. the ModelRouter)."""
+        metrics = {"loop": self.loop_guard.metrics()}
+        summary = getattr(self.generate_response, "summary", None)
+        if callable(summary):
+            metrics.update(summary())
+        return metrics
+
+    def log_run_summary(self):
+        logger.info(f"Run summary: {json.dumps(self.run_metrics())}")
+
+    def end_iteration(
+        self,
+        memory: Memory,
+        invocation: ToolInvocation,
+        iteration: int,
+        result: Any,
+        progressed: bool,
+        changed_data: bool = False,
+    ) -> bool:
+        """Account for an iteration in the loop guard. Returns True when the run must stop."""
+        self.loop_guard.record(invocation, iteration, result, progressed, changed_data)
+        verdict = self.loop_guard.verdict()
+        if verdict == "request":
+            logger.warning("No progress: asking the agent to terminate")
+            memory.add_memory({"type": "user", "content": self.loop_guard.stall_message()})
+        elif verdict == "force":
+            logger.warning(
+                f"Stopping the run: no progress in {self.loop_guard.stalled_in_a_row} iterations"
+            )
+            return True
+        return False
+
+    def _loop(
+        self,
+        user_input: str,
+        memory: Memory,
+        start: int,
+        max_iterations: int,
+        checkpointer: Checkpointer = None,
+    ) -> Memory:
+        if checkpointer is not None and start == 0:
+            checkpointer.save(memory, user_input, 0)
+        self.loop_guard = LoopGuard(self.loop_policy)
+
+        for i in range(start, max_iterations):
             logger.info(f"--- Agent Iteration {i+1} ---")
-            # print(f"Iteration {i}")
+            self.environment.start_iteration(i + 1)
+            # Taken before the response, as streamed tool calls may run while it is generated
+            aliases = registry_snapshot()
             # Construct a prompt that includes the Goals, Actions, and the current Memory
             prompt = self.construct_prompt(self.goals, memory, self.actions)
+            # Streaming generators hand over complete tool calls before the response ends
+            dispatched: Dict[str, Future] = {}
+            prompt.metadata["on_tool_call"] = lambda inv: self.dispatch_early(inv, dispatched)
 
             logger.info("Agent thinking...")
             # Generate a response from the agent
             response = self.prompt_llm_for_action(prompt)
 
             logger.debug(f"Agent Decision: {response}")
-            should_terminate = self.should_terminate(response)
-            # Determine which action the agent wants to execute
+            # Parse the response once: determine which action the agent wants to execute
             action, invocation = self.get_action(response)
             logger.debug(f"DEBUG main loop. action = {action}")
             logger.debug(f"DEBUG main loop. invocation = {invocation}")
 
-            if invocation["tool"] == "escalate_incorrect_response":
-                result = f"""The following response could not be processed: {response}.
+            if invocation.is_escalation:
+                message = invocation.args["message"]
+                result = f"""The following response could not be processed: {message}.
                         Please ensure you provide only one, correct action. """
-                self.update_memory(memory, response, result)
+                self.update_memory(memory, invocation, result)
                 logger.warning(f"Action result: {result}")
+                stop = self.end_iteration(memory, invocation, i + 1, result, progressed=False)
+                if checkpointer is not None:
+                    checkpointer.save(memory, user_input, i + 1, finished=stop)
+                if stop:
+                    break
                 continue
 
-            logger.debug(response)
+            early_result = dispatched.get(invocation.call_id)
+            error = (
+                None if early_result is not None else self.validate_invocation(action, invocation)
+            )
+            if error:
+                result = {"tool_executed": False, "error": error}
+                self.update_memory(memory, invocation, result)
+                logger.warning(f"Action result: {result}")
+                stop = self.end_iteration(memory, invocation, i + 1, result, progressed=False)
+                if checkpointer is not None:
+                    checkpointer.save(memory, user_input, i + 1, finished=stop)
+                if stop:
+                    break
+                continue
 
+            should_terminate = action.terminal
             if not should_terminate:
-                try:
-                    tool = invocation["tool"]
-                    args = invocation["args"]
-                    logger.info(f"Agent decision: use tool {tool} with args {args}")
-                except TypeError:
-                    logger.warning("Couldn't parse the response!")
-
-            # Execute the action in the environment
-            result = self.environment.execute_action(action, invocation["args"])
+                logger.info(
+                    f"Agent decision: use tool {invocation.tool} with args {invocation.args}"
+                )
+
+            # Execute the action in the environment, unless it was dispatched while streaming.
+            # A call repeated within the loop window is answered from its earlier result.
+            repeated = None
+            if early_result is None and not should_terminate:
+                repeated = self.loop_guard.repeated_result(invocation)
+            if early_result is not None:
+                result = early_result.result()
+            elif repeated is not None:
+                logger.warning(f"Repeated call to {invocation.tool}: answering from memory")
+                result = repeated
+            else:
+                result = self.environment.execute_invocation(action, invocation)
             logger.debug(f"Action Result: {result}")
 
             # Update the agent's memory with information about what happened
-            self.update_memory(memory, response, result)
+            self.update_memory(memory, invocation, result)
+            progressed = repeated is None and result.get("tool_executed", False)
+            stop = self.end_iteration(
+                memory, invocation, i + 1, result, progressed, registry_changed(aliases)
+            )
+            if checkpointer is not None:
+                checkpointer.save(memory, user_input, i + 1, finished=should_terminate or stop)
+            if stop and not should_terminate:
+                break
 
             # Check if the agent has decided to terminate
             if should_terminate:
                 logger.info("Agent decided to terminate.")
-                print(result["result"])
+                # Streaming generators already printed the report while it was generated
+                if not getattr(self.generate_response, "streams_final_report", False):
+                    print(result.get("result", result.get("error")))
                 break
             elif i == max_iterations - 1:
                 logger.warning(f"Max iterations ({max_iterations}) reached.")
 
+        self.log_run_summary()
         return memory
@@ -0,0 +1,204 @@
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import pyarrow as pa
+
+from ..utils.logger import CustomLogger
+from . import actions
+from .invocation import ToolInvocation
+from .memory import Memory
+from .shared_frames import SharedFrames
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+MEMORY_FILE = "memory.jsonl"
+STATE_FILE = "state.json"
+FRAMES_DIR = "frames"
+
+
+def encode_memory_item(item: dict) -> str:
+    """One JSON line for a memory item; tool calls keep their call id and raw message."""
+    if item["type"] == "tool_call":
+        invocation = item["invocation"]
+        item = {
+            **item,
+            "invocation": {
+                "tool": invocation.tool,
+                "args": invocation.args,
+                "call_id": invocation.call_id,
+                "raw_message": invocation.raw_message,
+            },
+        }
+    return json.dumps(item, default=str)
+
+
+def decode_memory_item(line: str) -> dict:
+    item = json.loads(line)
+    if item["type"] == "tool_call":
+        item["invocation"] = ToolInvocation(**item["invocation"])
+    return item
+
+
+class Checkpointer:
+    """Writes periodic checkpoints of an agent session, and restores them.
+
+    A checkpoint directory holds the memory as an append-only JSON lines file, the frames of
+    the DATAFRAMES registry as Arrow files (merge plans are stored as a spec of their inputs)
+    and ``state.json`` with the task, the loop position and the registry. Only memory items and
+    frames that are new since the previous checkpoint are written, in a background thread, so
+    the agent loop does not wait for the disk. ``state.json`` is replaced atomically once the
+    rest of a checkpoint is on disk, so a crash leaves the previous checkpoint usable.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(os.path.join(directory, FRAMES_DIR), exist_ok=True)
+        self._frames = SharedFrames(
+            os.path.join(directory, FRAMES_DIR), owner=False, allow_pickle=False
+        )
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self._lock = threading.Lock()
+        self._pending: Optional[Future] = None
+        self._written_items = 0
+        self.checkpoints = 0
+
+    @property
+    def state_path(self) -> str:
+        return os.path.join(self.directory, STATE_FILE)
+
+    @property
+    def memory_path(self) -> str:
+        return os.path.join(self.directory, MEMORY_FILE)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.state_path)
+
+    def resumable(self) -> bool:
+        """Whether the directory holds a checkpoint of a session that did not finish."""
+        if not self.exists():
+            return False
+        with open(self.state_path, encoding="utf-8") as f:
+            return not json.load(f)["finished"]
+
+    def save(self, memory: Memory, task: str, iteration: int, finished: bool = False) -> Future:
+        """Schedule a checkpoint after ``iteration`` completed iterations, and return at once."""
+        with self._lock:
+            items = memory.get_memories()
+            lines = [encode_memory_item(item) for item in items[self._written_items :]]
+            self._written_items = len(items)
+            state = {
+                "task": task,
+                "iteration": iteration,
+                "finished": finished,
+                "memory_items": len(items),
+            }
+            registry = dict(actions.DATAFRAMES)
+            self._pending = self._executor.submit(self._write, lines, state, registry)
+            return self._pending
+
+    def _write(self, lines: List[str], state: dict, registry: Dict):
+        if lines:
+            # A first checkpoint starts the file afresh, later ones only append
+            mode = "w" if len(lines) == state["memory_items"] else "a"
+            with open(self.memory_path, mode, encoding="utf-8") as f:
+                f.write("".join(line + "\n" for line in lines))
+        state["registry"] = {}
+        for alias, entry in registry.items():
+            try:
+                state["registry"][alias] = self._export(entry)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+                logger.warning(f"Dataframe '{alias}' is not checkpointed: {e}")
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+        self._prune(state["registry"])
+        self.checkpoints += 1
+        logger.debug(f"Checkpoint written after iteration {state['iteration']}")
+
+    def _export(self, entry) -> dict:
+        spec = self._frames.export(entry)
+        return self._relative(spec)
+
+    def _relative(self, spec: dict) -> dict:
+        """Frame paths relative to the checkpoint, so the directory can be moved."""
+        if spec["kind"] == "merge":
+            return {
+                **spec,
+                "left": self._relative(spec["left"]),
+                "right": self._relative(spec["right"]),
+            }
+        return {"kind": "frame", "path": os.path.basename(spec["path"])}
+
+    def _absolute(self, spec: dict) -> dict:
+        if spec["kind"] == "merge":
+            return {
+                **spec,
+                "left": self._absolute(spec["left"]),
+                "right": self._absolute(spec["right"]),
+            }
+        return {"kind": "frame", "path": os.path.join(self._frames.directory, spec["path"])}
+
+    def _prune(self, registry: Dict[str, dict]):
+        """Remove frame files that are neither referenced by the state nor still in use."""
+
+        def names(spec):
+            if spec["kind"] == "merge":
+                return names(spec["left"]) | names(spec["right"])
+            return {spec["path"]}
+
+        keep = set().union(*(names(spec) for spec in registry.values()))
+        keep |= {os.path.basename(path) for path in self._frames.tracked_paths()}
+        for name in os.listdir(self._frames.directory):
+            if name not in keep:
+                os.remove(os.path.join(self._frames.directory, name))
+
+    def flush(self):
+        """Wait until the scheduled checkpoints are on disk."""
+        with self._lock:
+            pending = self._pending
+        if pending is not None:
+            pending.result()
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def load(self) -> dict:
+        """Restore the latest checkpoint: fills DATAFRAMES and returns the state with its Memory.
+
+        Memory lines beyond the count recorded in the state belong to a checkpoint that was not
+        completed and are ignored (and overwritten by the next checkpoint).
+        """
+        self.flush()
+        with open(self.state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        memory = Memory()
+        if state["memory_items"]:
+            with open(self.memory_path, encoding="utf-8") as f:
+                for _, line in zip(range(state["memory_items"]), f):
+                    memory.add_memory(decode_memory_item(line))
+            self._truncate_memory(state["memory_items"])
+
+        actions.DATAFRAMES.clear()
+        for alias, spec in state["registry"].items():
+            actions.DATAFRAMES[alias] = self._frames.load(self._absolute(spec))
+        state["memory"] = memory
+        with self._lock:
+            self._written_items = len(memory.get_memories())
+        logger.info(
+            f"Restored checkpoint after iteration {state['iteration']} with "
+            f"{len(memory.get_memories())} memory items and {len(state['registry'])} dataframes"
+        )
+        return state
+
+    def _truncate_memory(self, count: int):
+        with open(self.memory_path, "rb+") as f:
+            for _ in range(count):
+                f.readline()
+            f.truncate()
@@ -0,0 +1,318 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, List, Optional
+
+from ..utils.logger import CustomLogger
+from .memory import Memory
+
+if TYPE_CHECKING:  # the client does not import the agent
+    from .agent import Agent
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+SOCKET_PATH = os.environ.get(
+    "DATA_AGENT_SOCKET", os.path.join(tempfile.gettempdir(), f"data-agent-{os.getuid()}.sock")
+)
+# Frames not used by any run for this long are dropped from the frame store and the prefetcher
+FRAME_IDLE_SECONDS = float(os.environ.get("DATA_AGENT_FRAME_IDLE_SECONDS", 15 * 60))
+
+
+class ObservedMemory(Memory):
+    """Memory that hands every added item to a callback, to stream the trace of a run."""
+
+    def __init__(self, on_add: Callable[[dict], None]):
+        super().__init__()
+        self.on_add = on_add
+
+    def add_memory(self, memory: dict):
+        super().add_memory(memory)
+        self.on_add(memory)
+
+
+def trace_event(item: dict) -> dict:
+    """A memory item as a JSON-serializable event."""
+    item = dict(item)
+    invocation = item.pop("invocation", None)
+    if invocation is not None:
+        item.update(invocation.to_dict(), call_id=invocation.call_id)
+    return {"event": "trace", "item": item}
+
+
+def _called_tool(item: dict) -> Optional[str]:
+    if item["type"] == "tool_call":
+        return item["invocation"].tool
+    if item["type"] == "assistant":
+        try:
+            return json.loads(item["content"]).get("tool")
+        except (ValueError, AttributeError):
+            return None
+    return None
+
+
+def final_report(memory: Memory) -> Optional[str]:
+    """The message of the last terminate call of a run, if it terminated."""
+    items = memory.get_memories()
+    report = None
+    for item, following in zip(items, items[1:]):
+        if _called_tool(item) == "terminate":
+            result = json.loads(following["content"])
+            report = (
+                result.get("result", result.get("error")) if isinstance(result, dict) else result
+            )
+    return report
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """One request per connection: a JSON line in, a stream of JSON event lines out."""
+
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError as e:
+            self.send({"event": "error", "error": f"Invalid request: {e}"})
+            return
+        self.server.agent_daemon.handle(request, self.send)
+
+    def send(self, event: dict) -> bool:
+        """Write an event to the client. False once the client has gone away."""
+        try:
+            self.wfile.write((json.dumps(event, default=str) + "\n").encode("utf-8"))
+            return True
+        except OSError:
+            return False
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class AgentDaemon:
+    """Long-lived process serving agent runs over a local Unix socket.
+
+    The action registry, the generated tool schemas, the loaded modules and the process-wide
+    frame store stay resident between runs, so a run only pays for its own work. Every run gets
+    a fresh agent from ``agent_factory`` (with its own dataframe registry) and streams its trace,
+    final report and metrics back to the client. Frames that no run used for
+    ``frame_idle_seconds`` are evicted from the frame store and from the prefetcher (the active
+    one if None).
+    """
+
+    def __init__(
+        self,
+        agent_factory: Callable[[], "Agent"],
+        socket_path: str = SOCKET_PATH,
+        frame_idle_seconds: float = FRAME_IDLE_SECONDS,
+        default_task: str = None,
+        store=None,
+        prefetcher=None,
+    ):
+        if store is None:
+            from .registry import FRAME_STORE as store
+        if prefetcher is None:
+            from .prefetch import get_prefetcher
+
+            prefetcher = get_prefetcher()
+        self.agent_factory = agent_factory
+        self.socket_path = socket_path
+        self.frame_idle_seconds = frame_idle_seconds
+        self.default_task = default_task
+        self.store = store
+        self.prefetcher = prefetcher
+        self.started = time.time()
+        self.runs = 0
+        self.active_runs = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = None
+
+    def status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "runs": self.runs,
+            "active_runs": self.active_runs,
+            "resident_frames": len(self.store),
+            "resident_bytes": self.store.used_bytes,
+        }
+
+    def handle(self, request: dict, send: Callable[[dict], bool]):
+        command = request.get("command")
+        if command == "run":
+            self.run(request, send)
+        elif command == "status":
+            send({"event": "status", **self.status()})
+        elif command == "shutdown":
+            send({"event": "stopping"})
+            threading.Thread(target=self.shutdown, daemon=True).start()
+        else:
+            send({"event": "error", "error": f"Unknown command '{command}'"})
+
+    def run(self, request: dict, send: Callable[[dict], bool]):
+        task = request.get("task") or self.default_task
+        if not task:
+            send({"event": "error", "error": "No task given"})
+            return
+        run_id = uuid.uuid4().hex[:8]
+        start = time.perf_counter()
+        with self._lock:
+            self.runs += 1
+            self.active_runs += 1
+        logger.info(f"Run {run_id} started")
+        send({"event": "started", "run": run_id})
+        try:
+            agent = self.agent_factory()
+            memory = ObservedMemory(lambda item: send(trace_event(item)))
+            agent.run(task, memory=memory, max_iterations=int(request.get("max_iterations", 50)))
+        except Exception as e:
+            logger.error(f"Run {run_id} failed: {e}")
+            send({"event": "error", "run": run_id, "error": str(e)})
+            return
+        finally:
+            with self._lock:
+                self.active_runs -= 1
+        seconds = round(time.perf_counter() - start, 3)
+        logger.info(f"Run {run_id} finished in {seconds}s")
+        send({"event": "report", "run": run_id, "message": final_report(memory)})
+        send({"event": "finished", "run": run_id, "seconds": seconds, **agent.run_metrics()})
+
+    def _evict_idle_frames(self):
+        interval = max(min(self.frame_idle_seconds / 4, 60), 0.01)
+        while not self._stopped.wait(interval):
+            evicted = self.store.evict_idle(self.frame_idle_seconds)
+            if self.prefetcher is not None:
+                evicted += self.prefetcher.evict_idle(self.frame_idle_seconds)
+            if evicted:
+                logger.info(f"Evicted {evicted} idle frame(s)")
+
+    def bind(self):
+        """Listen on the socket, replacing a stale socket file left by a dead daemon."""
+        if os.path.exists(self.socket_path):
+            if is_listening(self.socket_path):
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        self._server = _Server(self.socket_path, _RequestHandler)
+        self._server.agent_daemon = self
+        os.chmod(self.socket_path, 0o600)
+
+    def serve_forever(self):
+        if self._server is None:
+            self.bind()
+        threading.Thread(target=self._evict_idle_frames, daemon=True).start()
+        logger.info(f"Agent daemon listening on {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stopped.set()
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            logger.info("Agent daemon stopped")
+
+    def shutdown(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def is_listening(socket_path: str) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+            return True
+        except OSError:
+            return False
+
+
+def request(payload: dict, socket_path: str = SOCKET_PATH) -> Iterator[dict]:
+    """Send a request to the daemon and yield the events it streams back."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+        with sock.makefile("r", encoding="utf-8") as lines:
+            for line in lines:
+                yield json.loads(line)
+
+
+def submit(
+    task: str = None, max_iterations: int = 50, socket_path: str = SOCKET_PATH
+) -> Iterator[dict]:
+    """Run a task (the daemon's default task if None) and yield the events of the run."""
+    payload = {"command": "run", "task": task, "max_iterations": max_iterations}
+    return request(payload, socket_path)
+
+
+def format_event(event: dict, width: int = 200) -> Optional[str]:
+    """One line per step of a run, and the full final report."""
+    kind = event["event"]
+    if kind == "trace":
+        item = event["item"]
+        if item["type"] == "tool_call":
+            return f"-> {item['tool']}({json.dumps(item['args'])[:width]})"
+        if item["type"] in ("tool_result", "assistant"):
+            return f"   {str(item.get('content'))[:width]}"
+        return None
+    if kind == "report":
+        return event["message"]
+    if kind == "finished":
+        return f"Run {event['run']} finished in {event['seconds']}s"
+    if kind == "error":
+        return f"Error: {event['error']}"
+    return json.dumps(event)
+
+
+def serve(socket_path: str, frame_idle_seconds: float):
+    from data_agent.agents.data_analyst import (
+        action_registry,
+        create_session_agent,
+        user_input,
+    )
+
+    for action in action_registry.get_actions():
+        action.parameters  # generate the tool schemas once, before the first run
+    AgentDaemon(create_session_agent, socket_path, frame_idle_seconds, user_input).serve_forever()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Resident agent daemon and its client.")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Unix socket of the daemon")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve_parser = commands.add_parser("serve", help="Start the daemon")
+    serve_parser.add_argument("--frame-idle-seconds", type=float, default=FRAME_IDLE_SECONDS)
+    run_parser = commands.add_parser("run", help="Submit a run and stream its trace")
+    run_parser.add_argument("task", nargs="*", help="The task (the default analysis if empty)")
+    run_parser.add_argument("--max-iterations", type=int, default=50)
+    commands.add_parser("status", help="Show the daemon status")
+    commands.add_parser("stop", help="Stop the daemon")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        serve(args.socket, args.frame_idle_seconds)
+        return
+    payloads: Dict[str, dict] = {
+        "run": {
+            "command": "run",
+            "task": " ".join(getattr(args, "task", [])) or None,
+            "max_iterations": getattr(args, "max_iterations", 50),
+        },
+        "status": {"command": "status"},
+        "stop": {"command": "shutdown"},
+    }
+    try:
+        for event in request(payloads[args.command], args.socket):
+            text = format_event(event)
+            if text is not None:
+                print(text, flush=True)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.exit(f"No daemon listening on {args.socket}; start it with `make daemon`")
+
+
+if __name__ == "__main__":
+    main()
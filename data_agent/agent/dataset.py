@@ -0,0 +1,216 @@
+import glob
+import operator
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ..utils.logger import CustomLogger
+from .filters import FilterCondition, read_csv_chunked, read_parquet_table
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+EXTENSIONS = (".csv", ".parquet")
+GLOB_CHARS = re.compile(r"[*?\[]")
+MAX_LISTED_FILES = 20
+OPERATORS: Dict[str, Callable] = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">=": operator.ge,
+    "<=": operator.le,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+CLAUSE = re.compile(r"^\s*(\w+)\s*(==|=|!=|>=|<=|>|<)\s*(.+?)\s*$")
+IN_CLAUSE = re.compile(r"^\s*(\w+)\s+in\s*[\(\[](.*)[\)\]]\s*$", re.IGNORECASE)
+
+
+@dataclass
+class DatasetPart:
+    path: str
+    partitions: Dict[str, str] = field(default_factory=dict)  # hive key=value directories
+
+
+@dataclass
+class DatasetReport:
+    root: str
+    files_matched: int = 0
+    files_read: List[str] = field(default_factory=list)
+    bytes_scanned: int = 0
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        names = [os.path.relpath(p, self.root) for p in self.files_read[:MAX_LISTED_FILES]]
+        more = len(self.files_read) - len(names)
+        listed = ", ".join(names) + (f" and {more} more" if more > 0 else "")
+        pruned = self.files_matched - len(self.files_read)
+        return (
+            f"{len(self.files_read)} file(s) read ({pruned} pruned), "
+            f"{self.bytes_scanned} bytes scanned in {self.seconds:.2f}s: {listed}"
+        )
+
+
+def is_dataset_path(path: str) -> bool:
+    """Whether a path is a glob or a directory rather than a single file."""
+    return bool(GLOB_CHARS.search(path)) or os.path.isdir(path)
+
+
+def _is_data_file(path: str) -> bool:
+    # Hive-style datasets hold marker files such as _SUCCESS or .crc next to the parts
+    name = os.path.basename(path)
+    return path.endswith(EXTENSIONS) and not name.startswith(("_", "."))
+
+
+def _partitions(path: str, root: str) -> Dict[str, str]:
+    segments = os.path.relpath(os.path.dirname(path), root).split(os.sep)
+    return dict(s.split("=", 1) for s in segments if "=" in s)
+
+
+def resolve_parts(path: str) -> Tuple[str, List[DatasetPart]]:
+    """The root and data files of a glob, a (hive-partitioned) directory or a single file."""
+    if GLOB_CHARS.search(path):
+        root = path[: GLOB_CHARS.search(path).start()]
+        root = root if root.endswith(os.sep) else os.path.dirname(root)
+        files = glob.glob(path, recursive=True)
+    elif os.path.isdir(path):
+        root = path
+        files = [
+            os.path.join(directory, name) for directory, _, names in os.walk(path) for name in names
+        ]
+    else:
+        return os.path.dirname(path), [DatasetPart(path)]
+    parts = [DatasetPart(f, _partitions(f, root)) for f in sorted(files) if _is_data_file(f)]
+    if not parts:
+        raise ValueError(f"No .csv or .parquet files found at path: {path}")
+    return root, parts
+
+
+def _parse_value(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
+
+
+def _compare(op: Callable, left: str, right: str) -> bool:
+    """Compare partition values numerically when both are numbers, else as strings."""
+    try:
+        return op(float(left), float(right))
+    except ValueError:
+        return op(left, right)
+
+
+def _membership(values: List[str]) -> Callable[[str], bool]:
+    return lambda v: any(_compare(operator.eq, v, x) for x in values)
+
+
+def parse_partition_filter(expression: str) -> List[Tuple[str, Callable[[str], bool]]]:
+    """Parse ``"year>=2024 and region in (EU, US)"`` into (key, predicate) clauses.
+
+    Clauses are separated by ``and`` or commas outside of brackets. Supported operators are
+    ``=``/``==``, ``!=``, ``<``, ``<=``, ``>``, ``>=`` and ``in (...)``.
+    """
+    clauses = []
+    for text in re.split(r"\s+and\s+|,(?![^\(\[]*[\)\]])", expression, flags=re.IGNORECASE):
+        if not text.strip():
+            continue
+        match = IN_CLAUSE.match(text)
+        if match:
+            values = [_parse_value(v) for v in match.group(2).split(",")]
+            clauses.append((match.group(1), _membership(values)))
+            continue
+        match = CLAUSE.match(text)
+        if not match:
+            raise ValueError(f"Invalid partition filter clause: '{text.strip()}'")
+        key, op, value = match.group(1), OPERATORS[match.group(2)], _parse_value(match.group(3))
+        clauses.append((key, lambda v, op=op, value=value: _compare(op, v, value)))
+    return clauses
+
+
+def prune_parts(parts: List[DatasetPart], expression: Optional[str]) -> List[DatasetPart]:
+    """Keep the parts whose partition values satisfy the filter expression."""
+    if not expression:
+        return parts
+    clauses = parse_partition_filter(expression)
+    keys = set().union(*(p.partitions for p in parts))
+    unknown = sorted({key for key, _ in clauses} - keys)
+    if unknown:
+        raise ValueError(
+            f"Unknown partition key(s) {unknown} in filter. Partition keys: {sorted(keys)}"
+        )
+    return [
+        part
+        for part in parts
+        if all(key in part.partitions and test(part.partitions[key]) for key, test in clauses)
+    ]
+
+
+def _add_partition_columns(df: pd.DataFrame, parts: List[DatasetPart], lengths: List[int]):
+    """Partition values as categorical columns, built from codes instead of repeated strings."""
+    keys = dict.fromkeys(k for part in parts for k in part.partitions)
+    for key in keys:
+        if key in df.columns:
+            continue  # a column stored in the files takes precedence
+        values = [part.partitions.get(key) for part in parts]
+        categories = sorted({v for v in values if v is not None})
+        codes = [categories.index(v) if v is not None else -1 for v in values]
+        df[key] = pd.Categorical.from_codes(np.repeat(codes, lengths), categories)
+
+
+def read_dataset(
+    path: str,
+    partition_filter: str = None,
+    max_workers: int = 8,
+    columns: List[str] = None,
+    filters: List[FilterCondition] = None,
+) -> Tuple[pd.DataFrame, DatasetReport]:
+    """Read all data files of a glob or dataset directory in parallel threads.
+
+    Partitions are pruned with ``partition_filter`` before any file is read. Parquet parts are
+    read as Arrow tables and concatenated without copying, so the data is converted to pandas
+    once; CSV parts are read with pandas and concatenated. ``columns`` and ``filters`` are
+    pushed down to the reader of each part.
+    """
+    start = time.perf_counter()
+    root, parts = resolve_parts(path)
+    report = DatasetReport(root=root, files_matched=len(parts))
+    parts = prune_parts(parts, partition_filter)
+    if not parts:
+        raise ValueError(f"The partition filter '{partition_filter}' excludes all files")
+    formats = {os.path.splitext(part.path)[1] for part in parts}
+    if len(formats) > 1:
+        raise ValueError(f"Dataset at {path} mixes file formats: {sorted(formats)}")
+
+    keys = set().union(*(part.partitions for part in parts))
+    if any(f.column in keys for f in filters or []):
+        raise ValueError(f"Filter partition keys {sorted(keys)} with partition_filter instead")
+    file_columns = [c for c in columns if c not in keys] if columns else None
+
+    def read_part(part: DatasetPart):
+        if part.path.endswith(".parquet"):
+            return read_parquet_table(part.path, file_columns, filters)[0]
+        return read_csv_chunked(part.path, file_columns, filters)[0]
+
+    with ThreadPoolExecutor(min(max_workers, len(parts)), thread_name_prefix="dataset") as pool:
+        pieces = list(pool.map(read_part, parts))
+    lengths = [len(piece) for piece in pieces]
+    if formats == {".parquet"}:
+        df = pa.concat_tables(pieces, promote_options="permissive").to_pandas()
+    else:
+        df = pd.concat(pieces, ignore_index=True)
+    _add_partition_columns(df, parts, lengths)
+    if columns:
+        df = df[columns]
+
+    report.files_read = [part.path for part in parts]
+    report.bytes_scanned = sum(os.path.getsize(part.path) for part in parts)
+    report.seconds = time.perf_counter() - start
+    logger.debug(f"Read dataset {path}: {report.summary()}")
+    return df, report
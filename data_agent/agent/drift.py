@@ -0,0 +1,197 @@
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field
+
+QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+PSI_BINS = 10
+PSI_EPSILON = 1e-4
+MAX_LISTED_CATEGORIES = 10
+
+
+class DriftThresholds(BaseModel):
+    """Thresholds above which a column is flagged as drifted."""
+
+    mean_change: float = Field(0.05, description="Relative change of the mean")
+    quantile_shift: float = Field(
+        0.25, description="Quantile shift, in previous stds (|mean| for constant columns)"
+    )
+    ks: float = Field(0.1, description="Kolmogorov-Smirnov statistic")
+    psi: float = Field(0.1, description="Population stability index")
+    null_rate_change: float = Field(0.02, description="Absolute change of the null rate")
+    category_share_change: float = Field(0.05, description="Absolute change of a category share")
+
+
+def ks_statistic(prev: np.ndarray, curr: np.ndarray) -> float:
+    """Two-sample Kolmogorov-Smirnov statistic of two samples without missing values."""
+    if len(prev) == 0 or len(curr) == 0:
+        return float("nan")
+    prev, curr = np.sort(prev), np.sort(curr)
+    points = np.concatenate([prev, curr])
+    cdf_prev = np.searchsorted(prev, points, side="right") / len(prev)
+    cdf_curr = np.searchsorted(curr, points, side="right") / len(curr)
+    return float(np.max(np.abs(cdf_prev - cdf_curr)))
+
+
+def psi_from_shares(prev: np.ndarray, curr: np.ndarray) -> float:
+    prev = np.clip(prev, PSI_EPSILON, None)
+    curr = np.clip(curr, PSI_EPSILON, None)
+    return float(np.sum((curr - prev) * np.log(curr / prev)))
+
+
+def numeric_psi(prev: np.ndarray, curr: np.ndarray) -> float:
+    """PSI over decile bins of the previous sample, plus a bin below and above its range."""
+    if len(prev) == 0 or len(curr) == 0:
+        return float("nan")
+    inner = np.quantile(prev, np.linspace(0, 1, PSI_BINS + 1)[1:-1])
+    # Values outside the previous range get bins of their own (e.g. for a constant column)
+    edges = np.unique(np.concatenate([[prev.min()], inner, [np.nextafter(prev.max(), np.inf)]]))
+    prev_counts = np.bincount(np.searchsorted(edges, prev, side="right"), minlength=len(edges) + 1)
+    curr_counts = np.bincount(np.searchsorted(edges, curr, side="right"), minlength=len(edges) + 1)
+    return psi_from_shares(prev_counts / len(prev), curr_counts / len(curr))
+
+
+def _as_numbers(series: pd.Series) -> np.ndarray:
+    """Non-missing values as floats (datetimes as nanoseconds since the epoch)."""
+    series = series.dropna()
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.to_numpy(dtype="datetime64[ns]").astype("int64").astype(float)
+    return series.to_numpy(dtype=float)
+
+
+def _is_numeric(series: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+
+
+def _ratio(value, threshold) -> float:
+    if value is None or threshold <= 0 or not np.isfinite(value):
+        return 0.0
+    return abs(value) / threshold
+
+
+def _numeric_drift(prev: pd.DataFrame, curr: pd.DataFrame, columns, thresholds) -> Dict:
+    """Numeric columns: moments and quantiles in one vectorized pass, then KS and PSI."""
+    plain = [c for c in columns if not pd.api.types.is_datetime64_any_dtype(prev[c])]
+    prev_plain, curr_plain = prev[plain].astype(float), curr[plain].astype(float)
+    means_prev, means_curr = prev_plain.mean(), curr_plain.mean()
+    std_prev = prev_plain.std()
+    # Constant columns have no spread: their shifts are relative to the mean (NaN if it is 0)
+    scale = std_prev.where(std_prev > 0, means_prev.abs())
+    scale = scale.where(scale > 0)
+    shifts = (curr_plain.quantile(QUANTILES) - prev_plain.quantile(QUANTILES)) / scale
+
+    reports = {}
+    for column in columns:
+        values_prev, values_curr = _as_numbers(prev[column]), _as_numbers(curr[column])
+        report = {
+            "kind": "numeric",
+            "ks": ks_statistic(values_prev, values_curr),
+            "psi": numeric_psi(values_prev, values_curr),
+        }
+        scores = {
+            "ks": _ratio(report["ks"], thresholds.ks),
+            "psi": _ratio(report["psi"], thresholds.psi),
+        }
+        if column in plain:
+            mean_prev, mean_curr = means_prev[column], means_curr[column]
+            change = (mean_curr - mean_prev) / abs(mean_prev) if mean_prev else float("nan")
+            max_shift = shifts[column].abs().max()
+            report.update(
+                mean_prev=mean_prev,
+                mean_curr=mean_curr,
+                mean_change=change,
+                quantile_shifts={str(q): shifts.loc[q, column] for q in QUANTILES},
+            )
+            scores["mean_change"] = _ratio(change, thresholds.mean_change)
+            scores["quantile_shift"] = _ratio(max_shift, thresholds.quantile_shift)
+        reports[column] = (report, scores)
+    return reports
+
+
+def _categorical_drift(prev: pd.DataFrame, curr: pd.DataFrame, columns, thresholds) -> Dict:
+    """Other columns: category shares, new and vanished categories."""
+    reports = {}
+    for column in columns:
+        shares_prev = prev[column].value_counts(normalize=True)
+        shares_curr = curr[column].value_counts(normalize=True)
+        shares = pd.concat([shares_prev, shares_curr], axis=1, keys=["prev", "curr"]).fillna(0.0)
+        change = shares["curr"] - shares["prev"]
+        new = shares.index[shares["prev"] == 0].tolist()
+        vanished = shares.index[shares["curr"] == 0].tolist()
+        top_changes = change.abs().sort_values(ascending=False).head(MAX_LISTED_CATEGORIES)
+        report = {
+            "kind": "categorical",
+            "psi": psi_from_shares(shares["prev"].to_numpy(), shares["curr"].to_numpy()),
+            "max_share_change": float(change.abs().max()) if len(change) else 0.0,
+            "share_changes": {str(k): float(change[k]) for k in top_changes.index},
+            "new_categories": len(new),
+            "vanished_categories": len(vanished),
+            "new_examples": [str(v) for v in new[:MAX_LISTED_CATEGORIES]],
+            "vanished_examples": [str(v) for v in vanished[:MAX_LISTED_CATEGORIES]],
+        }
+        scores = {
+            "psi": _ratio(report["psi"], thresholds.psi),
+            "category_share_change": _ratio(
+                report["max_share_change"], thresholds.category_share_change
+            ),
+        }
+        reports[column] = (report, scores)
+    return reports
+
+
+def _compact(value):
+    """Round floats for a compact report, with NaN and infinities as None."""
+    if isinstance(value, dict):
+        return {k: _compact(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), 4) if np.isfinite(value) else None
+    return value
+
+
+def drift_report(
+    prev: pd.DataFrame,
+    curr: pd.DataFrame,
+    columns: List[str] = None,
+    thresholds: DriftThresholds = None,
+) -> Dict:
+    """Per-column distribution drift between two snapshots, ranked by severity.
+
+    The severity of a column is the largest ratio of a drift metric to its threshold; columns
+    with a severity of at least 1 are flagged, with the metrics that exceeded their threshold.
+    """
+    thresholds = thresholds or DriftThresholds()
+    shared = [c for c in prev.columns if c in curr.columns]
+    columns = [c for c in (columns or shared) if c in shared]
+
+    numeric = [c for c in columns if _is_numeric(prev[c]) and _is_numeric(curr[c])]
+    categorical = [c for c in columns if c not in numeric]
+    reports = _numeric_drift(prev, curr, numeric, thresholds)
+    reports.update(_categorical_drift(prev, curr, categorical, thresholds))
+
+    null_prev, null_curr = prev[columns].isna().mean(), curr[columns].isna().mean()
+    ranked = []
+    for column in columns:
+        report, scores = reports[column]
+        change = null_curr[column] - null_prev[column]
+        report.update(null_rate_prev=null_prev[column], null_rate_curr=null_curr[column])
+        scores["null_rate_change"] = _ratio(change, thresholds.null_rate_change)
+        severity = max(scores.values())
+        flags = sorted(metric for metric, score in scores.items() if score >= 1)
+        ranked.append({"column": column, "severity": severity, "flags": flags, **report})
+    ranked.sort(key=lambda r: r["severity"], reverse=True)
+
+    return _compact(
+        {
+            "rows_prev": len(prev),
+            "rows_curr": len(curr),
+            "columns_compared": len(columns),
+            "columns_flagged": sum(1 for r in ranked if r["flags"]),
+            "only_in_prev": [c for c in prev.columns if c not in curr.columns],
+            "only_in_curr": [c for c in curr.columns if c not in prev.columns],
+            "thresholds": thresholds.model_dump(),
+            "columns": ranked,
+        }
+    )
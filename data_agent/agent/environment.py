@@ -1,18 +1,50 @@
 import time
 import traceback
-from typing import Any
+from typing import Any, Dict
 
 from ..utils.logger import CustomLogger
-from .actions import Action
+from .actions import DATA_DIR, Action
+from .invocation import ToolInvocation
+from .prefetch import Prefetcher, set_prefetcher
+from .profiling import ActionProfiler
+from .registry import Entry, use_registry
 
 logger = CustomLogger(console_level="INFO", file_level="DEBUG")
 
 
 class Environment:
+    def __init__(
+        self,
+        prefetcher: Prefetcher = None,
+        profiler: ActionProfiler = None,
+        registry: Dict[str, Entry] = None,
+    ):
+        """Optionally pass a Prefetcher to warm data files after they are listed (opt-in), an
+        ActionProfiler to profile selected or slow actions (opt-in), and a registry (e.g. {})
+        to keep the dataframes of this session apart from other sessions in the process."""
+        self.registry = registry
+        self.prefetcher = prefetcher
+        if prefetcher is not None:
+            set_prefetcher(prefetcher)
+        self.profiler = profiler
+        self.iteration = None
+
+    def start_iteration(self, iteration: int):
+        """Called by the agent loop, so that profiles are keyed by their iteration."""
+        self.iteration = iteration
+
     def execute_action(self, action: Action, args: dict) -> dict:
         """Execute an action and return the result."""
+        with use_registry(self.registry):
+            return self._execute_action(action, args)
+
+    def _execute_action(self, action: Action, args: dict) -> dict:
         try:
-            result = action.execute(**args)
+            if self.profiler is not None:
+                result = self.profiler.run(action, args, self.iteration)
+            else:
+                result = action.execute(**args)
+            self.after_action(action, result)
             return self.format_result(result)
         except Exception as e:
             logger.error("Error executing action", exc_info=True)
@@ -23,6 +55,18 @@ class Environment:
                 "traceback": traceback.format_exc(),
             }
 
+    def after_action(self, action: Action, result: Any):
+        """Hook run after a successful action: the next step after list_files is a load."""
+        if self.prefetcher is not None and action.name == "list_files":
+            self.prefetcher.prefetch(result, data_dir=self.prefetcher.data_dir or DATA_DIR)
+
+    def execute_invocation(self, action: Action, invocation: ToolInvocation) -> dict:
+        """Execute a validated tool invocation, tagging the result with its call id."""
+        result = self.execute_action(action, invocation.args)
+        if invocation.call_id is not None:
+            result["tool_call_id"] = invocation.call_id
+        return result
+
     def format_result(self, result: Any) -> dict:
         """Format the result with metadata."""
         return {
@@ -0,0 +1,178 @@
+from typing import Any, Dict, List, Literal, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pydantic import BaseModel, Field
+
+CSV_CHUNK_ROWS = 100_000
+NULL_OPS = {"is_null", "not_null"}
+LIST_OPS = {"in", "not_in"}
+
+
+class FilterCondition(BaseModel):
+    """One row filter: ``column op value``. Conditions in a list are combined with AND.
+
+    As in SQL, missing values only match ``is_null`` (and never ``!=`` or ``not_in``), whether
+    the filter is pushed down to a parquet reader or applied to a frame in memory.
+    """
+
+    column: str = Field(..., description="The column to filter on")
+    op: Literal["==", "!=", "<", "<=", ">", ">=", "in", "not_in", "is_null", "not_null"] = Field(
+        ..., description="The comparison operator"
+    )
+    value: Any = Field(
+        None, description="The value to compare with; a list for in/not_in, unused for nulls"
+    )
+
+
+def parse_filters(filters: Sequence) -> List[FilterCondition]:
+    """Validate filter specs given as FilterConditions or dicts."""
+    conditions = [FilterCondition.model_validate(f) for f in filters or []]
+    for condition in conditions:
+        if condition.op in LIST_OPS and not isinstance(condition.value, (list, tuple)):
+            raise ValueError(f"The value of an '{condition.op}' filter must be a list")
+        if condition.op not in NULL_OPS and condition.value is None:
+            raise ValueError(f"The '{condition.op}' filter on '{condition.column}' needs a value")
+    return conditions
+
+
+def check_columns(available: Sequence[str], columns: Sequence[str], conditions):
+    missing = [c for c in list(columns) + [f.column for f in conditions] if c not in available]
+    if missing:
+        raise ValueError(f"Unknown column(s) {missing}. Available columns: {list(available)}")
+
+
+def _arrow_value(value: Any, type_: pa.DataType):
+    """Cast a JSON value to the column type, so that e.g. date strings compare to timestamps."""
+    try:
+        return pa.scalar(value).cast(type_)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError):
+        return pa.scalar(value)
+
+
+def arrow_expression(conditions: List[FilterCondition], schema: pa.Schema) -> ds.Expression:
+    """The AND of the conditions as an Arrow expression (None when there are none)."""
+    expression = None
+    for f in conditions:
+        field = pc.field(f.column)
+        type_ = schema.field(f.column).type
+        if f.op == "is_null":
+            term = field.is_null()
+        elif f.op == "not_null":
+            term = field.is_valid()
+        elif f.op in LIST_OPS:
+            values = pa.array([_arrow_value(v, type_).as_py() for v in f.value], type=type_)
+            term = field.isin(values)
+            term = ~term & field.is_valid() if f.op == "not_in" else term
+        else:
+            value = _arrow_value(f.value, type_)
+            term = {
+                "==": field == value,
+                "!=": field != value,
+                "<": field < value,
+                "<=": field <= value,
+                ">": field > value,
+                ">=": field >= value,
+            }[f.op]
+        expression = term if expression is None else expression & term
+    return expression
+
+
+def _pandas_value(value: Any, series: pd.Series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(value)
+    return value
+
+
+def filter_mask(df: pd.DataFrame, conditions: List[FilterCondition]) -> np.ndarray:
+    """Boolean mask of the rows of a frame that satisfy all conditions."""
+    mask = np.ones(len(df), dtype=bool)
+    for f in conditions:
+        series = df[f.column]
+        if f.op == "is_null":
+            term = series.isna()
+        elif f.op == "not_null":
+            term = series.notna()
+        elif f.op in LIST_OPS:
+            term = series.isin([_pandas_value(v, series) for v in f.value])
+            term = ~term if f.op == "not_in" else term
+        else:
+            value = _pandas_value(f.value, series)
+            term = {
+                "==": series.eq,
+                "!=": series.ne,
+                "<": series.lt,
+                "<=": series.le,
+                ">": series.gt,
+                ">=": series.ge,
+            }[f.op](value)
+        if f.op not in NULL_OPS:
+            term = term & series.notna()  # NaN != value is True in pandas, null in Arrow
+        mask &= term.fillna(False).to_numpy(dtype=bool)
+    return mask
+
+
+def apply_filters(df: pd.DataFrame, columns: Sequence[str], conditions) -> pd.DataFrame:
+    """Filter and project a frame that is already in memory."""
+    check_columns(df.columns, columns, conditions)
+    if conditions:
+        df = df[filter_mask(df, conditions)]
+    return df[list(columns)] if columns else df
+
+
+def read_parquet_table(
+    path: str, columns: Sequence[str] = None, conditions: List[FilterCondition] = None
+) -> Tuple[pa.Table, Dict[str, int]]:
+    """Read a parquet file as an Arrow table with projection and filter pushdown.
+
+    Row groups whose min/max statistics rule out the filter are skipped without being read,
+    and only the requested columns are decoded. Returns the table and the row-group counts.
+    """
+    dataset = ds.dataset(path, format="parquet")
+    conditions = conditions or []
+    check_columns(dataset.schema.names, columns or [], conditions)
+    expression = arrow_expression(conditions, dataset.schema)
+    row_groups = sum(f.num_row_groups for f in dataset.get_fragments())
+    if expression is None:
+        row_groups_read = row_groups
+    else:
+        row_groups_read = sum(
+            len(f.split_by_row_group(filter=expression))
+            for f in dataset.get_fragments(filter=expression)
+        )
+    table = dataset.to_table(columns=list(columns) if columns else None, filter=expression)
+    return table, {"row_groups": row_groups, "row_groups_read": row_groups_read}
+
+
+def read_parquet_pushdown(
+    path: str, columns: Sequence[str] = None, conditions: List[FilterCondition] = None
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    table, stats = read_parquet_table(path, columns, conditions)
+    return table.to_pandas(), stats
+
+
+def read_csv_chunked(
+    path: str,
+    columns: Sequence[str] = None,
+    conditions: List[FilterCondition] = None,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """Read a CSV file chunk by chunk, keeping only the matching rows and requested columns."""
+    conditions = conditions or []
+    header = pd.read_csv(path, nrows=0).columns
+    check_columns(header, columns or [], conditions)
+    needed = list(dict.fromkeys(list(columns or header) + [f.column for f in conditions]))
+    kept, rows = [], 0
+    for chunk in pd.read_csv(path, usecols=needed, chunksize=chunk_rows):
+        rows += len(chunk)
+        chunk = chunk[filter_mask(chunk, conditions)] if conditions else chunk
+        kept.append(chunk[list(columns or header)])
+    df = (
+        pd.concat(kept, ignore_index=True)
+        if kept
+        else pd.DataFrame(columns=list(columns or header))
+    )
+    return df, {"rows_scanned": rows}
@@ -0,0 +1,302 @@
+import argparse
+import fnmatch
+import json
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ..utils.io_utils import read_frame
+from ..utils.logger import CustomLogger
+from .key_index import KeyIndex, merge_on_key
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+HISTORY_DIR = os.environ.get("DATA_AGENT_HISTORY_DIR", os.path.join("data", "history"))
+SNAPSHOT_DATE = re.compile(r"(\d{8})")
+MANIFEST_FILE = "snapshots.json"
+KEY_BUCKETS = 16
+
+EVENT_SCHEMA = pa.schema(
+    [
+        ("key", pa.string()),
+        ("snapshot", pa.string()),
+        ("event", pa.string()),  # added, removed or changed
+        ("column", pa.string()),  # the changed column (null for added/removed keys)
+        ("old", pa.string()),
+        ("new", pa.string()),
+    ]
+)
+
+
+def snapshot_date(path: str) -> str:
+    match = SNAPSHOT_DATE.search(os.path.basename(path))
+    if match is None:
+        raise ValueError(f"No YYYYMMDD date in the snapshot file name {path}")
+    return match.group(1)
+
+
+def key_buckets(keys: pd.Series, buckets: int = KEY_BUCKETS) -> np.ndarray:
+    """Bucket of every key (as text), stable across processes and runs."""
+    hashes = pd.util.hash_pandas_object(keys.astype(str), index=False).to_numpy()
+    return (hashes % buckets).astype(int)
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    return series.astype(str).where(series.notna(), None)
+
+
+def _differs(old: pd.Series, new: pd.Series) -> np.ndarray:
+    """Element-wise inequality where two nulls count as equal."""
+    try:
+        unequal = old.ne(new)
+    except TypeError:  # e.g. categoricals with different categories
+        unequal = old.astype(str).ne(new.astype(str))
+    # Nullable dtypes (Int64, boolean, string) compare to <NA> when a side is missing
+    unequal = unequal.to_numpy(dtype=bool, na_value=True)
+    both_null = (old.isna() & new.isna()).to_numpy(dtype=bool)
+    return unequal & ~both_null
+
+
+def change_events(prev: Optional[pd.DataFrame], curr: pd.DataFrame, key: str, date: str):
+    """Added and removed keys, and one event per changed (key, column) between two snapshots."""
+    if prev is None:
+        added = curr[key]
+        events = pd.DataFrame({"key": _as_text(added), "event": "added"})
+        return events.assign(snapshot=date).reindex(columns=EVENT_SCHEMA.names)
+
+    merged = merge_on_key(
+        prev,
+        curr,
+        on=key,
+        how="outer",
+        suffixes=("_prev", "_curr"),
+        indicator=True,
+        left_index=KeyIndex.build(prev[key]),
+        right_index=KeyIndex.build(curr[key]),
+    )
+    parts = []
+    for side, event in (("right_only", "added"), ("left_only", "removed")):
+        keys = merged.loc[merged["_merge"] == side, key]
+        parts.append(pd.DataFrame({"key": _as_text(keys), "event": event}))
+
+    both = merged[merged["_merge"] == "both"]
+    shared = [c for c in prev.columns if c in curr.columns and c != key]
+    for column in shared:
+        old, new = both[f"{column}_prev"], both[f"{column}_curr"]
+        mask = _differs(old, new)
+        if mask.any():
+            parts.append(
+                pd.DataFrame(
+                    {
+                        "key": _as_text(both.loc[mask, key]),
+                        "event": "changed",
+                        "column": column,
+                        "old": _as_text(old[mask]),
+                        "new": _as_text(new[mask]),
+                    }
+                )
+            )
+    events = pd.concat(parts, ignore_index=True).assign(snapshot=date)
+    return events.reindex(columns=EVENT_SCHEMA.names)
+
+
+def column_statistics(df: pd.DataFrame, key: str, events: pd.DataFrame, date: str):
+    """One row of statistics per column of a snapshot, with its number of changed keys."""
+    changed = events.loc[events["event"] == "changed", "column"].value_counts()
+    rows = []
+    for column in df.columns:
+        series = df[column]
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        rows.append(
+            {
+                "snapshot": date,
+                "column": column,
+                "dtype": str(series.dtype),
+                "rows": len(series),
+                "null_count": int(series.isna().sum()),
+                "distinct": int(series.nunique()),
+                "mean": float(series.mean()) if numeric else None,
+                "min": float(series.min()) if numeric else None,
+                "max": float(series.max()) if numeric else None,
+                "changed": int(changed.get(column, 0)) if column != key else 0,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+class HistoryStore:
+    """Append-only history of dated snapshots, for trend and "when did this change" queries.
+
+    Every ingested snapshot adds its change events against the previous snapshot to
+    ``events/bucket=NN/<date>.parquet``, where the bucket is a hash of the key and the rows are
+    sorted by key. A key lookup therefore reads one bucket and only the row groups holding the
+    key. Per-column statistics (including the number of changed keys) go to
+    ``stats/<date>.parquet``, so trend queries only read a few rows per snapshot. The last
+    snapshot is kept as ``state/<date>.parquet`` to diff the next one against; the manifest
+    names the last snapshot, so a crash during ingestion re-ingests against the right state.
+    """
+
+    def __init__(self, directory: str = HISTORY_DIR, key: str = "sbti_id"):
+        self.directory = directory
+        self.manifest = self._read_manifest() or {
+            "key": key,
+            "buckets": KEY_BUCKETS,
+            "snapshots": [],
+        }
+        self.key = self.manifest["key"]
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.directory, *parts)
+
+    def _read_manifest(self) -> Optional[dict]:
+        if not os.path.exists(self._path(MANIFEST_FILE)):
+            return None
+        with open(self._path(MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self):
+        tmp_path = self._path(MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self._path(MANIFEST_FILE))
+
+    def _state_path(self, date: str) -> str:
+        return self._path("state", f"{date}.parquet")
+
+    @property
+    def snapshots(self) -> List[str]:
+        return [s["snapshot"] for s in self.manifest["snapshots"]]
+
+    def ingest(self, path: str, date: str = None) -> Optional[dict]:
+        """Append a snapshot newer than the last one. Returns its summary (None if ingested)."""
+        date = date or snapshot_date(path)
+        if date in self.snapshots:
+            return None
+        if self.snapshots and date < self.snapshots[-1]:
+            raise ValueError(
+                f"Snapshot {date} is older than the last ingested {self.snapshots[-1]}"
+            )
+
+        curr = read_frame(path)
+        if self.key not in curr.columns:
+            raise ValueError(f"Key column '{self.key}' not found in {path}")
+        if curr[self.key].isna().any() or curr[self.key].duplicated().any():
+            raise ValueError(f"Key column '{self.key}' of {path} has nulls or duplicates")
+        last = self.snapshots[-1] if self.snapshots else None
+        prev = pd.read_parquet(self._state_path(last)) if last else None
+
+        events = change_events(prev, curr, self.key, date)
+        self._write_events(events, date)
+        os.makedirs(self._path("stats"), exist_ok=True)
+        stats = column_statistics(curr, self.key, events, date)
+        stats.to_parquet(self._path("stats", f"{date}.parquet"), index=False)
+        os.makedirs(self._path("state"), exist_ok=True)
+        curr.to_parquet(self._state_path(date), index=False)
+
+        counts = events["event"].value_counts()
+        summary = {
+            "snapshot": date,
+            "file": os.path.basename(path),
+            "rows": len(curr),
+            "added": int(counts.get("added", 0)),
+            "removed": int(counts.get("removed", 0)),
+            "changed": int(counts.get("changed", 0)),
+        }
+        self.manifest["snapshots"].append(summary)
+        self._write_manifest()  # after all files, so a crash re-ingests the snapshot
+        if last:
+            os.remove(self._state_path(last))
+        logger.info(f"Snapshot {date} added to the history: {summary}")
+        return summary
+
+    def ingest_new(self, data_dir: str, pattern: str = "sbti_*.parquet") -> List[dict]:
+        """Ingest the snapshots of a directory that are newer than the last ingested one."""
+        files = [f for f in os.listdir(data_dir) if fnmatch.fnmatch(f, pattern)]
+        files = sorted(files, key=snapshot_date)
+        last = self.snapshots[-1] if self.snapshots else ""
+        return [
+            summary
+            for f in files
+            if snapshot_date(f) > last
+            for summary in [self.ingest(os.path.join(data_dir, f))]
+            if summary is not None
+        ]
+
+    def _write_events(self, events: pd.DataFrame, date: str):
+        buckets = key_buckets(events["key"], self.manifest["buckets"])
+        for bucket in range(self.manifest["buckets"]):
+            part = events[buckets == bucket].sort_values("key", kind="stable")
+            directory = self._path("events", f"bucket={bucket:02d}")
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(part, schema=EVENT_SCHEMA, preserve_index=False)
+            pq.write_table(table, os.path.join(directory, f"{date}.parquet"), row_group_size=8192)
+
+    def _filter(self, since: str = None, until: str = None, **equal) -> Optional[ds.Expression]:
+        terms = [ds.field(name) == value for name, value in equal.items() if value is not None]
+        if since:
+            terms.append(ds.field("snapshot") >= since)
+        if until:
+            terms.append(ds.field("snapshot") <= until)
+        expression = None
+        for term in terms:
+            expression = term if expression is None else expression & term
+        return expression
+
+    def key_history(
+        self, key, column: str = None, since: str = None, until: str = None
+    ) -> pd.DataFrame:
+        """Events of one key (optionally of one column), oldest first."""
+        key = str(key)
+        bucket = key_buckets(pd.Series([key]), self.manifest["buckets"])[0]
+        directory = self._path("events", f"bucket={bucket:02d}")
+        if not os.path.isdir(directory):
+            return pd.DataFrame(columns=EVENT_SCHEMA.names)
+        dataset = ds.dataset(directory, format="parquet", schema=EVENT_SCHEMA)
+        expression = self._filter(since, until, key=key, column=column)
+        events = dataset.to_table(filter=expression).to_pandas()
+        return events.sort_values("snapshot", kind="stable").reset_index(drop=True)
+
+    def column_trend(
+        self, column: str = None, statistics: Sequence[str] = None, since=None, until=None
+    ) -> pd.DataFrame:
+        """Per-snapshot statistics of a column (of all columns if None), oldest first."""
+        directory = self._path("stats")
+        if not os.path.isdir(directory):
+            return pd.DataFrame()
+        dataset = ds.dataset(directory, format="parquet")
+        expression = self._filter(since, until, column=column)
+        stats = dataset.to_table(filter=expression).to_pandas()
+        stats = stats.sort_values(["snapshot", "column"], kind="stable").reset_index(drop=True)
+        if statistics:
+            stats = stats[["snapshot", "column"] + list(statistics)]
+        return stats
+
+    def change_counts(self, column: str = None, since=None, until=None) -> pd.DataFrame:
+        """The snapshots in which a column changed (all columns if None), with the counts."""
+        stats = self.column_trend(column, ["changed"], since, until)
+        return stats[stats["changed"] > 0].reset_index(drop=True) if len(stats) else stats
+
+    def summary(self) -> Dict:
+        return {"key": self.key, "snapshots": self.manifest["snapshots"]}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Ingest dated snapshots into the history.")
+    parser.add_argument("paths", nargs="+", help="Snapshot files, ingested in date order")
+    parser.add_argument("--dir", default=HISTORY_DIR, help="History store directory")
+    parser.add_argument("--key", default="sbti_id", help="Key column of the snapshots")
+    args = parser.parse_args(argv)
+    store = HistoryStore(args.dir, key=args.key)
+    for path in sorted(args.paths, key=snapshot_date):
+        summary = store.ingest(path)
+        print(summary or f"{path} already ingested")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+ESCALATE_TOOL = "escalate_incorrect_response"
+
+
+@dataclass
+class ToolInvocation:
+    """A single tool call requested by the LLM, passed as-is from the LLM layer to Memory."""
+
+    tool: str
+    args: Dict[str, Any] = field(default_factory=dict)
+    call_id: Optional[str] = None
+    raw_message: Optional[dict] = None  # provider-native assistant message holding the call
+
+    @classmethod
+    def from_tool_call(cls, tool_call: Any, content: Optional[str] = None) -> "ToolInvocation":
+        """Build an invocation from a provider tool call (``id``, ``function.name/arguments``)."""
+        try:
+            args = json.loads(tool_call.function.arguments or "{}")
+        except ValueError:
+            return cls.escalate(tool_call.function.arguments)
+        raw_message = {
+            "role": "assistant",
+            "content": content,
+            "tool_calls": [
+                {
+                    "id": tool_call.id,
+                    "type": "function",
+                    "function": {
+                        "name": tool_call.function.name,
+                        "arguments": tool_call.function.arguments,
+                    },
+                }
+            ],
+        }
+        return cls(tool_call.function.name, args, tool_call.id, raw_message)
+
+    @classmethod
+    def escalate(cls, response: Any) -> "ToolInvocation":
+        """Invocation standing in for a response that could not be parsed into a tool call."""
+        return cls(ESCALATE_TOOL, {"message": response})
+
+    @property
+    def is_escalation(self) -> bool:
+        return self.tool == ESCALATE_TOOL
+
+    def to_message(self) -> dict:
+        """Assistant message for the prompt history."""
+        if self.raw_message is not None:
+            return self.raw_message
+        return {"role": "assistant", "content": json.dumps(self.to_dict())}
+
+    def to_dict(self) -> dict:
+        return {"tool": self.tool, "args": self.args}
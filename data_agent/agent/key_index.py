@@ -0,0 +1,225 @@
+import os
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+MERGE_INDICATOR_CATEGORIES = ["left_only", "right_only", "both"]
+
+# Merges whose estimated output exceeds this many rows are refused
+MAX_MERGE_ROWS = int(os.environ.get("DATA_AGENT_MAX_MERGE_ROWS", 10_000_000))
+
+
+@dataclass
+class KeyIndex:
+    """Sorted key column of a frame, with the row position of every sorted key."""
+
+    key: str
+    sorted_keys: pd.Index  # non-null keys in ascending order
+    positions: np.ndarray  # row position of each sorted key in the frame
+    duplicate_count: int
+    null_count: int
+
+    @classmethod
+    def build(cls, series: pd.Series) -> "KeyIndex":
+        notna = series.notna().to_numpy()
+        keys = pd.Index(series.to_numpy()[notna], dtype=series.dtype)
+        order = keys.argsort(kind="stable")
+        sorted_keys = keys.take(order)
+        duplicate_count = int(np.sum(sorted_keys[1:] == sorted_keys[:-1]))
+        return cls(
+            key=series.name,
+            sorted_keys=sorted_keys,
+            positions=np.flatnonzero(notna)[order],
+            duplicate_count=duplicate_count,
+            null_count=int((~notna).sum()),
+        )
+
+    @property
+    def is_unique(self) -> bool:
+        return self.duplicate_count == 0
+
+    @property
+    def joinable(self) -> bool:
+        """Whether the index can be used for the sorted merge path."""
+        return self.is_unique and self.null_count == 0
+
+
+class KeyIndexCache:
+    """Key indexes cached per in-memory frame (i.e. per alias) and per file on disk."""
+
+    def __init__(self):
+        self._frame_indexes: Dict[Tuple[int, str], KeyIndex] = {}
+        self._file_indexes: Dict[Tuple[str, int, int, str], KeyIndex] = {}
+
+    def for_frame(self, frame: pd.DataFrame, key: str) -> KeyIndex:
+        """Key index of a registered frame. Dropped once the frame is garbage collected."""
+        cache_key = (id(frame), key)
+        if cache_key not in self._frame_indexes:
+            self._frame_indexes[cache_key] = KeyIndex.build(frame[key])
+            weakref.finalize(frame, self._frame_indexes.pop, cache_key, None)
+        return self._frame_indexes[cache_key]
+
+    def for_file(self, path: str, key: str, frame: pd.DataFrame) -> KeyIndex:
+        """Key index of a file, rebuilt from ``frame`` when the file has changed on disk."""
+        stat = os.stat(path)
+        cache_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, key)
+        if cache_key not in self._file_indexes:
+            self._file_indexes[cache_key] = KeyIndex.build(frame[key])
+        return self._file_indexes[cache_key]
+
+    def clear(self):
+        self._frame_indexes.clear()
+        self._file_indexes.clear()
+
+
+KEY_INDEXES = KeyIndexCache()
+
+
+def check_duplicate_keys(left: KeyIndex, right: KeyIndex, allow_one_to_many: bool = True):
+    """Raise before merging when duplicated keys would inflate the output."""
+    duplicated = {side: idx.duplicate_count for side, idx in (("left", left), ("right", right))}
+    if allow_one_to_many and not all(duplicated.values()):
+        return
+    if any(duplicated.values()):
+        counts = ", ".join(f"{count} in {side}" for side, count in duplicated.items() if count)
+        raise ValueError(
+            f"Duplicate values found in join key '{left.key}' ({counts}); "
+            "the merge would inflate the number of rows."
+        )
+
+
+def _key_counts(index: KeyIndex) -> pd.Series:
+    """Number of rows of every distinct non-null key."""
+    keys = index.sorted_keys
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.array([], int)
+    return pd.Series(np.diff(np.r_[starts, len(keys)]), index=keys.take(starts))
+
+
+def estimate_merge_rows(left: KeyIndex, right: KeyIndex, how: str = "inner") -> int:
+    """Number of rows of a merge, counted from the key indexes without merging.
+
+    Every key matches ``left count * right count`` rows. Null keys match each other, like in
+    ``pd.merge``. Left, right and outer joins add the rows of their unmatched keys.
+    """
+    left_counts, right_counts = _key_counts(left), _key_counts(right)
+    shared = left_counts.index.intersection(right_counts.index)
+    matched_left = int(left_counts.loc[shared].sum())
+    matched_right = int(right_counts.loc[shared].sum())
+    rows = int((left_counts.loc[shared] * right_counts.loc[shared]).sum())
+    rows += left.null_count * right.null_count
+    left_only = len(left.positions) - matched_left
+    right_only = len(right.positions) - matched_right
+    if not right.null_count:
+        left_only += left.null_count
+    if not left.null_count:
+        right_only += right.null_count
+    if how in ("left", "outer"):
+        rows += left_only
+    if how in ("right", "outer"):
+        rows += right_only
+    return rows
+
+
+def check_merge_size(
+    left: KeyIndex, right: KeyIndex, how: str = "inner", max_rows: int = None
+) -> Optional[str]:
+    """Raise when a merge would exceed ``max_rows`` rows.
+
+    Returns a warning for many-to-many merges below the limit, and None otherwise.
+    """
+    max_rows = MAX_MERGE_ROWS if max_rows is None else max_rows
+    rows = estimate_merge_rows(left, right, how)
+    duplicated = {side: idx.duplicate_count for side, idx in (("left", left), ("right", right))}
+    counts = ", ".join(f"{count} in {side}" for side, count in duplicated.items() if count)
+    if rows > max_rows:
+        reason = f" Duplicate values found in join key '{left.key}' ({counts})." if counts else ""
+        raise ValueError(
+            f"The {how} merge on '{left.key}' would produce {rows} rows, more than the limit "
+            f"of {max_rows}.{reason} Filter or deduplicate the inputs first."
+        )
+    if all(duplicated.values()):
+        return (
+            f"Warning: duplicate values in join key '{left.key}' ({counts}) make this a "
+            f"many-to-many merge of {rows} rows."
+        )
+    return None
+
+
+def _order_rows(how: str, left_rows: np.ndarray, right_rows: np.ndarray) -> np.ndarray:
+    """Permutation that reproduces the row order of pd.merge for a sorted join."""
+    if how in ("inner", "left"):
+        return np.argsort(left_rows, kind="stable")
+    if how == "right":
+        return np.argsort(right_rows, kind="stable")
+    return np.arange(len(left_rows))  # outer joins are sorted by key, like pd.merge
+
+
+def _indexed_merge(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    on: str,
+    how: str,
+    suffixes: Sequence[str],
+    indicator: bool,
+    left_index: KeyIndex,
+    right_index: KeyIndex,
+) -> pd.DataFrame:
+    keys, left_pos, right_pos = left_index.sorted_keys.join(
+        right_index.sorted_keys, how=how, return_indexers=True
+    )
+    if left_pos is None:
+        left_pos = np.arange(len(keys))
+    if right_pos is None:
+        right_pos = np.arange(len(keys))
+    left_rows = np.where(left_pos >= 0, left_index.positions[left_pos], -1)
+    right_rows = np.where(right_pos >= 0, right_index.positions[right_pos], -1)
+
+    order = _order_rows(how, left_rows, right_rows)
+    left_rows, right_rows, keys = left_rows[order], right_rows[order], keys.take(order)
+
+    overlap = (set(left.columns) & set(right.columns)) - {on}
+    # Rows are taken by position: -1 is not a label of the RangeIndex and is filled with NA
+    left_part = left.reset_index(drop=True).reindex(left_rows)
+    left_part[on] = keys.to_numpy()
+    left_part = left_part.rename(columns={c: f"{c}{suffixes[0]}" for c in overlap})
+    right_part = right.drop(columns=on).reset_index(drop=True).reindex(right_rows)
+    right_part = right_part.rename(columns={c: f"{c}{suffixes[1]}" for c in overlap})
+
+    left_part.index = right_part.index = pd.RangeIndex(len(keys))
+    merged = pd.concat([left_part, right_part], axis=1)
+    if indicator:
+        codes = np.where(left_rows < 0, 1, np.where(right_rows < 0, 0, 2))
+        merged["_merge"] = pd.Categorical.from_codes(codes, MERGE_INDICATOR_CATEGORIES)
+    return merged
+
+
+def merge_on_key(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    on: str,
+    how: str = "inner",
+    suffixes: Sequence[str] = ("_x", "_y"),
+    indicator: bool = False,
+    left_index: KeyIndex = None,
+    right_index: KeyIndex = None,
+) -> pd.DataFrame:
+    """Merge two frames on a single key.
+
+    When both sides come with a unique, null-free key index of the same dtype, the merge is a
+    linear walk over the pre-sorted keys instead of re-hashing both key columns. Otherwise it
+    falls back to ``pd.merge``. Both paths return the same frame.
+    """
+    if (
+        left_index is not None
+        and right_index is not None
+        and left_index.joinable
+        and right_index.joinable
+        and left_index.sorted_keys.dtype == right_index.sorted_keys.dtype
+        and len(left_index.positions) == len(left)
+        and len(right_index.positions) == len(right)
+    ):
+        return _indexed_merge(left, right, on, how, suffixes, indicator, left_index, right_index)
+    return pd.merge(left, right, on=on, how=how, suffixes=suffixes, indicator=indicator)
@@ -0,0 +1,386 @@
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ..utils.logger import CustomLogger
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERRORS = {
+    "APIConnectionError",
+    "InternalServerError",
+    "RateLimitError",
+    "ServiceUnavailableError",
+    "Timeout",
+}
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ModelConfig:
+    """Limits and defaults of one model. Limits of 0 disable the corresponding bucket."""
+
+    requests_per_minute: float = 60
+    tokens_per_minute: float = 60_000
+    max_tokens: int = 1024
+    temperature: float = 0.1
+    max_retries: int = 6
+    base_delay: float = 1.0  # seconds, doubled on every retry
+    max_delay: float = 60.0
+    cost_per_1k_input: float = 0.0  # USD per 1000 prompt tokens
+    cost_per_1k_output: float = 0.0  # USD per 1000 completion tokens
+
+
+MODEL_CONFIGS: Dict[str, ModelConfig] = {
+    "openai/gpt-4o": ModelConfig(
+        requests_per_minute=500,
+        tokens_per_minute=30_000,
+        cost_per_1k_input=0.0025,
+        cost_per_1k_output=0.01,
+    ),
+    "openai/gpt-4o-mini": ModelConfig(
+        requests_per_minute=500,
+        tokens_per_minute=200_000,
+        cost_per_1k_input=0.00015,
+        cost_per_1k_output=0.0006,
+    ),
+    "openai/gpt-4-turbo-2024-04-09": ModelConfig(
+        requests_per_minute=500,
+        tokens_per_minute=30_000,
+        cost_per_1k_input=0.01,
+        cost_per_1k_output=0.03,
+    ),
+}
+
+
+def model_config(model: str) -> ModelConfig:
+    return MODEL_CONFIGS.get(model) or ModelConfig()
+
+
+def usage_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    config = model_config(model)
+    return (
+        prompt_tokens * config.cost_per_1k_input + completion_tokens * config.cost_per_1k_output
+    ) / 1000
+
+
+def configure_model(model: str, **overrides) -> ModelConfig:
+    """Set (some of) the limits and defaults of a model."""
+    MODEL_CONFIGS[model] = replace(model_config(model), **overrides)
+    return MODEL_CONFIGS[model]
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens per second.
+
+    ``acquire`` blocks until the tokens are available. ``charge`` takes tokens without waiting
+    and may leave the bucket in debt, e.g. to correct an estimate with the actual usage.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1) -> float:
+        """Take ``amount`` tokens (at most the capacity), waiting as needed. Returns the wait."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                wait = (amount - self._tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+    def charge(self, amount: float):
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+
+@dataclass
+class SharedLimits:
+    """Limits shared by all clients of a process: the in-flight cap and the per-model buckets."""
+
+    max_in_flight: int = int(os.environ.get("DATA_AGENT_LLM_MAX_IN_FLIGHT", "4"))
+    buckets: Dict[str, Dict[str, TokenBucket]] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+
+    def buckets_for(self, model: str, config: ModelConfig) -> Dict[str, TokenBucket]:
+        with self._lock:
+            if model not in self.buckets:
+                self.buckets[model] = {
+                    name: TokenBucket(per_minute / 60.0, per_minute)
+                    for name, per_minute in (
+                        ("requests", config.requests_per_minute),
+                        ("tokens", config.tokens_per_minute),
+                    )
+                    if per_minute
+                }
+            return self.buckets[model]
+
+
+SHARED_LIMITS = SharedLimits()
+
+
+def estimate_tokens(messages: List[Dict], tools: List[Dict] = None, max_tokens: int = 0) -> int:
+    """Rough upper bound of the tokens of a request: prompt characters / 4 plus the output."""
+    text = json.dumps(messages, default=str) + json.dumps(tools or [], default=str)
+    return len(text) // CHARS_PER_TOKEN + max_tokens
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    return (
+        status in RETRYABLE_STATUS
+        or type(error).__name__ in RETRYABLE_ERRORS
+        or isinstance(error, (TimeoutError, ConnectionError))
+    )
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Seconds to wait according to the provider (``Retry-After`` in seconds or as a date)."""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class HeldStream:
+    """Iterates a streamed response, releasing its in-flight slot once it ends or is closed."""
+
+    def __init__(self, stream, semaphore: threading.BoundedSemaphore):
+        self._stream = iter(stream)
+        self._semaphore = semaphore
+        self._released = False
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._stream)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._semaphore.release()
+
+    def __del__(self):
+        self.close()
+
+
+class LLMClient:
+    """Calls the LLM provider within rate limits, with retries and a global in-flight cap.
+
+    Every request waits for the request and token buckets of its model, and for a slot of the
+    process-wide in-flight semaphore, so concurrent sessions share the provider limits instead
+    of failing in cascades. Retryable errors (429, 5xx, timeouts) are retried with jittered
+    exponential backoff, waiting at least as long as the provider's ``Retry-After``.
+    """
+
+    def __init__(
+        self,
+        completion_fn: Callable = None,
+        limits: SharedLimits = None,
+        sleep: Callable[[float], None] = time.sleep,
+        rng: random.Random = None,
+    ):
+        self.completion_fn = completion_fn
+        self.limits = limits or SHARED_LIMITS
+        self._sleep = sleep
+        self._rng = rng or random.Random()
+        self._stats_lock = threading.Lock()
+        self.calls = 0
+        self.retries = 0
+        self.waited = 0.0
+
+    def _count(self, calls: int = 0, retries: int = 0, waited: float = 0.0):
+        with self._stats_lock:
+            self.calls += calls
+            self.retries += retries
+            self.waited += waited
+
+    def _completion(self) -> Callable:
+        if self.completion_fn is None:
+            # litellm takes seconds to import, so it is only loaded once a response is needed
+            from litellm import completion
+
+            self.completion_fn = completion
+        return self.completion_fn
+
+    def backoff(self, attempt: int, error: Exception, config: ModelConfig) -> float:
+        """Full-jitter exponential backoff, never shorter than the provider's Retry-After."""
+        delay = self._rng.uniform(0, min(config.max_delay, config.base_delay * 2**attempt))
+        after = retry_after(error)
+        return delay if after is None else max(after + self._rng.uniform(0, 0.1 * after), delay)
+
+    def completion(self, model: str, messages: List[Dict], **kwargs) -> Any:
+        """``litellm.completion`` with the model's defaults, limits and retries."""
+        config = model_config(model)
+        kwargs.setdefault("temperature", config.temperature)
+        kwargs.setdefault("max_tokens", config.max_tokens)
+        buckets = self.limits.buckets_for(model, config)
+        estimate = estimate_tokens(messages, kwargs.get("tools"), kwargs["max_tokens"])
+
+        for attempt in range(config.max_retries + 1):
+            if "requests" in buckets:
+                self._count(waited=buckets["requests"].acquire())
+            if "tokens" in buckets:
+                self._count(waited=buckets["tokens"].acquire(estimate))
+            self.limits.in_flight.acquire()
+            try:
+                self._count(calls=1)
+                response = self._completion()(model=model, messages=messages, **kwargs)
+            except Exception as e:
+                self.limits.in_flight.release()
+                if not is_retryable(e) or attempt == config.max_retries:
+                    raise
+                delay = self.backoff(attempt, e, config)
+                self._count(retries=1)
+                logger.warning(
+                    f"LLM call to {model} failed ({type(e).__name__}), retry {attempt + 1} "
+                    f"of {config.max_retries} in {delay:.2f}s"
+                )
+                self._sleep(delay)
+                continue
+
+            if kwargs.get("stream"):
+                # The slot is held until the stream is consumed
+                return HeldStream(response, self.limits.in_flight)
+            self.limits.in_flight.release()
+            self._charge_usage(buckets, response, estimate)
+            return response
+
+    @staticmethod
+    def _charge_usage(buckets: Dict[str, TokenBucket], response: Any, estimate: int):
+        """Correct the token bucket with the usage reported by the provider."""
+        usage = getattr(response, "usage", None)
+        total = getattr(usage, "total_tokens", None)
+        if "tokens" in buckets and isinstance(total, int):
+            buckets["tokens"].charge(total - estimate)
+
+
+_CLIENT: Optional[LLMClient] = None
+
+
+def get_client() -> LLMClient:
+    """The process-wide client used by the response generators."""
+    global _CLIENT
+    if _CLIENT is None:
+        _CLIENT = LLMClient()
+    return _CLIENT
+
+
+def set_client(client: Optional[LLMClient]):
+    global _CLIENT
+    _CLIENT = client
+
+
+class ProviderError(Exception):
+    """Error raised by LocalProvider, shaped like the provider errors of litellm."""
+
+    def __init__(self, message: str, status_code: int, retry_after: float = None):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {} if retry_after is None else {"retry-after": str(retry_after)}
+        self.response = SimpleNamespace(status_code=status_code, headers=headers)
+
+
+class LocalProvider:
+    """Local stand-in for ``litellm.completion`` that injects latency and rate-limit errors.
+
+    Each call sleeps ``latency`` seconds and fails with a 429 with probability
+    ``rate_limit_probability``, or always while it has more than ``capacity`` calls in flight.
+    Successful calls return a text message, or the next of ``responses`` when given.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit_probability: float = 0.0,
+        capacity: int = None,
+        retry_after: float = None,
+        responses: List[Any] = None,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.rate_limit_probability = rate_limit_probability
+        self.capacity = capacity
+        self.retry_after = retry_after
+        self.responses = list(responses or [])
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def __call__(self, model: str, messages: List[Dict], **kwargs) -> Any:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            overloaded = self.capacity is not None and self.in_flight > self.capacity
+            limited = overloaded or self._rng.random() < self.rate_limit_probability
+            if limited:
+                self.rate_limited += 1
+        try:
+            time.sleep(self.latency)
+            if limited:
+                raise ProviderError("Rate limit exceeded", 429, self.retry_after)
+            with self._lock:
+                response = self.responses.pop(0) if self.responses else None
+            if response is not None:
+                return response
+            message = SimpleNamespace(content=f"Response of {model}", tool_calls=None)
+            return SimpleNamespace(
+                choices=[SimpleNamespace(message=message)],
+                usage=SimpleNamespace(total_tokens=estimate_tokens(messages)),
+            )
+        finally:
+            with self._lock:
+                self.in_flight -= 1
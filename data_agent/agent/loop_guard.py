@@ -0,0 +1,142 @@
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+from ..utils.logger import CustomLogger
+from .invocation import ToolInvocation
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+ESCALATION = "<unparsable response>"
+
+REPEAT_NOTE = (
+    "This exact call was already made in iteration {iteration}; its result is repeated above "
+    "instead of running it again. Use it, try a different step, or terminate."
+)
+STALL_NOTE = (
+    "The last {stalls} iterations made no progress (repeated calls, errors or unparsable "
+    "responses). Call the terminate tool now with the best answer you have."
+)
+
+
+@dataclass
+class LoopPolicy:
+    """When the agent loop answers repeated calls from earlier results, and when it stops.
+
+    ``window`` is the number of recent iterations checked for repeated (tool, args) calls and
+    for cycles of up to ``max_cycle_length`` calls. After ``stall_limit`` iterations in a row
+    without progress the agent is asked to terminate, and after ``force_after`` more the run is
+    stopped.
+    """
+
+    window: int = 10
+    max_cycle_length: int = 3
+    stall_limit: int = 4
+    force_after: int = 2
+
+
+def call_signature(invocation: ToolInvocation) -> str:
+    if invocation.is_escalation:
+        return ESCALATION
+    return json.dumps(
+        {"tool": invocation.tool, "args": invocation.args}, sort_keys=True, default=str
+    )
+
+
+class LoopGuard:
+    """Detects repeated calls, cycles and stalls across the iterations of one agent run."""
+
+    def __init__(self, policy: LoopPolicy = None):
+        self.policy = policy or LoopPolicy()
+        self._recent: Deque[str] = deque(maxlen=self.policy.window)
+        self._results: Dict[str, Tuple[int, dict]] = {}  # signature -> (iteration, result)
+        self.stalled_in_a_row = 0
+        self.repeats = 0
+        self.cycles = 0
+        self.stalls = 0
+        self.termination_requests = 0
+        self.forced_termination = False
+        self._requested = False  # termination was requested since the last progress
+
+    def previous_result(self, invocation: ToolInvocation) -> Optional[Tuple[int, dict]]:
+        """(iteration, result) of the same call within the window, if it was made."""
+        signature = call_signature(invocation)
+        if signature == ESCALATION or signature not in self._recent:
+            return None
+        return self._results.get(signature)
+
+    def repeated_result(self, invocation: ToolInvocation) -> Optional[dict]:
+        """The earlier result of a repeated call, with a nudge to move on."""
+        previous = self.previous_result(invocation)
+        if previous is None:
+            return None
+        iteration, result = previous
+        result = {k: v for k, v in result.items() if k != "tool_call_id"}
+        if invocation.call_id is not None:
+            result["tool_call_id"] = invocation.call_id
+        return {**result, "repeated_call": True, "note": REPEAT_NOTE.format(iteration=iteration)}
+
+    def _detect_cycle(self) -> Optional[int]:
+        recent = list(self._recent)
+        for length in range(2, self.policy.max_cycle_length + 1):
+            if len(recent) >= 2 * length and recent[-length:] == recent[-2 * length : -length]:
+                return length
+        return None
+
+    def record(
+        self,
+        invocation: ToolInvocation,
+        iteration: int,
+        result,
+        progressed: bool,
+        changed_data: bool = False,
+    ):
+        """Account for one iteration. ``progressed`` is False for errors and repeats.
+
+        ``changed_data`` is True when the call (re)assigned a dataframe alias: earlier results
+        may be stale then, so they are no longer used to answer repeated calls.
+        """
+        signature = call_signature(invocation)
+        self._recent.append(signature)
+        if changed_data:
+            self._results.clear()
+        if isinstance(result, dict) and result.get("repeated_call"):
+            self.repeats += 1
+        elif signature != ESCALATION and isinstance(result, dict):
+            self._results[signature] = (iteration, result)
+
+        cycle = self._detect_cycle()
+        if cycle is not None:
+            self.cycles += 1
+            logger.warning(f"The agent is cycling through the same {cycle} calls")
+        if progressed and cycle is None:
+            self.stalled_in_a_row = 0
+            self._requested = False
+        else:
+            self.stalled_in_a_row += 1
+            self.stalls += 1
+
+    def verdict(self) -> Optional[str]:
+        """None to go on, "request" to ask for termination, or "force" to stop the run."""
+        limit = self.policy.stall_limit
+        if self.stalled_in_a_row >= limit + self.policy.force_after:
+            self.forced_termination = True
+            return "force"
+        if self.stalled_in_a_row >= limit and not self._requested:
+            self._requested = True
+            self.termination_requests += 1
+            return "request"
+        return None
+
+    def stall_message(self) -> str:
+        return STALL_NOTE.format(stalls=self.stalled_in_a_row)
+
+    def metrics(self) -> dict:
+        return {
+            "repeats": self.repeats,
+            "cycles": self.cycles,
+            "stalls": self.stalls,
+            "termination_requests": self.termination_requests,
+            "forced_termination": self.forced_termination,
+        }
@@ -0,0 +1,188 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .key_index import KEY_INDEXES, KeyIndex, merge_on_key
+
+
+class MergePlan:
+    """A deferred ``pd.merge`` of two frames (or of other plans).
+
+    Nothing is merged when the plan is created. Columns are materialized on first access, and
+    only the requested columns (plus the join key) are taken from the inputs. Materialized
+    columns are cached, so later calls only merge the columns that were not seen before.
+
+    To keep the peak memory low, ``columns`` restricts the plan to a few input columns (plus
+    the key), and ``encode_keys`` merges string keys as shared integer codes. The key column of
+    the output is decoded to its original values, so the result does not change.
+    """
+
+    def __init__(
+        self,
+        left: Union[pd.DataFrame, "MergePlan"],
+        right: Union[pd.DataFrame, "MergePlan"],
+        on: str,
+        how: str = "inner",
+        suffixes: Sequence[str] = ("_x", "_y"),
+        columns: Sequence[str] = None,
+        encode_keys: bool = False,
+    ):
+        self.left = left
+        self.right = right
+        self.on = on
+        self.how = how
+        self.suffixes = tuple(suffixes)
+        self.selected = list(columns) if columns else None
+        self.encode_keys = encode_keys
+        self._sources = self._resolve_sources()
+        self._cache: Dict[str, pd.Series] = {}
+        self._key_indexes: Dict[str, KeyIndex] = {}
+        self._encoding: Optional[Tuple[np.ndarray, np.ndarray, pd.Index]] = None
+        self._encoded_indexes: Optional[Tuple[KeyIndex, KeyIndex]] = None
+
+    def _input_columns(self, frame: Union[pd.DataFrame, "MergePlan"]) -> List[str]:
+        if self.selected is None:
+            return list(frame.columns)
+        return [c for c in frame.columns if c == self.on or c in self.selected]
+
+    @staticmethod
+    def _fetch(frame: Union[pd.DataFrame, "MergePlan"], columns: List[str]) -> pd.DataFrame:
+        if isinstance(frame, MergePlan):
+            return frame.materialize(columns)
+        return frame[columns]
+
+    def key_index(self, key: str) -> KeyIndex:
+        """Key index over the merged output, built from the (cached) key column."""
+        if key not in self._key_indexes:
+            self._key_indexes[key] = KeyIndex.build(self.materialize([key])[key])
+        return self._key_indexes[key]
+
+    @staticmethod
+    def input_key_index(frame: Union[pd.DataFrame, "MergePlan"], key: str) -> KeyIndex:
+        if isinstance(frame, MergePlan):
+            return frame.key_index(key)
+        return KEY_INDEXES.for_frame(frame, key)
+
+    def _resolve_sources(self) -> Dict[str, Tuple[str, str]]:
+        """Map every output column to its (side, source column), mirroring pd.merge naming."""
+        left_cols = self._input_columns(self.left)
+        right_cols = self._input_columns(self.right)
+        for side, cols in (("left", left_cols), ("right", right_cols)):
+            if self.on not in cols:
+                raise KeyError(f"Join key '{self.on}' not found in {side} dataframe")
+        if self.selected is not None:
+            known = set(self.left.columns) | set(self.right.columns)
+            unknown = [c for c in self.selected if c not in known]
+            if unknown:
+                raise KeyError(f"Columns {unknown} not found in the dataframes to merge")
+
+        overlap = (set(left_cols) & set(right_cols)) - {self.on}
+        sources = {}
+        for col in left_cols:
+            name = f"{col}{self.suffixes[0]}" if col in overlap else col
+            sources[name] = ("left", col)
+        for col in right_cols:
+            if col == self.on:
+                continue
+            name = f"{col}{self.suffixes[1]}" if col in overlap else col
+            sources[name] = ("right", col)
+        return sources
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self._sources)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (len(self), len(self._sources))
+
+    def __len__(self) -> int:
+        return len(self.materialize([]))
+
+    def materialize(self, columns: Sequence[str] = None) -> pd.DataFrame:
+        """Return the merged frame restricted to ``columns`` (all columns if None)."""
+        columns = self.columns if columns is None else list(dict.fromkeys(columns))
+        unknown = [c for c in columns if c not in self._sources]
+        if unknown:
+            raise KeyError(f"Columns {unknown} not found in merged dataframe")
+
+        missing = [c for c in columns if c not in self._cache]
+        if missing or self.on not in self._cache:
+            self._merge_columns(missing)
+
+        index = self._cache[self.on].index
+        return pd.DataFrame({c: self._cache[c] for c in columns}, index=index)
+
+    @property
+    def uses_encoded_keys(self) -> bool:
+        if not self.encode_keys:
+            return False
+        dtype = self._fetch(self.left, [self.on])[self.on].dtype
+        return pd.api.types.is_string_dtype(dtype)
+
+    def _encoded_keys(self) -> Tuple[np.ndarray, np.ndarray, pd.Index]:
+        """Integer codes of the left and right keys over their shared sorted values.
+
+        Null keys get the code after the last value, so that they match each other and come
+        last in outer merges, like in ``pd.merge``.
+        """
+        if self._encoding is None:
+            left = self._fetch(self.left, [self.on])[self.on]
+            right = self._fetch(self.right, [self.on])[self.on]
+            codes, uniques = pd.factorize(pd.concat([left, right], ignore_index=True), sort=True)
+            codes[codes < 0] = len(uniques)
+            dtype = np.int32 if len(uniques) < np.iinfo(np.int32).max else np.int64
+            codes = codes.astype(dtype)
+            self._encoding = (codes[: len(left)], codes[len(left) :], uniques)
+        return self._encoding
+
+    def merge_key_indexes(self) -> Tuple[KeyIndex, KeyIndex]:
+        """Key indexes of the left and right inputs, over the integer codes when encoded."""
+        if not self.uses_encoded_keys:
+            return self.input_key_index(self.left, self.on), self.input_key_index(
+                self.right, self.on
+            )
+        if self._encoded_indexes is None:
+            left_codes, right_codes, _ = self._encoded_keys()
+            self._encoded_indexes = (
+                KeyIndex.build(pd.Series(left_codes, name=self.on)),
+                KeyIndex.build(pd.Series(right_codes, name=self.on)),
+            )
+        return self._encoded_indexes
+
+    def _merge_columns(self, columns: List[str]):
+        """Merge the key plus ``columns`` only, and add the results to the cache."""
+        projections = {"left": {}, "right": {}}
+        for name in columns:
+            side, source = self._sources[name]
+            if source != self.on:
+                projections[side][source] = name
+
+        left = self._fetch(self.left, [self.on] + list(projections["left"]))
+        right = self._fetch(self.right, [self.on] + list(projections["right"]))
+        encoded = self.uses_encoded_keys
+        if encoded:
+            left_codes, right_codes, uniques = self._encoded_keys()
+            left = left.assign(**{self.on: left_codes})
+            right = right.assign(**{self.on: right_codes})
+        left_index, right_index = self.merge_key_indexes()
+        merged = merge_on_key(
+            left.rename(columns=projections["left"]),
+            right.rename(columns=projections["right"]),
+            on=self.on,
+            how=self.how,
+            left_index=left_index,
+            right_index=right_index,
+        )
+        if encoded:
+            codes = merged[self.on].to_numpy()
+            keys = uniques.take(
+                np.where(codes == len(uniques), -1, codes), allow_fill=True, fill_value=np.nan
+            )
+            merged[self.on] = pd.Series(keys, index=merged.index)
+        for name in merged.columns:
+            self._cache.setdefault(name, merged[name])
+
+    def __repr__(self) -> str:
+        return f"MergePlan(on={self.on!r}, how={self.how!r}, columns={len(self._sources)})"
@@ -0,0 +1,144 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Hashable, List, Sequence
+
+import pandas as pd
+import pyarrow as pa
+
+from ..utils.logger import CustomLogger
+from .shared_frames import SharedFrames
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+# Frames with fewer columns are described serially: the pool does not pay off
+PARALLEL_MIN_COLUMNS = int(os.environ.get("DATA_AGENT_DESCRIBE_MIN_COLUMNS", 64))
+DESCRIBE_WORKERS = int(os.environ.get("DATA_AGENT_DESCRIBE_WORKERS", os.cpu_count() or 1))
+
+_process_pool: ProcessPoolExecutor = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Process pool shared by all describe calls, started on first use."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            context = multiprocessing.get_context("spawn")
+            _process_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        return _process_pool
+
+
+def describe_series(frame: pd.DataFrame, positions: Sequence[int]) -> List[pd.Series]:
+    """``describe()`` of the columns at ``positions``, like ``describe(include="all")`` does."""
+    return [frame.iloc[:, i].describe() for i in positions]
+
+
+def _describe_shared(path: str, columns: List[str]) -> List[pd.Series]:
+    """Worker task: describe columns of a frame memory-mapped from a shared Arrow file."""
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all().select(columns)
+        frame = table.to_pandas(split_blocks=True)
+    return describe_series(frame, range(len(columns)))
+
+
+def combine_descriptions(columns: pd.Index, descriptions: List[pd.Series]) -> pd.DataFrame:
+    """Assemble per-column descriptions exactly like ``DataFrame.describe``.
+
+    The rows are the union of the statistics of all columns, shortest descriptions first.
+    """
+    names: List[Hashable] = []
+    seen = set()
+    for index in sorted((d.index for d in descriptions), key=len):
+        for name in index:
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+    result = pd.concat(
+        [d.reindex(names) for d in descriptions], axis=1, ignore_index=True, sort=False
+    )
+    result.columns = columns.copy()
+    return result
+
+
+def partition_columns(frame: pd.DataFrame, parts: int) -> List[List[int]]:
+    """Column positions grouped by dtype, each group split into chunks for about ``parts`` tasks.
+
+    Columns of one chunk share a dtype, so they convert to and from Arrow as a single block.
+    """
+    groups: Dict[str, List[int]] = {}
+    for i, dtype in enumerate(frame.dtypes):
+        groups.setdefault(str(dtype), []).append(i)
+    size = max(1, math.ceil(frame.shape[1] / max(1, parts)))
+    return [group[i : i + size] for group in groups.values() for i in range(0, len(group), size)]
+
+
+def shareable_positions(frame: pd.DataFrame) -> List[int]:
+    """Columns that come back from Arrow with the same dtype, and can be read by other processes.
+
+    Object columns may hold mixed types that Arrow converts differently, so they stay local.
+    """
+    candidates = [i for i, dtype in enumerate(frame.dtypes) if dtype != object]
+    if not candidates or not frame.columns.is_unique:
+        return []
+    empty = frame.iloc[:0, candidates]
+    try:
+        roundtrip = pa.Table.from_pandas(empty, preserve_index=False).to_pandas()
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        return []
+    return [i for i, a, b in zip(candidates, empty.dtypes, roundtrip.dtypes) if a == b]
+
+
+def describe_frame(
+    frame: pd.DataFrame, max_workers: int = None, executor: str = None
+) -> pd.DataFrame:
+    """``frame.describe(include="all")``, with the columns described in parallel.
+
+    ``executor`` is "process", "thread" or "serial". By default frames with at least
+    ``PARALLEL_MIN_COLUMNS`` columns are described in a process pool and smaller frames
+    serially. Processes read their columns from an Arrow file in shared memory instead of
+    receiving a pickled copy; columns that Arrow cannot round-trip are described in this
+    process. The result is identical to the serial ``describe``.
+    """
+    max_workers = max_workers or DESCRIBE_WORKERS
+    if executor is None:
+        wide = frame.shape[1] >= PARALLEL_MIN_COLUMNS
+        executor = "process" if wide and max_workers > 1 else "serial"
+    if executor == "serial" or frame.shape[1] == 0:
+        return frame.describe(include="all")
+
+    descriptions: Dict[int, pd.Series] = {}
+    local = list(range(frame.shape[1]))
+    shared = None
+    futures = []
+    if executor == "process":
+        shared_positions = shareable_positions(frame)
+        if shared_positions:
+            shared = SharedFrames(allow_pickle=False)
+            subset = frame.iloc[:, shared_positions].reset_index(drop=True)
+            path = shared.export(subset)["path"]
+            pool: Executor = _get_process_pool(max_workers)
+            for chunk in partition_columns(subset, max_workers):
+                columns = [subset.columns[i] for i in chunk]
+                positions = [shared_positions[i] for i in chunk]
+                futures.append((positions, pool.submit(_describe_shared, path, columns)))
+            local = sorted(set(local) - set(shared_positions))
+    elif executor != "thread":
+        raise ValueError(f"Unknown executor {executor!r}")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as threads:
+            local_frame = frame.iloc[:, local]
+            for chunk in partition_columns(local_frame, max_workers):
+                positions = [local[i] for i in chunk]
+                futures.append((positions, threads.submit(describe_series, local_frame, chunk)))
+            for positions, future in futures:
+                descriptions.update(zip(positions, future.result()))
+    finally:
+        if shared is not None:
+            shared.close()
+
+    ordered = [descriptions[i] for i in range(frame.shape[1])]
+    return combine_descriptions(frame.columns, ordered)
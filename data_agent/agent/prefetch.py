@@ -0,0 +1,168 @@
+import fnmatch
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from ..utils.io_utils import read_frame
+from ..utils.logger import CustomLogger
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+DATE_IN_NAME = re.compile(r"(\d{8})")
+
+
+class Prefetcher:
+    """Speculatively loads the data files the agent is likely to request next.
+
+    After ``list_files`` the agent nearly always loads the newest snapshots. The prefetcher
+    reads those in a background thread pool while the LLM is still thinking, so the following
+    ``load_dataframe`` call is served from memory. Prefetched frames stay within a memory
+    budget, and are discarded when the file changes on disk.
+    """
+
+    def __init__(
+        self,
+        data_dir: str = None,
+        patterns: Sequence[str] = ("*.parquet",),
+        max_files: int = 2,
+        memory_budget_bytes: int = 2 * 1024**3,
+        max_workers: int = 2,
+    ):
+        self.data_dir = data_dir
+        self.patterns = tuple(patterns)
+        self.max_files = max_files
+        self.memory_budget_bytes = memory_budget_bytes
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._signatures: Dict[str, Tuple[int, int]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}  # monotonic time of the prefetch or last get
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def rank(self, files: Sequence[str]) -> List[str]:
+        """Files matching the patterns, newest snapshot (date in the name) first."""
+        matching = [f for f in files if any(fnmatch.fnmatch(f, p) for p in self.patterns)]
+
+        def sort_key(name):
+            match = DATE_IN_NAME.search(name)
+            return (match.group(1) if match else "", name)
+
+        return sorted(matching, key=sort_key, reverse=True)[: self.max_files]
+
+    def prefetch(self, files: Sequence[str], data_dir: str = None) -> List[str]:
+        """Start loading the most likely candidates among ``files``. Returns the scheduled paths."""
+        data_dir = data_dir or self.data_dir or ""
+        scheduled = []
+        for name in self.rank(files):
+            path = os.path.abspath(os.path.join(data_dir, name))
+            with self._lock:
+                if path in self._futures or not os.path.isfile(path):
+                    continue
+                # The on-disk size is a lower bound of the in-memory size of the frame
+                if self.used_bytes + os.path.getsize(path) > self.memory_budget_bytes:
+                    logger.debug(f"Prefetch of {path} skipped: memory budget exhausted")
+                    continue
+                self._signatures[path] = self._signature(path)
+                self._sizes[path] = os.path.getsize(path)
+                self._futures[path] = self._executor.submit(self._load, path)
+                self._last_used[path] = time.monotonic()
+            scheduled.append(path)
+        if scheduled:
+            logger.info(f"Prefetching {len(scheduled)} file(s): {scheduled}")
+        return scheduled
+
+    def _load(self, path: str) -> pd.DataFrame:
+        df = read_frame(path)
+        size = int(df.memory_usage(deep=True).sum())
+        with self._lock:
+            others = sum(s for p, s in self._sizes.items() if p != path)
+            if others + size > self.memory_budget_bytes:
+                self._discard(path)
+                raise MemoryError(f"Prefetched {path} does not fit in the memory budget")
+            self._sizes[path] = size
+        return df
+
+    def _discard(self, path: str):
+        self._futures.pop(path, None)
+        self._signatures.pop(path, None)
+        self._sizes.pop(path, None)
+        self._last_used.pop(path, None)
+
+    def get(self, path: str) -> Optional[pd.DataFrame]:
+        """Return the prefetched frame for a path (waiting if it is still loading), or None."""
+        path = os.path.abspath(path)
+        with self._lock:
+            future = self._futures.get(path)
+            if future is not None and self._signatures.get(path) != self._signature(path):
+                self._discard(path)  # the file changed since it was prefetched
+                future = None
+        if future is None:
+            self.misses += 1
+            return None
+        try:
+            df = future.result()
+        except Exception as e:
+            logger.debug(f"Prefetch of {path} failed: {e}")
+            with self._lock:
+                self._discard(path)
+            self.misses += 1
+            return None
+        with self._lock:
+            if path in self._futures:
+                self._last_used[path] = time.monotonic()
+        self.hits += 1
+        return df
+
+    def evict_idle(self, max_idle_seconds: float) -> int:
+        """Discard the loaded frames not asked for in the last ``max_idle_seconds``."""
+        cutoff = time.monotonic() - max_idle_seconds
+        with self._lock:
+            idle = [
+                path
+                for path, future in self._futures.items()
+                if future.done() and self._last_used.get(path, 0) <= cutoff
+            ]
+            for path in idle:
+                self._discard(path)
+        return len(idle)
+
+    def clear(self):
+        with self._lock:
+            for path in list(self._futures):
+                self._discard(path)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.clear()
+
+
+_ACTIVE_PREFETCHER: Optional[Prefetcher] = None
+
+
+def set_prefetcher(prefetcher: Optional[Prefetcher]):
+    """Make a prefetcher the one consulted by the file-loading actions (None disables it)."""
+    global _ACTIVE_PREFETCHER
+    _ACTIVE_PREFETCHER = prefetcher
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    return _ACTIVE_PREFETCHER
@@ -0,0 +1,216 @@
+import argparse
+import cProfile
+import glob
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..utils.logger import CustomLogger
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+PROFILE_DIR = os.environ.get("DATA_AGENT_PROFILE_DIR", "profiles")
+
+
+def new_session_id() -> str:
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+
+def cpu_summary(profile: cProfile.Profile, top: int) -> List[dict]:
+    """The ``top`` functions of a profile by cumulative time."""
+    stats = pstats.Stats(profile).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+def allocation_summary(snapshot: tracemalloc.Snapshot, top: int) -> List[dict]:
+    """The ``top`` source lines by memory still allocated at the end of the call."""
+    snapshot = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+    )
+    return [
+        {"line": str(stat.traceback[0]), "size": stat.size, "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
+
+
+class ProfileStore:
+    """Profiles of actions on disk, one JSON record per call in ``<directory>/<session>/``.
+
+    The cProfile stats of every call are kept next to its record (``.prof``), so a single call
+    can be inspected further with ``pstats`` or a profile viewer.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR):
+        self.directory = directory
+
+    def save(self, record: dict, profile: cProfile.Profile = None) -> str:
+        session_dir = os.path.join(self.directory, record["session"])
+        os.makedirs(session_dir, exist_ok=True)
+        stem = f"{record['iteration'] or 0:04d}-{record['tool']}"
+        path, n = os.path.join(session_dir, stem), 1
+        while os.path.exists(f"{path}.json"):
+            n += 1
+            path = os.path.join(session_dir, f"{stem}-{n}")
+        if profile is not None:
+            profile.dump_stats(f"{path}.prof")
+        with open(f"{path}.json", "w") as f:
+            json.dump(record, f, indent=2, default=str)
+        return f"{path}.json"
+
+    def records(self, session: str = None) -> Iterable[dict]:
+        pattern = os.path.join(self.directory, session or "*", "*.json")
+        for path in sorted(glob.glob(pattern)):
+            with open(path) as f:
+                yield {**json.load(f), "path": path}
+
+    def worst(self, n: int = 10, by: str = "seconds", tool: str = None) -> List[dict]:
+        """The ``n`` calls with the highest ``by`` (seconds or peak_bytes) across sessions."""
+        records = [r for r in self.records() if tool is None or r["tool"] == tool]
+        return sorted(records, key=lambda r: r.get(by) or 0, reverse=True)[:n]
+
+
+class ActionProfiler:
+    """Opt-in CPU (cProfile) and allocation (tracemalloc) profiling of actions.
+
+    Calls of ``tools`` are always profiled. With ``slow_seconds``, every call is profiled and
+    only kept when it took at least that long, since the latency is only known afterwards.
+    Profiling slows the calls down, so it is meant to be turned on while investigating.
+    """
+
+    _lock = threading.Lock()  # tracemalloc is process-wide: profile one call at a time
+
+    def __init__(
+        self,
+        store: ProfileStore = None,
+        tools: Iterable[str] = (),
+        slow_seconds: float = None,
+        session: str = None,
+        top: int = 15,
+    ):
+        self.store = store or ProfileStore()
+        self.tools = set(tools)
+        self.slow_seconds = slow_seconds
+        self.session = session or new_session_id()
+        self.top = top
+
+    def wants(self, tool: str) -> bool:
+        return tool in self.tools or self.slow_seconds is not None
+
+    def run(self, action, args: dict, iteration: Optional[int] = None) -> Any:
+        """Execute the action, profiling it when selected."""
+        if not self.wants(action.name):
+            return action.execute(**args)
+
+        with self._lock:
+            was_tracing = tracemalloc.is_tracing()
+            if was_tracing:
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+            profile = cProfile.Profile()
+            error = None
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                return action.execute(**args)
+            except Exception as e:
+                error = repr(e)
+                raise
+            finally:
+                profile.disable()
+                seconds = time.perf_counter() - start
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if not was_tracing:
+                    tracemalloc.stop()
+                if action.name in self.tools or seconds >= self.slow_seconds:
+                    record = {
+                        "session": self.session,
+                        "iteration": iteration,
+                        "tool": action.name,
+                        "args": args,
+                        "seconds": round(seconds, 6),
+                        "peak_bytes": peak,
+                        "error": error,
+                        "cpu": cpu_summary(profile, self.top),
+                        "allocations": allocation_summary(snapshot, self.top),
+                    }
+                    path = self.store.save(record, profile)
+                    logger.info(f"Profile of {action.name} ({seconds:.3f}s) written to {path}")
+
+
+def summarize_records(records: Iterable[dict]) -> Dict[str, dict]:
+    """Calls, total seconds and max peak bytes per tool."""
+    summary: Dict[str, dict] = {}
+    for record in records:
+        entry = summary.setdefault(record["tool"], {"calls": 0, "seconds": 0.0, "peak_bytes": 0})
+        entry["calls"] += 1
+        entry["seconds"] += record["seconds"]
+        entry["peak_bytes"] = max(entry["peak_bytes"], record["peak_bytes"])
+    return summary
+
+
+def format_record(record: dict) -> str:
+    hottest = record["cpu"][0]["function"] if record["cpu"] else "-"
+    return (
+        f"{record['seconds']:>9.3f}s {record['peak_bytes'] / 2**20:>9.1f} MiB  "
+        f"{record['session']}#{record['iteration']}  {record['tool']}  {hottest}"
+    )
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Inspect the profiles of agent actions.")
+    parser.add_argument("--dir", default=PROFILE_DIR, help="Profile store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worst = commands.add_parser("worst", help="List the worst calls across sessions")
+    worst.add_argument("-n", type=int, default=10)
+    worst.add_argument("--by", choices=["seconds", "peak_bytes"], default="seconds")
+    worst.add_argument("--tool")
+    commands.add_parser("tools", help="Total time and peak memory per tool")
+    show = commands.add_parser("show", help="Show the profiles of a session")
+    show.add_argument("session")
+    show.add_argument("--iteration", type=int)
+    args = parser.parse_args(argv)
+
+    store = ProfileStore(args.dir)
+    if args.command == "worst":
+        for record in store.worst(args.n, by=args.by, tool=args.tool):
+            print(format_record(record))
+        return
+    if args.command == "tools":
+        summary = summarize_records(store.records())
+        for tool, entry in sorted(summary.items(), key=lambda i: i[1]["seconds"], reverse=True):
+            print(
+                f"{entry['seconds']:>9.3f}s {entry['peak_bytes'] / 2**20:>9.1f} MiB "
+                f"{entry['calls']:>5} calls  {tool}"
+            )
+        return
+    for record in store.records(args.session):
+        if args.iteration is not None and record["iteration"] != args.iteration:
+            continue
+        print(format_record(record))
+        for row in record["cpu"]:
+            print(f"    {row['cumtime']:>9.4f}s cum {row['calls']:>8} calls  {row['function']}")
+        for row in record["allocations"]:
+            print(f"    {row['size'] / 2**10:>9.1f} KiB {row['count']:>8} blocks {row['line']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+from typing import List, Literal, Optional
+
+import pandas as pd
+from pydantic import BaseModel, Field, model_validator
+
+from .filters import FilterCondition, check_columns, filter_mask, parse_filters
+
+MAX_QUERY_ROWS = 200
+
+AggregationFunction = Literal[
+    "count", "sum", "mean", "median", "min", "max", "std", "nunique", "first", "last"
+]
+
+
+def aggregate_column(series: pd.Series, function: str):
+    """An aggregate of a whole column; first/last skip nulls, as they do per group."""
+    if function in ("first", "last"):
+        values = series.dropna()
+        if values.empty:
+            return None
+        return values.iloc[0] if function == "first" else values.iloc[-1]
+    return series.agg(function)
+
+
+class Aggregation(BaseModel):
+    """One aggregate of a column, named ``<column>_<function>`` unless ``name`` is given."""
+
+    column: str = Field(..., description="The column to aggregate")
+    function: AggregationFunction = Field(..., description="The aggregation function")
+    name: Optional[str] = Field(None, description="Name of the output column")
+
+    @property
+    def output_name(self) -> str:
+        return self.name or f"{self.column}_{self.function}"
+
+
+class SortKey(BaseModel):
+    column: str = Field(..., description="An output column to sort by")
+    ascending: bool = Field(True, description="Sort ascending (default) or descending")
+
+
+class QueryPipeline(BaseModel):
+    """select -> filter -> group by / aggregate -> sort -> head, run as a single pandas chain."""
+
+    select: List[str] = Field(
+        default_factory=list, description="Columns to keep when not aggregating (all if empty)"
+    )
+    filters: List[FilterCondition] = Field(
+        default_factory=list,
+        description="Only keep the rows matching all of these conditions, e.g. "
+        '[{"column": "sector", "op": "==", "value": "Banks"}]',
+    )
+    group_by: List[str] = Field(default_factory=list, description="Columns to group by")
+    aggregations: List[Aggregation] = Field(
+        default_factory=list,
+        description='Aggregates per group, e.g. [{"column": "score", "function": "mean"}]; '
+        "without group_by they are computed over all filtered rows",
+    )
+    sort: List[SortKey] = Field(default_factory=list, description="Output columns to sort by")
+    limit: int = Field(
+        20, ge=1, le=MAX_QUERY_ROWS, description=f"Rows to return (at most {MAX_QUERY_ROWS})"
+    )
+
+    @model_validator(mode="after")
+    def check_stages(self) -> "QueryPipeline":
+        parse_filters(self.filters)
+        if self.group_by and not self.aggregations:
+            raise ValueError("group_by needs at least one aggregation")
+        if self.select and self.aggregations:
+            raise ValueError("select only applies without aggregations; use group_by instead")
+        names = [a.output_name for a in self.aggregations]
+        if len(set(names)) != len(names) or set(names) & set(self.group_by):
+            raise ValueError(f"Duplicate output column names in {self.group_by + names}")
+        return self
+
+    def input_columns(self, available: List[str]) -> List[str]:
+        """The columns the pipeline reads, so that only these are materialized."""
+        if self.aggregations:
+            output = self.group_by + [a.column for a in self.aggregations]
+        else:
+            output = self.select or list(available)
+        return list(dict.fromkeys(output + [f.column for f in self.filters]))
+
+    def output_columns(self, available: List[str]) -> List[str]:
+        if self.aggregations:
+            return self.group_by + [a.output_name for a in self.aggregations]
+        return self.select or list(available)
+
+    def validate_columns(self, available: List[str]):
+        check_columns(available, self.input_columns(available), self.filters)
+        output = self.output_columns(available)
+        unknown = [k.column for k in self.sort if k.column not in output]
+        if unknown:
+            raise ValueError(f"Sort column(s) {unknown} are not in the output {output}")
+
+    def run(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Run the pipeline over a frame holding (at least) the input columns."""
+        if self.filters:
+            df = df[filter_mask(df, self.filters)]
+        if self.aggregations:
+            named = {a.output_name: (a.column, a.function) for a in self.aggregations}
+            if self.group_by:
+                df = df.groupby(self.group_by, dropna=False, observed=True, sort=False)
+                df = df.agg(**named).reset_index()
+            else:
+                df = pd.DataFrame(
+                    {name: [aggregate_column(df[c], f)] for name, (c, f) in named.items()}
+                )
+        else:
+            df = df[self.output_columns(list(df.columns))]
+        if self.sort:
+            df = df.sort_values(
+                [k.column for k in self.sort],
+                ascending=[k.ascending for k in self.sort],
+                kind="stable",
+            )
+        return df
@@ -0,0 +1,191 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, MutableMapping, Optional, Tuple, Union
+
+import pandas as pd
+
+from ..utils.logger import CustomLogger
+from .merge_plan import MergePlan
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+# Sessions share the column buffers of stored frames, which is only safe with copy-on-write
+# (always on from pandas 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+Entry = Union[pd.DataFrame, MergePlan]
+
+# Budget of the frames kept by the process-wide store (least recently used are dropped first)
+FRAME_STORE_BYTES = int(os.environ.get("DATA_AGENT_FRAME_STORE_BYTES", 4 * 1024**3))
+
+
+class FrameStore:
+    """Process-wide store of the frames loaded from files, shared by all sessions.
+
+    A file is read once per version on disk (path, mtime and size), also when several sessions
+    ask for it at the same time. Every caller gets a shallow copy of the stored frame: with
+    copy-on-write the copies share the column buffers, and a session that modifies its copy
+    gets its own buffers without affecting the store or the other sessions.
+    """
+
+    def __init__(self, max_bytes: int = FRAME_STORE_BYTES):
+        self.max_bytes = max_bytes
+        self._frames: "OrderedDict[Tuple, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._loading: Dict[Tuple, threading.Lock] = {}
+        self._last_used: Dict[Tuple, float] = {}  # monotonic time of the last get
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+
+    @staticmethod
+    def _key(path: str) -> Tuple[str, int, int]:
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def used_bytes(self) -> int:
+        return sum(size for _, size in self._frames.values())
+
+    def _cached(self, key: Tuple) -> Optional[pd.DataFrame]:
+        entry = self._frames.get(key)
+        if entry is None:
+            return None
+        self._frames.move_to_end(key)
+        self._last_used[key] = time.monotonic()
+        self.hits += 1
+        return entry[0].copy(deep=False)
+
+    def get(self, path: str, loader: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """The frame of a file, read with ``loader`` unless it is stored already."""
+        key = self._key(path)
+        with self._lock:
+            frame = self._cached(key)
+            if frame is not None:
+                return frame
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:  # concurrent sessions wait for a single read of the file
+            with self._lock:
+                frame = self._cached(key)
+                if frame is not None:
+                    return frame
+            frame = loader(path)
+            self._add(key, frame)
+        return frame.copy(deep=False)
+
+    def _add(self, key: Tuple, frame: pd.DataFrame):
+        size = int(frame.memory_usage(deep=True).sum())
+        with self._lock:
+            self._loading.pop(key, None)
+            self.loads += 1
+            # Older versions of the file are not served anymore
+            for stale in [k for k in self._frames if k[0] == key[0]]:
+                self._drop(stale)
+            if size > self.max_bytes:
+                logger.debug(f"{key[0]} is not stored: {size} bytes exceed the store budget")
+                return
+            self._frames[key] = (frame, size)
+            self._last_used[key] = time.monotonic()
+            while self.used_bytes > self.max_bytes:
+                evicted = next(iter(self._frames))
+                self._drop(evicted)
+                logger.debug(f"Frame of {evicted[0]} evicted from the store")
+
+    def _drop(self, key: Tuple):
+        del self._frames[key]
+        self._last_used.pop(key, None)
+
+    def evict_idle(self, max_idle_seconds: float) -> int:
+        """Drop the frames not asked for in the last ``max_idle_seconds``. Returns their number."""
+        cutoff = time.monotonic() - max_idle_seconds
+        with self._lock:
+            idle = [k for k in self._frames if self._last_used.get(k, 0) <= cutoff]
+            for key in idle:
+                self._drop(key)
+        for key in idle:
+            logger.debug(f"Idle frame of {key[0]} evicted from the store")
+        return len(idle)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._last_used.clear()
+
+
+FRAME_STORE = FrameStore()
+
+_DEFAULT_REGISTRY: Dict[str, Entry] = {}
+_CURRENT_REGISTRY: ContextVar[Optional[Dict[str, Entry]]] = ContextVar(
+    "data_agent_registry", default=None
+)
+
+
+def current_registry() -> Dict[str, Entry]:
+    """Registry of the running session, or the process default outside of sessions."""
+    registry = _CURRENT_REGISTRY.get()
+    return _DEFAULT_REGISTRY if registry is None else registry
+
+
+def registry_snapshot() -> Dict[str, Entry]:
+    """The entries of the current registry, to tell later whether an alias was (re)assigned."""
+    return dict(current_registry())
+
+
+def registry_changed(snapshot: Dict[str, Entry]) -> bool:
+    """Whether an alias was added, removed or overwritten since the snapshot was taken."""
+    registry = current_registry()
+    if registry.keys() != snapshot.keys():
+        return True
+    return any(registry[alias] is not entry for alias, entry in snapshot.items())
+
+
+@contextmanager
+def use_registry(registry: Optional[Dict[str, Entry]]):
+    """Make ``registry`` the DATAFRAMES of the current thread / task (no-op for None)."""
+    if registry is None:
+        yield current_registry()
+        return
+    token = _CURRENT_REGISTRY.set(registry)
+    try:
+        yield registry
+    finally:
+        _CURRENT_REGISTRY.reset(token)
+
+
+class RegistryProxy(MutableMapping):
+    """The alias -> frame registry of the current session, behaving like a dict.
+
+    Sessions (e.g. an Environment created with its own registry) see only their own aliases.
+    Code running outside of a session uses a process-wide default registry.
+    """
+
+    def __getitem__(self, alias: str) -> Entry:
+        return current_registry()[alias]
+
+    def __setitem__(self, alias: str, entry: Entry):
+        current_registry()[alias] = entry
+
+    def __delitem__(self, alias: str):
+        del current_registry()[alias]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(current_registry()))
+
+    def __len__(self) -> int:
+        return len(current_registry())
+
+    def __contains__(self, alias) -> bool:
+        return alias in current_registry()
+
+    def clear(self):
+        current_registry().clear()
+
+    def __repr__(self) -> str:
+        return f"RegistryProxy({current_registry()!r})"
@@ -0,0 +1,172 @@
+import json
+import os
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Optional, Set, Union
+
+from pydantic import ValidationError
+
+from ..utils.logger import CustomLogger
+from .actions import ActionRegistry
+from .agent import TEXT_MODEL, TOOL_MODEL, Prompt, generate_response
+from .invocation import ToolInvocation
+from .llm_client import usage_cost
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+FAST_MODEL = os.environ.get("DATA_AGENT_FAST_MODEL", "openai/gpt-4o-mini")
+
+
+@dataclass
+class RoutingPolicy:
+    """Which model answers a tool-calling turn, and when to escalate to the strong model.
+
+    Turns go to ``fast_model`` first. The turn is regenerated by ``strong_model`` when the fast
+    response cannot be parsed into a tool call, names an unknown tool, has invalid arguments,
+    or calls one of ``strong_tools`` (the final ``terminate`` report by default). When
+    ``routine_tools`` is set, any other tool picked by the fast model is escalated as well.
+    After ``sticky_after`` escalations in a row every turn goes to the strong model.
+    """
+
+    fast_model: str = FAST_MODEL
+    strong_model: str = TOOL_MODEL
+    strong_tools: Set[str] = field(default_factory=lambda: {"terminate"})
+    routine_tools: Optional[Set[str]] = None
+    sticky_after: int = 3
+
+    @property
+    def tiered(self) -> bool:
+        return self.fast_model != self.strong_model
+
+
+POLICIES: Dict[str, RoutingPolicy] = {
+    "strong": RoutingPolicy(fast_model=TOOL_MODEL),
+    "tiered": RoutingPolicy(),
+    "routine": RoutingPolicy(
+        routine_tools={
+            "list_files",
+            "load_dataframe",
+            "list_column_names_of_dataframe",
+            "call_dataframe_method",
+        }
+    ),
+}
+
+
+@dataclass
+class ModelUsage:
+    calls: int = 0
+    seconds: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+
+class ModelRouter:
+    """Sends tool-calling turns to a fast model and escalates them to a strong model.
+
+    Drop-in replacement of ``generate_response`` wrapping any response generator (e.g. the
+    StreamingResponseGenerator). The model of each call is passed in ``prompt.metadata``, and
+    the calls, latency, tokens and cost of every model are accounted for in ``summary``.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[Prompt], Union[str, ToolInvocation]] = generate_response,
+        policy: RoutingPolicy = None,
+        action_registry: ActionRegistry = None,
+    ):
+        self.generate = generate
+        self.policy = policy or RoutingPolicy()
+        self.action_registry = action_registry
+        self.streams_final_report = getattr(generate, "streams_final_report", False)
+        self.usage: Dict[str, ModelUsage] = {}
+        self.routes = Counter()
+        self.escalations = Counter()
+        self._escalated_in_a_row = 0
+
+    def _call(self, prompt: Prompt, model: str, route: str, stream_text: bool = True):
+        prompt.metadata.update(model=model, stream_text=stream_text, usage=None)
+        start = time.perf_counter()
+        try:
+            return self.generate(prompt)
+        finally:
+            self._account(model, time.perf_counter() - start, prompt.metadata.get("usage"))
+            self.routes[route] += 1
+
+    def _account(self, model: str, seconds: float, usage):
+        record = self.usage.setdefault(model, ModelUsage())
+        record.calls += 1
+        record.seconds += seconds
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        record.prompt_tokens += prompt_tokens
+        record.completion_tokens += completion_tokens
+        record.cost += usage_cost(model, prompt_tokens, completion_tokens)
+
+    def escalation_reason(self, prompt: Prompt, response) -> Optional[str]:
+        """Why a response of the fast model must be regenerated by the strong model, if at all."""
+        if isinstance(response, str):
+            try:
+                parsed = json.loads(response)
+                response = ToolInvocation(parsed["tool"], parsed.get("args") or {})
+            except Exception:
+                return "parse_error"
+        if response.is_escalation:
+            return "parse_error"
+        tools = {t["function"]["name"] for t in prompt.tools}
+        if response.tool not in tools:
+            return "unknown_tool"
+        if response.tool in self.policy.strong_tools:
+            return "strong_tool"
+        if self.policy.routine_tools is not None and response.tool not in self.policy.routine_tools:
+            return "not_routine"
+        action = self.action_registry.get_action(response.tool) if self.action_registry else None
+        if action is not None:
+            try:
+                action.validate_args(response.args)
+            except ValidationError:
+                return "invalid_arguments"
+        return None
+
+    def __call__(self, prompt: Prompt) -> Union[str, ToolInvocation]:
+        if not prompt.tools:
+            return self._call(prompt, prompt.metadata.get("model") or TEXT_MODEL, "text")
+        sticky = self._escalated_in_a_row >= self.policy.sticky_after
+        if not self.policy.tiered or sticky:
+            return self._call(prompt, self.policy.strong_model, "strong")
+
+        # The final report of the fast model is replaced, so it is not streamed to the user,
+        # and only tool calls that will not be escalated may be dispatched early
+        on_tool_call = prompt.metadata.get("on_tool_call")
+        if on_tool_call is not None:
+            prompt.metadata["on_tool_call"] = lambda invocation: (
+                on_tool_call(invocation)
+                if self.escalation_reason(prompt, invocation) is None
+                else None
+            )
+        try:
+            response = self._call(prompt, self.policy.fast_model, "fast", stream_text=False)
+        finally:
+            if on_tool_call is not None:
+                prompt.metadata["on_tool_call"] = on_tool_call
+        reason = self.escalation_reason(prompt, response)
+        if reason is None:
+            self._escalated_in_a_row = 0
+            return response
+        self._escalated_in_a_row += 1
+        self.escalations[reason] += 1
+        logger.info(f"Escalating turn to {self.policy.strong_model}: {reason}")
+        return self._call(prompt, self.policy.strong_model, "escalated")
+
+    def summary(self) -> dict:
+        return {
+            "routes": dict(self.routes),
+            "escalations": dict(self.escalations),
+            "models": {
+                model: {k: round(v, 6) for k, v in asdict(usage).items()}
+                for model, usage in self.usage.items()
+            },
+            "total_cost": round(sum(u.cost for u in self.usage.values()), 6),
+        }
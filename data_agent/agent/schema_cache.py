@@ -0,0 +1,75 @@
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from typing import Dict, Type
+
+import pydantic
+from pydantic import BaseModel
+
+# Bump to invalidate all cached schemas, e.g. when the schema conversion changes
+SCHEMA_CACHE_VERSION = 1
+
+_SCHEMAS: Dict[str, dict] = {}
+
+
+def schema_cache_dir() -> str:
+    """Directory of the on-disk schema cache, configurable through DATA_AGENT_CACHE_DIR."""
+    base = os.environ.get("DATA_AGENT_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "data_agent"
+    )
+    return os.path.join(base, "tool_schemas")
+
+
+def model_fingerprint(model: Type[BaseModel]) -> str:
+    """Hash of the model's source code, so any edit to the model invalidates its schema."""
+    try:
+        source = inspect.getsource(model)
+    except (OSError, TypeError):  # e.g. models defined in a notebook or created dynamically
+        source = json.dumps(model.model_json_schema(), sort_keys=True)
+    key = "\n".join(
+        [
+            str(SCHEMA_CACHE_VERSION),
+            pydantic.VERSION,
+            f"{model.__module__}.{model.__qualname__}",
+            source,
+        ]
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _generate_parameters(model: Type[BaseModel]) -> dict:
+    # langchain_core is slow to import, so it is only loaded when a schema is not cached
+    from langchain_core.utils.function_calling import convert_to_openai_function
+
+    return convert_to_openai_function(model)["parameters"]
+
+
+def _write_atomically(path: str, data: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def get_tool_parameters(model: Type[BaseModel]) -> dict:
+    """Return the OpenAI function parameters for a pydantic model, cached on disk."""
+    fingerprint = model_fingerprint(model)
+    if fingerprint in _SCHEMAS:
+        return _SCHEMAS[fingerprint]
+
+    path = os.path.join(schema_cache_dir(), f"{fingerprint}.json")
+    try:
+        with open(path, "r") as f:
+            parameters = json.load(f)
+    except (OSError, ValueError):
+        parameters = _generate_parameters(model)
+        try:
+            _write_atomically(path, parameters)
+        except OSError:
+            pass  # a read-only cache only costs regenerating the schema next time
+
+    _SCHEMAS[fingerprint] = parameters
+    return parameters
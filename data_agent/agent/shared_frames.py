@@ -0,0 +1,126 @@
+import os
+import pickle
+import shutil
+import tempfile
+import uuid
+import weakref
+from typing import Dict, List, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from .merge_plan import MergePlan
+
+Entry = Union[pd.DataFrame, MergePlan]
+
+
+def shared_memory_dir() -> str:
+    """A fresh directory in shared memory (/dev/shm) when available, else in the temp dir."""
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="data_agent_frames_", dir=base)
+
+
+class SharedFrames:
+    """Exchanges registry entries between processes through memory-mapped Arrow files.
+
+    A frame is written once to an Arrow IPC file in shared memory, and other processes map
+    the file instead of receiving a pickled copy through a pipe. Merge plans are exchanged as
+    a spec that references their (shared) input frames. Frames that cannot be converted to
+    Arrow (e.g. mixed-type object columns) fall back to a pickle file in the same directory.
+
+    With ``owner=True`` the files are deleted once the frame they hold is garbage collected,
+    and ``close`` removes the whole directory. With ``allow_pickle=False`` frames that cannot be
+    converted raise instead of being pickled.
+    """
+
+    def __init__(self, directory: str = None, owner: bool = True, allow_pickle: bool = True):
+        self.directory = directory or shared_memory_dir()
+        self.owner = owner
+        self.allow_pickle = allow_pickle
+        self._paths: Dict[int, str] = {}  # id(frame) -> file holding the frame
+        self._frames = weakref.WeakValueDictionary()  # file -> frame loaded from it
+        # Also removes the directory at interpreter exit when close() was never called
+        self._cleanup = (
+            weakref.finalize(self, shutil.rmtree, self.directory, True) if owner else None
+        )
+
+    def _track(self, frame: pd.DataFrame, path: str):
+        self._paths[id(frame)] = path
+        self._frames[path] = frame
+        unlink = os.remove if self.owner else None
+        weakref.finalize(frame, self._forget, id(frame), path, unlink)
+
+    def _forget(self, frame_id: int, path: str, unlink):
+        if self._paths.get(frame_id) == path:
+            del self._paths[frame_id]
+        if unlink is not None and os.path.exists(path):
+            unlink(path)
+
+    def tracked_paths(self) -> List[str]:
+        """Files of the frames that are currently alive."""
+        return list(self._paths.values())
+
+    def _write(self, frame: pd.DataFrame) -> str:
+        path = os.path.join(self.directory, uuid.uuid4().hex)
+        try:
+            table = pa.Table.from_pandas(frame)
+            with pa.OSFile(path + ".arrow", "wb") as f:
+                with pa.ipc.new_file(f, table.schema) as writer:
+                    writer.write_table(table)
+            return path + ".arrow"
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            if os.path.exists(path + ".arrow"):
+                os.remove(path + ".arrow")
+            if not self.allow_pickle:
+                raise
+            with open(path + ".pkl", "wb") as f:
+                pickle.dump(frame, f, protocol=pickle.HIGHEST_PROTOCOL)
+            return path + ".pkl"
+
+    def _read(self, path: str) -> pd.DataFrame:
+        if path.endswith(".pkl"):
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        with pa.memory_map(path) as source:
+            return pa.ipc.open_file(source).read_all().to_pandas(split_blocks=True)
+
+    def export(self, entry: Entry) -> dict:
+        """Spec of a registry entry, writing frames that are not shared yet."""
+        if isinstance(entry, MergePlan):
+            return {
+                "kind": "merge",
+                "left": self.export(entry.left),
+                "right": self.export(entry.right),
+                "on": entry.on,
+                "how": entry.how,
+                "suffixes": list(entry.suffixes),
+                "columns": entry.selected,
+                "encode_keys": entry.encode_keys,
+            }
+        path = self._paths.get(id(entry))
+        if path is None:
+            path = self._write(entry)
+            self._track(entry, path)
+        return {"kind": "frame", "path": path}
+
+    def load(self, spec: dict) -> Entry:
+        """Registry entry for a spec; frames that were loaded or exported before are reused."""
+        if spec["kind"] == "merge":
+            return MergePlan(
+                self.load(spec["left"]),
+                self.load(spec["right"]),
+                on=spec["on"],
+                how=spec["how"],
+                suffixes=spec["suffixes"],
+                columns=spec.get("columns"),
+                encode_keys=spec.get("encode_keys", False),
+            )
+        frame = self._frames.get(spec["path"])
+        if frame is None:
+            frame = self._read(spec["path"])
+            self._track(frame, spec["path"])
+        return frame
+
+    def close(self):
+        if self._cleanup is not None:
+            self._cleanup()
@@ -0,0 +1,236 @@
+import json
+import re
+import sys
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Union
+
+from ..utils.logger import CustomLogger
+from .agent import TEXT_MODEL, TOOL_MODEL, Prompt
+from .invocation import ToolInvocation
+from .llm_client import get_client
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+JSON_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+def _print_text(text: str):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def _ignore_text(text: str):
+    pass
+
+
+class PartialStringFieldReader:
+    """Decodes one string field of a JSON object whose text is still being streamed.
+
+    ``read`` is called with the arguments received so far, and returns only the part of the
+    field's value that was not returned before. Incomplete escape sequences are held back.
+    """
+
+    def __init__(self, field: str):
+        self._start = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._emitted = 0
+
+    def read(self, buffer: str) -> str:
+        match = self._start.search(buffer)
+        if not match:
+            return ""
+        decoded = self._decode(buffer[match.end() :])
+        new_text = decoded[self._emitted :]
+        self._emitted = len(decoded)
+        return new_text
+
+    @staticmethod
+    def _decode(raw: str) -> str:
+        out = []
+        i = 0
+        while i < len(raw):
+            char = raw[i]
+            if char == '"':
+                break
+            if char != "\\":
+                out.append(char)
+                i += 1
+                continue
+            if i + 1 >= len(raw):
+                break
+            if raw[i + 1] != "u":
+                out.append(JSON_ESCAPES.get(raw[i + 1], raw[i + 1]))
+                i += 2
+                continue
+            if i + 6 > len(raw):
+                break
+            code = int(raw[i + 2 : i + 6], 16)
+            if 0xD800 <= code < 0xDC00 and raw[i + 6 : i + 8] in ("", "\\", "\\u"):
+                # high surrogate: wait for the low one
+                if i + 12 > len(raw):
+                    break
+                low = int(raw[i + 8 : i + 12], 16)
+                code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+                i += 6
+            out.append(chr(code))
+            i += 6
+        return "".join(out)
+
+
+class ToolCallAssembler:
+    """Assembles streamed tool-call deltas into ToolInvocations.
+
+    A call is complete as soon as its accumulated arguments form a valid JSON object, which is
+    usually well before the stream itself ends.
+    """
+
+    def __init__(self):
+        self.calls: Dict[int, dict] = {}
+        self.invocations: Dict[int, ToolInvocation] = {}
+
+    def feed(self, tool_call_deltas) -> List[ToolInvocation]:
+        """Add deltas and return the invocations that were completed by them."""
+        touched = []
+        for delta in tool_call_deltas or []:
+            call = self.calls.setdefault(delta.index, {"id": None, "name": "", "arguments": ""})
+            if getattr(delta, "id", None):
+                call["id"] = delta.id
+            function = getattr(delta, "function", None)
+            if function is not None:
+                if getattr(function, "name", None) and not call["name"]:
+                    call["name"] = function.name
+                call["arguments"] += getattr(function, "arguments", None) or ""
+            touched.append(delta.index)
+
+        completed = []
+        for index in dict.fromkeys(touched):
+            if index in self.invocations:
+                continue
+            arguments = self.calls[index]["arguments"]
+            if not arguments.rstrip().endswith("}"):
+                continue
+            try:
+                json.loads(arguments)
+            except ValueError:
+                continue
+            self.invocations[index] = self._to_invocation(index)
+            completed.append(self.invocations[index])
+        return completed
+
+    def _to_invocation(self, index: int) -> ToolInvocation:
+        call = self.calls[index]
+        tool_call = SimpleNamespace(
+            id=call["id"],
+            function=SimpleNamespace(name=call["name"], arguments=call["arguments"]),
+        )
+        return ToolInvocation.from_tool_call(tool_call)
+
+    def first(self) -> Optional[ToolInvocation]:
+        """The completed invocation of the lowest-indexed call, if it is complete."""
+        return self.invocations.get(min(self.calls)) if self.calls else None
+
+    def finish(self) -> List[ToolInvocation]:
+        """All calls in index order, including those whose arguments never became valid."""
+        for index in self.calls:
+            if index not in self.invocations:
+                self.invocations[index] = self._to_invocation(index)
+        return [self.invocations[i] for i in sorted(self.invocations)]
+
+
+class StreamingResponseGenerator:
+    """Drop-in replacement of ``generate_response`` that streams the LLM response.
+
+    Text content and the ``message`` of the ``terminate`` tool are passed to ``on_text`` while
+    they are generated. Each tool call is handed to the ``on_tool_call`` callback in the
+    prompt metadata as soon as its arguments are complete, so the Agent can start executing
+    it while the model is still generating.
+    """
+
+    streams_final_report = True
+
+    def __init__(
+        self,
+        completion_fn: Callable = None,
+        on_text: Callable[[str], None] = _print_text,
+        streamed_fields: Dict[str, str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 1024,
+    ):
+        self.completion_fn = completion_fn
+        self.on_text = on_text
+        self.streamed_fields = streamed_fields or {"terminate": "message"}
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def _completion(self) -> Callable:
+        # By default requests go through the shared LLMClient (rate limits and retries)
+        return self.completion_fn or get_client().completion
+
+    def __call__(self, prompt: Prompt) -> Union[str, ToolInvocation]:
+        kwargs = dict(
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        model = prompt.metadata.get("model")
+        if prompt.tools:
+            kwargs.update(model=model or TOOL_MODEL, tools=prompt.tools)
+        else:
+            kwargs.update(model=model or TEXT_MODEL)
+        stream = self._completion()(messages=prompt.messages, **kwargs)
+
+        on_tool_call: Optional[Callable] = prompt.metadata.get("on_tool_call")
+        # A router muting a response it may replace keeps it from being printed twice
+        on_text = self.on_text if prompt.metadata.get("stream_text", True) else _ignore_text
+        assembler = ToolCallAssembler()
+        readers: Dict[int, PartialStringFieldReader] = {}
+        content = []
+        for chunk in stream:
+            if getattr(chunk, "usage", None) is not None:
+                prompt.metadata["usage"] = chunk.usage  # sent with the last chunk
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if getattr(delta, "content", None):
+                content.append(delta.content)
+                on_text(delta.content)
+
+            tool_call_deltas = getattr(delta, "tool_calls", None)
+            if not tool_call_deltas:
+                continue
+            completed = assembler.feed(tool_call_deltas)
+            self._stream_fields(assembler, readers, tool_call_deltas, on_text)
+            for invocation in completed:
+                logger.debug(f"Tool call complete while streaming: {invocation.tool}")
+                # Only the first call is executed, so only that one is dispatched early
+                if on_tool_call is not None and invocation is assembler.first():
+                    on_tool_call(invocation)
+
+        invocations = assembler.finish()
+        if not invocations:
+            return "".join(content)
+        # Like generate_response, only the first tool call is executed per turn
+        first = invocations[0]
+        if first.raw_message is not None and content:
+            first.raw_message["content"] = "".join(content)
+        return first
+
+    def _stream_fields(self, assembler, readers, tool_call_deltas, on_text):
+        for index in dict.fromkeys(delta.index for delta in tool_call_deltas):
+            call = assembler.calls[index]
+            field = self.streamed_fields.get(call["name"])
+            if field is None:
+                continue
+            reader = readers.setdefault(index, PartialStringFieldReader(field))
+            text = reader.read(call["arguments"])
+            if text:
+                on_text(text)
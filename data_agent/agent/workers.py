@@ -0,0 +1,268 @@
+import json
+import multiprocessing
+import os
+import pickle
+import queue
+import resource
+import threading
+import time
+import traceback
+from typing import Any, Callable, Dict, Optional
+
+from ..utils.logger import CustomLogger
+from . import actions
+from .actions import Action
+from .environment import Environment
+from .shared_frames import SharedFrames
+
+logger = CustomLogger(console_level="INFO", file_level="DEBUG")
+
+WORKER_STARTUP_TIMEOUT = 60.0
+
+
+class ActionTimeoutError(TimeoutError):
+    pass
+
+
+class ActionCancelledError(RuntimeError):
+    pass
+
+
+def _resident_bytes() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _worker_main(conn, directory: str):
+    """Loop of a worker process: rebuild the registry from shared frames and run actions."""
+    shared = SharedFrames(directory, owner=False)
+    plans = {}
+    conn.send("ready")  # imports are done, so start-up does not count towards action timeouts
+
+    def load(spec):
+        if spec["kind"] != "merge":
+            return shared.load(spec)
+        key = json.dumps(spec, sort_keys=True)  # keep plans (and their column cache) alive
+        if key not in plans:
+            plans[key] = shared.load(spec)
+        return plans[key]
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        function, args, registry = message
+        actions.DATAFRAMES.clear()
+        actions.DATAFRAMES.update({alias: load(spec) for alias, spec in registry.items()})
+        before = dict(actions.DATAFRAMES)
+
+        try:
+            outcome = ("ok", function(**args), None)
+        except Exception as e:
+            outcome = ("error", str(e), traceback.format_exc())
+
+        # Only changed or new aliases travel back, as specs of shared files
+        updates = {
+            alias: shared.export(entry)
+            for alias, entry in actions.DATAFRAMES.items()
+            if before.get(alias) is not entry
+        }
+        removed = [alias for alias in before if alias not in actions.DATAFRAMES]
+        conn.send(outcome + (updates, removed, _resident_bytes()))
+
+
+class Worker:
+    """A single worker process and the pipe to talk to it."""
+
+    def __init__(self, context, directory: str):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, directory), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        if not self.conn.poll(WORKER_STARTUP_TIMEOUT) or self.conn.recv() != "ready":
+            self.kill()
+            raise RuntimeError("Worker process failed to start")
+        self.tasks = 0
+        self.resident_bytes = 0
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+
+class WorkerPool:
+    """Runs actions in isolated worker processes, with timeouts, cancellation and recycling.
+
+    The DATAFRAMES registry of the agent process is shared with the workers through Arrow
+    files in shared memory; aliases the action adds or changes are mapped back the same way.
+    A worker that does not answer within the timeout is killed, and a worker whose resident
+    memory exceeds ``max_worker_bytes`` after a task is replaced by a fresh one.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        timeout: float = 300.0,
+        timeouts: Dict[str, float] = None,
+        max_worker_bytes: int = 4 * 1024**3,
+        max_tasks_per_worker: int = None,
+        start_method: str = "spawn",
+    ):
+        self.size = size
+        self.timeout = timeout
+        self.timeouts = timeouts or {}
+        self.max_worker_bytes = max_worker_bytes
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self._context = multiprocessing.get_context(start_method)
+        self._shared = SharedFrames()
+        self._idle: "queue.Queue[Worker]" = queue.Queue()
+        self._busy: Dict[int, Worker] = {}
+        self._cancelled = set()
+        self._lock = threading.Lock()
+        self.recycled = 0
+        for _ in range(size):
+            self._idle.put(None)  # workers are started lazily
+
+    def _acquire(self) -> Worker:
+        worker = self._idle.get()
+        if worker is None or not worker.process.is_alive():
+            worker = Worker(self._context, self._shared.directory)
+        with self._lock:
+            self._busy[threading.get_ident()] = worker
+        return worker
+
+    def _release(self, worker: Optional[Worker]):
+        with self._lock:
+            self._busy.pop(threading.get_ident(), None)
+        self._idle.put(worker)
+
+    def _recycle(self, worker: Worker, reason: str):
+        logger.warning(f"Recycling worker {worker.process.pid}: {reason}")
+        worker.kill()
+        self.recycled += 1
+
+    def cancel(self, thread_id: int = None):
+        """Cancel the action running for a thread (all running actions if None)."""
+        with self._lock:
+            targets = [
+                (ident, worker)
+                for ident, worker in self._busy.items()
+                if thread_id is None or ident == thread_id
+            ]
+            for ident, worker in targets:
+                self._cancelled.add(ident)
+                worker.kill()
+
+    def _take_cancelled(self) -> bool:
+        with self._lock:
+            cancelled = threading.get_ident() in self._cancelled
+            self._cancelled.discard(threading.get_ident())
+        return cancelled
+
+    def _check_limits(self, worker: Worker) -> Optional[Worker]:
+        """Return the worker to reuse, or None when it was recycled."""
+        if worker.resident_bytes > self.max_worker_bytes:
+            self._recycle(worker, f"resident memory of {worker.resident_bytes} bytes")
+            return None
+        if self.max_tasks_per_worker and worker.tasks >= self.max_tasks_per_worker:
+            self._recycle(worker, f"served {worker.tasks} tasks")
+            return None
+        return worker
+
+    def run(self, function: Callable, args: dict, name: str = None) -> Any:
+        """Run ``function(**args)`` in a worker and return its result, or raise its error."""
+        timeout = self.timeouts.get(name, self.timeout)
+        registry = {alias: self._shared.export(e) for alias, e in actions.DATAFRAMES.items()}
+        worker = self._acquire()
+        start = time.monotonic()
+        try:
+            worker.conn.send((function, args, registry))
+            reply = worker.conn.recv() if worker.conn.poll(timeout) else None
+        except Exception as e:
+            worker.kill()
+            self._release(None)
+            if self._take_cancelled():
+                raise ActionCancelledError(f"Action {name} was cancelled") from e
+            raise RuntimeError(f"Worker running {name} failed: {e!r}") from e
+        if reply is None:
+            self._recycle(worker, f"{name} exceeded its timeout of {timeout}s")
+            self._release(None)
+            raise ActionTimeoutError(f"Action {name} timed out after {timeout}s")
+
+        status, value, trace, updates, removed, worker.resident_bytes = reply
+        worker.tasks += 1
+        self._release(self._check_limits(worker))
+        logger.debug(f"Action {name} ran in a worker in {time.monotonic() - start:.3f}s")
+
+        for alias, spec in updates.items():
+            actions.DATAFRAMES[alias] = self._shared.load(spec)
+        for alias in removed:
+            actions.DATAFRAMES.pop(alias, None)
+        if status == "error":
+            raise RuntimeError(f"{value}\n{trace}")
+        return value
+
+    def close(self):
+        while not self._idle.empty():
+            worker = self._idle.get_nowait()
+            if worker is not None:
+                worker.close()
+        self.cancel()
+        self._shared.close()
+
+
+def _is_picklable(function: Callable) -> bool:
+    try:
+        pickle.dumps(function)
+        return True
+    except Exception:
+        return False
+
+
+class WorkerEnvironment(Environment):
+    """Environment that executes actions in a WorkerPool instead of the agent process.
+
+    Terminal actions, and actions whose function cannot be sent to another process (e.g.
+    lambdas), still run inline.
+    """
+
+    def __init__(self, pool: WorkerPool = None, **kwargs):
+        super().__init__(**kwargs)
+        self.pool = pool or WorkerPool()
+
+    def _execute_action(self, action: Action, args: dict) -> dict:
+        if action.terminal or not _is_picklable(action.function):
+            return super()._execute_action(action, args)
+        try:
+            result = self.pool.run(action.function, args, name=action.name)
+            self.after_action(action, result)
+            return self.format_result(result)
+        except Exception as e:
+            logger.error(f"Error executing action {action.name} in worker: {e}")
+            return {
+                "tool_executed": False,
+                "error": str(e),
+                "traceback": traceback.format_exc(),
+            }
+
+    def close(self):
+        self.pool.close()
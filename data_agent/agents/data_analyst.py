@@ -1,3 +1,5 @@
+import os
+
 from dotenv import load_dotenv
 
 from data_agent.agent.actions import (
@@ -5,22 +7,38 @@ from data_agent.agent.actions import (
     ActionRegistry,
     CallColumnMethodParams,
     CallDataFrameMethodParams,
+    CompareDistributionsParams,
+    ComputeColumnStatisticsParams,
     ListFilesParams,
     LoadDataFrameParams,
     MergeDataFramesParams,
+    QueryDataFrameParams,
+    QueryHistoryParams,
+    UpdateHistoryParams,
     call_column_method,
     call_dataframe_method,
+    compare_distributions,
+    compute_column_statistics,
     list_files,
     load_dataframe,
     merge_dataframes,
+    query_dataframe,
+    query_history,
+    update_history,
 )
 from data_agent.agent.agent import (
     Agent,
     AgentFunctionCallingActionLanguage,
     generate_response,
 )
+from data_agent.agent.checkpoint import Checkpointer
 from data_agent.agent.environment import Environment
 from data_agent.agent.goals import Goal
+from data_agent.agent.prefetch import Prefetcher
+from data_agent.agent.profiling import ActionProfiler
+from data_agent.agent.router import POLICIES, ModelRouter
+from data_agent.agent.streaming import StreamingResponseGenerator
+from data_agent.agent.workers import WorkerEnvironment
 
 load_dotenv()  # This loads variables from .env into os.environ
 
@@ -43,6 +61,11 @@ goals = [
     - Larger changes (exceeding a few percent) need flagging by a WARNING.
     - Note that previous and latest data is best compared by merging on the "sbti_id" column
     - Standard pandas function at your disposal: "describe", "mean", "max", "min", etc.
+    - Prefer "compute_column_statistics" to get many statistics of many columns in one call.
+    - Use "compare_distributions" first to see which columns drifted most between snapshots.
+    - Use "query_dataframe" for filtered, grouped aggregates and top-N lists in one call.
+    - For trends over all snapshots or when a company/column changed, call "update_history"
+      once and then "query_history".
     - Continue searching for changes until you have a complete analysis of all changes.
     """,
     ),
@@ -81,7 +104,8 @@ action_registry.register(
     Action(
         name="load_dataframe",
         function=load_dataframe,
-        description="Load a dataframe and store under an alias.",
+        description="Load a dataframe and store under an alias. The path may be a file, a glob "
+        "or a (hive-partitioned) dataset directory; partitions can be pruned with a filter.",
         pydantic_base_model=LoadDataFrameParams,
         terminal=False,
     )
@@ -107,6 +131,28 @@ action_registry.register(
     )
 )
 
+action_registry.register(
+    Action(
+        name="compute_column_statistics",
+        function=compute_column_statistics,
+        description="Compute several statistics (mean, sum, median, std, min, max, null_rate, "
+        "distinct_count) for several columns of a dataframe in a single call.",
+        pydantic_base_model=ComputeColumnStatisticsParams,
+        terminal=False,
+    )
+)
+
+action_registry.register(
+    Action(
+        name="compare_distributions",
+        function=compare_distributions,
+        description="Compare the distributions of all columns of two snapshots (aliases or "
+        "file paths) and rank the columns by drift severity, flagging those above thresholds.",
+        pydantic_base_model=CompareDistributionsParams,
+        terminal=False,
+    )
+)
+
 action_registry.register(
     Action(
         name="merge_dataframes",
@@ -117,11 +163,89 @@ action_registry.register(
     )
 )
 
-# Define the environment
-environment = Environment()
+action_registry.register(
+    Action(
+        name="query_dataframe",
+        function=query_dataframe,
+        description="Run a select -> filter -> group by/aggregate -> sort -> head pipeline over "
+        "a dataframe alias in one call, returning at most 'limit' rows.",
+        pydantic_base_model=QueryDataFrameParams,
+        terminal=False,
+    )
+)
+
+action_registry.register(
+    Action(
+        name="update_history",
+        function=update_history,
+        description="Ingest the dated snapshots that are not yet in the history store.",
+        pydantic_base_model=UpdateHistoryParams,
+        terminal=False,
+    )
+)
+
+action_registry.register(
+    Action(
+        name="query_history",
+        function=query_history,
+        description="Query the history of all snapshots: the events of one key, the snapshots "
+        "in which a column changed, or the trend of a column's statistics.",
+        pydantic_base_model=QueryHistoryParams,
+        terminal=False,
+    )
+)
+
+# Define the environment. Set DATA_AGENT_PREFETCH=1 to warm the newest snapshots in the background.
+# Set DATA_AGENT_WORKERS=1 to run the actions in a worker process with timeouts.
+# Set DATA_AGENT_PROFILE_TOOLS (comma-separated tool names) and/or DATA_AGENT_PROFILE_SLOW_SECONDS
+# to write CPU and allocation profiles of these tools / of slow calls to DATA_AGENT_PROFILE_DIR.
+prefetcher = Prefetcher() if os.environ.get("DATA_AGENT_PREFETCH") else None
+profile_tools = [t for t in os.environ.get("DATA_AGENT_PROFILE_TOOLS", "").split(",") if t]
+profile_slow_seconds = os.environ.get("DATA_AGENT_PROFILE_SLOW_SECONDS")
+profiler = (
+    ActionProfiler(
+        tools=profile_tools,
+        slow_seconds=float(profile_slow_seconds) if profile_slow_seconds else None,
+    )
+    if profile_tools or profile_slow_seconds
+    else None
+)
+if os.environ.get("DATA_AGENT_WORKERS"):
+    environment = WorkerEnvironment(prefetcher=prefetcher, profiler=profiler)
+else:
+    environment = Environment(prefetcher=prefetcher, profiler=profiler)
 agent_language = AgentFunctionCallingActionLanguage()
 
-data_analyst = Agent(goals, agent_language, action_registry, generate_response, environment)
+# Set DATA_AGENT_STREAM=1 to stream responses, dispatching tool calls as soon as they are complete
+streaming = bool(os.environ.get("DATA_AGENT_STREAM"))
+# Set DATA_AGENT_ROUTING=tiered to send routine turns to a fast model, escalating when needed
+routing = os.environ.get("DATA_AGENT_ROUTING")
+
+
+def create_response_generator():
+    """A response generator of its own, as the ModelRouter keeps per-run accounting."""
+    response_generator = StreamingResponseGenerator() if streaming else generate_response
+    if routing:
+        response_generator = ModelRouter(response_generator, POLICIES[routing], action_registry)
+    return response_generator
+
+
+response_generator = create_response_generator()
+data_analyst = Agent(goals, agent_language, action_registry, response_generator, environment)
+
+
+def create_session_agent() -> Agent:
+    """An agent with its own dataframe registry and response generator that shares everything
+    else with data_analyst, e.g. for the runs of the resident daemon
+    (python -m data_agent.agent.daemon serve)."""
+    shared = {"pool": environment.pool} if isinstance(environment, WorkerEnvironment) else {}
+    session_environment = type(environment)(
+        prefetcher=prefetcher, profiler=profiler, registry={}, **shared
+    )
+    return Agent(
+        goals, agent_language, action_registry, create_response_generator(), session_environment
+    )
+
 
 user_input = """
 You are an AI agent that can perform tasks by using available tools to answer questions about files
@@ -157,8 +281,17 @@ Your workflow is:
 """
 
 if __name__ == "__main__":
-    # Run the agent with user input
-    final_memory = data_analyst.run(user_input)
+    # Set DATA_AGENT_CHECKPOINT_DIR to checkpoint the session after every iteration; an unfinished
+    # session found in that directory is resumed instead of starting over.
+    checkpoint_dir = os.environ.get("DATA_AGENT_CHECKPOINT_DIR")
+    checkpointer = Checkpointer(checkpoint_dir) if checkpoint_dir else None
+    if checkpointer is not None and checkpointer.resumable():
+        final_memory = data_analyst.resume(checkpointer)
+    else:
+        # Run the agent with user input
+        final_memory = data_analyst.run(user_input, checkpointer=checkpointer)
+    if checkpointer is not None:
+        checkpointer.close()
 
     # Print the final memory
     print(final_memory.get_memories())
@@ -1,3 +1,6 @@
+import pandas as pd
+
+
 def safe_load_json(path: str):
     import json
 
@@ -6,3 +9,13 @@ def safe_load_json(path: str):
             return json.load(f)
     except Exception as e:
         return {"error": str(e)}
+
+
+def read_frame(path: str) -> pd.DataFrame:
+    """Read a .csv or .parquet file into a DataFrame."""
+    path = str(path)
+    if path.endswith(".csv"):
+        return pd.read_csv(path)
+    elif path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    raise NotImplementedError("Only .parquet and .csv implemented for reading.")
@@ -10,6 +10,7 @@ from data_agent.agent.actions import (
     _json_safe,
     call_column_method,
     call_dataframe_method,
+    compute_column_statistics,
     list_files,
     load_dataframe,
 )
@@ -164,6 +165,43 @@ def test_call_dataframe_method_attribute_and_method(sample_csv):
     assert len(head_rows) == 2
 
 
+def test_compute_column_statistics_matches_single_calls(sample_csv):
+    path, _ = sample_csv
+    load_dataframe(alias="test_df", path=path)
+
+    result = compute_column_statistics("test_df", ["value", "category"], ["mean", "max", "std"])
+    assert result["statistics"] == ["mean", "max", "std"]
+    assert result["columns"] == ["value", "category"]
+    value_row, category_row = result["data"]
+    assert value_row == [call_column_method("test_df", "value", m) for m in ["mean", "max", "std"]]
+    # Numeric statistics do not apply to a string column
+    assert category_row == [None, None, None]
+    json.dumps(result)
+
+
+def test_compute_column_statistics_all_defaults(sample_csv):
+    path, _ = sample_csv
+    load_dataframe(alias="test_df", path=path)
+    DATAFRAMES["test_df"].loc[0, "category"] = None
+
+    result = compute_column_statistics("test_df")
+    assert result["columns"] == ["id", "value", "category"]
+    stats = dict(zip(result["statistics"], result["data"][2]))
+    assert stats["null_rate"] == pytest.approx(1 / 3)
+    assert stats["distinct_count"] == 2
+
+
+@pytest.mark.parametrize(
+    "columns,statistics,match",
+    [(["value"], ["drop"], "not allowed"), (["nope"], ["mean"], "not found")],
+)
+def test_compute_column_statistics_validation(sample_csv, columns, statistics, match):
+    path, _ = sample_csv
+    load_dataframe(alias="test_df", path=path)
+    with pytest.raises(ValueError, match=match):
+        compute_column_statistics("test_df", columns, statistics)
+
+
 if __name__ == "__main__":
     test_json_safe_dataframe_with_timestamps()
     test_json_safe_correct()
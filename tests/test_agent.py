@@ -0,0 +1,121 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from data_agent.agent.actions import Action, ActionRegistry, ListFilesParams
+from data_agent.agent.agent import Agent, AgentFunctionCallingActionLanguage
+from data_agent.agent.environment import Environment
+from data_agent.agent.goals import Goal
+from data_agent.agent.invocation import ToolInvocation
+
+GOALS = [Goal(priority=1, name="Test", description="Test the agent loop.")]
+
+
+def make_tool_call(name: str, arguments: str, call_id: str):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def scripted_llm(responses):
+    """Stand-in for generate_response that replays a list of responses."""
+    responses = list(responses)
+    prompts = []
+
+    def generate(prompt):
+        prompts.append(prompt)
+        return responses.pop(0)
+
+    generate.prompts = prompts
+    return generate
+
+
+# --- Fixtures ---
+@pytest.fixture
+def registry():
+    registry = ActionRegistry()
+    registry.register(
+        Action(
+            name="list_files",
+            function=lambda: ["a.csv", "b.parquet"],
+            description="List files.",
+            pydantic_base_model=ListFilesParams,
+        )
+    )
+    return registry
+
+
+def make_agent(registry, responses):
+    llm = scripted_llm(responses)
+    agent = Agent(GOALS, AgentFunctionCallingActionLanguage(), registry, llm, Environment())
+    return agent, llm
+
+
+# --- Tests ---
+def test_invocation_from_tool_call():
+    invocation = ToolInvocation.from_tool_call(
+        make_tool_call("terminate", '{"message": "hi"}', "c1")
+    )
+    assert invocation.tool == "terminate"
+    assert invocation.args == {"message": "hi"}
+    assert invocation.raw_message["tool_calls"][0]["id"] == "c1"
+
+    broken = ToolInvocation.from_tool_call(make_tool_call("terminate", '{"message": ', "c2"))
+    assert broken.is_escalation
+
+
+def test_run_keeps_native_tool_messages(registry):
+    responses = [
+        ToolInvocation.from_tool_call(make_tool_call("list_files", "{}", "call_1")),
+        ToolInvocation.from_tool_call(make_tool_call("terminate", '{"message": "done"}', "call_2")),
+    ]
+    agent, llm = make_agent(registry, responses)
+    memory = agent.run("List the files", max_iterations=5)
+
+    assert [m["type"] for m in memory.get_memories()] == [
+        "user",
+        "tool_call",
+        "tool_result",
+        "tool_call",
+        "tool_result",
+    ]
+    # The second prompt replays the first call and its result as native tool messages
+    messages = llm.prompts[1].messages
+    assert messages[-2]["tool_calls"][0]["id"] == "call_1"
+    assert messages[-1]["role"] == "tool"
+    assert messages[-1]["tool_call_id"] == "call_1"
+    assert json.loads(messages[-1]["content"])["result"] == ["a.csv", "b.parquet"]
+
+
+def test_run_parses_each_response_once(registry, monkeypatch):
+    language = AgentFunctionCallingActionLanguage()
+    calls = []
+    original = language.parse_response
+    monkeypatch.setattr(language, "parse_response", lambda r: calls.append(r) or original(r))
+
+    llm = scripted_llm([json.dumps({"tool": "terminate", "args": {"message": "done"}})])
+    Agent(GOALS, language, registry, llm, Environment()).run("Stop", max_iterations=1)
+    assert len(calls) == 1
+
+
+def test_run_reports_invalid_arguments(registry):
+    responses = [
+        ToolInvocation.from_tool_call(make_tool_call("terminate", '{"msg": "done"}', "call_1")),
+        ToolInvocation.from_tool_call(make_tool_call("terminate", '{"message": "done"}', "call_2")),
+    ]
+    agent, _ = make_agent(registry, responses)
+    memory = agent.run("Stop", max_iterations=5)
+
+    first_result = json.loads(memory.get_memories()[2]["content"])
+    assert not first_result["tool_executed"]
+    assert "Invalid arguments for tool 'terminate'" in first_result["error"]
+    assert len(memory.get_memories()) == 5  # the corrected call terminated the run
+
+
+def test_run_escalates_text_responses(registry):
+    agent, _ = make_agent(registry, ["I think I am done", '{"tool": "unknown", "args": {}}'])
+    memory = agent.run("Stop", max_iterations=2)
+
+    items = memory.get_memories()
+    assert items[1] == {"type": "assistant", "content": "I think I am done"}
+    assert "could not be processed" in items[2]["content"]
+    assert "Unknown tool 'unknown'" in items[4]["content"]
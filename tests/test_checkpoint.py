@@ -0,0 +1,193 @@
+import json
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from data_agent.agent import actions
+from data_agent.agent.actions import DATAFRAMES, Action, ActionRegistry, ListFilesParams
+from data_agent.agent.agent import Agent, AgentFunctionCallingActionLanguage
+from data_agent.agent.checkpoint import (
+    Checkpointer,
+    decode_memory_item,
+    encode_memory_item,
+)
+from data_agent.agent.environment import Environment
+from data_agent.agent.goals import Goal
+from data_agent.agent.invocation import ToolInvocation
+from data_agent.agent.memory import Memory
+from data_agent.agent.merge_plan import MergePlan
+
+GOALS = [Goal(priority=1, name="Test", description="Test checkpoints.")]
+
+
+def tool_call(name: str, arguments: str, call_id: str) -> ToolInvocation:
+    return ToolInvocation.from_tool_call(
+        SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+    )
+
+
+class Crash(Exception):
+    pass
+
+
+def scripted_llm(responses):
+    responses = list(responses)
+    calls = []
+
+    def generate(prompt):
+        calls.append(prompt)
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    generate.calls = calls
+    return generate
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    DATAFRAMES.clear()
+    yield
+    DATAFRAMES.clear()
+
+
+@pytest.fixture
+def registry():
+    loads = []
+
+    def load(alias: str, path: str):
+        loads.append(path)
+        DATAFRAMES[alias] = pd.DataFrame({"id": [1, 2, 3], "value": [1.0, 2.0, 3.0]})
+        return f"Loaded {alias}"
+
+    registry = ActionRegistry()
+    registry.register(
+        Action(
+            name="load_dataframe",
+            function=load,
+            description="Load.",
+            pydantic_base_model=actions.LoadDataFrameParams,
+        )
+    )
+    registry.register(
+        Action(
+            name="list_files",
+            function=lambda: ["a.csv"],
+            description="List files.",
+            pydantic_base_model=ListFilesParams,
+        )
+    )
+    registry.loads = loads
+    return registry
+
+
+def make_agent(registry, responses):
+    return Agent(
+        GOALS,
+        AgentFunctionCallingActionLanguage(),
+        registry,
+        scripted_llm(responses),
+        Environment(),
+    )
+
+
+def test_memory_items_round_trip():
+    invocation = tool_call("list_files", "{}", "call_1")
+    item = decode_memory_item(encode_memory_item({"type": "tool_call", "invocation": invocation}))
+    assert item["invocation"] == invocation
+    assert decode_memory_item(encode_memory_item({"type": "user", "content": "hi"})) == {
+        "type": "user",
+        "content": "hi",
+    }
+
+
+def test_save_and_load_restores_memory_and_registry(tmp_path):
+    left = pd.DataFrame({"id": [1, 2], "a": ["x", "y"]})
+    right = pd.DataFrame({"id": [2, 1], "b": [0.5, 1.5]})
+    DATAFRAMES["left"] = left
+    DATAFRAMES["merged"] = MergePlan(left, right, on="id")
+    memory = Memory()
+    memory.add_memory({"type": "user", "content": "task"})
+    memory.add_memory({"type": "tool_call", "invocation": tool_call("list_files", "{}", "c1")})
+
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(memory, "task", 1)
+    checkpointer.close()
+    DATAFRAMES.clear()
+
+    state = Checkpointer(str(tmp_path)).load()
+    assert state["iteration"] == 1 and state["task"] == "task"
+    assert state["memory"].get_memories() == memory.get_memories()
+    pd.testing.assert_frame_equal(DATAFRAMES["left"], left)
+    assert isinstance(DATAFRAMES["merged"], MergePlan)
+    assert DATAFRAMES["merged"].materialize()["b"].tolist() == [1.5, 0.5]
+    assert not any(name.endswith(".pkl") for name in os.listdir(tmp_path / "frames"))
+
+
+def test_checkpoints_are_incremental(tmp_path):
+    DATAFRAMES["df"] = pd.DataFrame({"a": [1, 2]})
+    memory = Memory()
+    memory.add_memory({"type": "user", "content": "task"})
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(memory, "task", 0)
+    memory.add_memory({"type": "user", "content": "more"})
+    checkpointer.save(memory, "task", 1)
+    checkpointer.flush()
+
+    with open(tmp_path / "memory.jsonl") as f:
+        assert [json.loads(line)["content"] for line in f] == ["task", "more"]
+    assert len(os.listdir(tmp_path / "frames")) == 1  # the unchanged frame is written once
+
+    DATAFRAMES.pop("df")
+    checkpointer.save(memory, "task", 2)
+    checkpointer.close()
+    assert os.listdir(tmp_path / "frames") == []  # unreferenced frames are pruned
+
+
+def test_incomplete_memory_lines_are_ignored(tmp_path):
+    memory = Memory()
+    memory.add_memory({"type": "user", "content": "task"})
+    checkpointer = Checkpointer(str(tmp_path))
+    checkpointer.save(memory, "task", 0)
+    checkpointer.close()
+    with open(tmp_path / "memory.jsonl", "a") as f:
+        f.write('{"type": "user", "content": "partial')
+
+    state = Checkpointer(str(tmp_path)).load()
+    assert len(state["memory"].get_memories()) == 1
+
+
+def test_resume_continues_without_recomputing(registry, tmp_path):
+    responses = [
+        tool_call("load_dataframe", '{"alias": "df", "path": "a.csv"}', "call_1"),
+        Crash("provider error"),
+    ]
+    agent = make_agent(registry, responses)
+    checkpointer = Checkpointer(str(tmp_path))
+    with pytest.raises(Crash):
+        agent.run("Load the data", max_iterations=5, checkpointer=checkpointer)
+    checkpointer.close()
+    DATAFRAMES.clear()
+
+    checkpointer = Checkpointer(str(tmp_path))
+    assert checkpointer.resumable()
+    agent = make_agent(registry, [tool_call("terminate", '{"message": "done"}', "call_2")])
+    memory = agent.resume(checkpointer, max_iterations=5)
+    checkpointer.close()
+
+    assert registry.loads == ["a.csv"]  # the load was not repeated
+    assert "df" in DATAFRAMES
+    assert [m["type"] for m in memory.get_memories()] == [
+        "user",
+        "tool_call",
+        "tool_result",
+        "tool_call",
+        "tool_result",
+    ]
+    # The resumed prompt holds the history of the first session
+    messages = agent.generate_response.calls[0].messages
+    assert any(m.get("tool_call_id") == "call_1" for m in messages)
+    assert not Checkpointer(str(tmp_path)).resumable()
@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from data_agent.agent.actions import Action, ActionRegistry, ListFilesParams
+from data_agent.agent.agent import Agent, AgentFunctionCallingActionLanguage
+from data_agent.agent.daemon import (
+    AgentDaemon,
+    format_event,
+    is_listening,
+    request,
+    submit,
+)
+from data_agent.agent.environment import Environment
+from data_agent.agent.goals import Goal
+from data_agent.agent.invocation import ToolInvocation
+from data_agent.agent.prefetch import Prefetcher
+from data_agent.agent.registry import FrameStore
+from data_agent.agent.router import ModelRouter
+from data_agent.agents import data_analyst
+
+GOALS = [Goal(priority=1, name="Test", description="Test the daemon.")]
+
+
+def call(tool: str, args: dict, call_id: str) -> ToolInvocation:
+    return ToolInvocation.from_tool_call(
+        SimpleNamespace(id=call_id, function=SimpleNamespace(name=tool, arguments=json.dumps(args)))
+    )
+
+
+def agent_factory():
+    registry = ActionRegistry()
+    registry.register(
+        Action(
+            name="list_files",
+            function=lambda: ["a.csv"],
+            description="List files.",
+            pydantic_base_model=ListFilesParams,
+        )
+    )
+    responses = [
+        call("list_files", {}, "c1"),
+        call("terminate", {"message": "Found a.csv"}, "c2"),
+    ]
+    return Agent(
+        GOALS,
+        AgentFunctionCallingActionLanguage(),
+        registry,
+        lambda prompt: responses.pop(0),
+        Environment(registry={}),
+    )
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = AgentDaemon(
+        agent_factory,
+        socket_path=str(tmp_path / "agent.sock"),
+        frame_idle_seconds=0.05,
+        default_task="List the files",
+        store=FrameStore(),
+        prefetcher=Prefetcher(),
+    )
+    daemon.bind()
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    thread.join(timeout=5)
+
+
+def test_runs_stream_their_trace_and_report(daemon):
+    for _ in range(2):  # the daemon stays up between runs
+        events = list(submit(socket_path=daemon.socket_path))
+        kinds = [e["event"] for e in events]
+        assert kinds[0] == "started" and kinds[-2:] == ["report", "finished"]
+        items = [e["item"] for e in events if e["event"] == "trace"]
+        assert items[0] == {"type": "user", "content": "List the files"}
+        assert items[1]["type"] == "tool_call" and items[1]["tool"] == "list_files"
+        assert json.loads(items[2]["content"])["result"] == ["a.csv"]
+        assert events[-2]["message"] == "Found a.csv \n Terminating..."
+        assert events[-1]["loop"]["repeats"] == 0
+
+    status = next(request({"command": "status"}, daemon.socket_path))
+    assert status["runs"] == 2 and status["active_runs"] == 0
+    assert format_event(events[-2]) == "Found a.csv \n Terminating..."
+    assert format_event({"event": "trace", "item": items[1]}) == "-> list_files({})"
+
+
+def test_bad_requests_and_a_second_daemon(daemon):
+    assert next(request({"command": "dance"}, daemon.socket_path))["error"].startswith("Unknown")
+    with pytest.raises(RuntimeError, match="already listening"):
+        AgentDaemon(agent_factory, socket_path=daemon.socket_path).bind()
+
+
+def test_idle_frames_are_evicted(daemon, tmp_path):
+    path = tmp_path / "frame.csv"
+    pd.DataFrame({"a": [1, 2]}).to_csv(path, index=False)
+    daemon.store.get(str(path), pd.read_csv)
+    assert len(daemon.store) == 1
+    deadline = time.monotonic() + 5
+    while len(daemon.store) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(daemon.store) == 0
+
+
+def test_idle_prefetched_frames_are_evicted(daemon, tmp_path):
+    pd.DataFrame({"a": [1, 2]}).to_parquet(tmp_path / "sbti_20250101.parquet")
+    daemon.prefetcher.prefetch(["sbti_20250101.parquet"], data_dir=str(tmp_path))
+    deadline = time.monotonic() + 5
+    while daemon.prefetcher._futures and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert daemon.prefetcher.get(str(tmp_path / "sbti_20250101.parquet")) is None
+
+
+def test_session_agents_get_their_own_router(monkeypatch):
+    monkeypatch.setattr(data_analyst, "routing", "tiered")
+    first, second = data_analyst.create_session_agent(), data_analyst.create_session_agent()
+    assert isinstance(first.generate_response, ModelRouter)
+    assert first.generate_response is not second.generate_response
+    assert first.environment.registry is not second.environment.registry
+
+
+def test_stop_removes_the_socket(daemon):
+    assert next(request({"command": "shutdown"}, daemon.socket_path))["event"] == "stopping"
+    deadline = time.monotonic() + 5
+    while is_listening(daemon.socket_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not is_listening(daemon.socket_path)
+
+
+def test_evict_idle_keeps_recently_used_frames(tmp_path):
+    store = FrameStore()
+    for name in ("old", "new"):
+        pd.DataFrame({"a": [1]}).to_csv(tmp_path / f"{name}.csv", index=False)
+    store.get(str(tmp_path / "old.csv"), pd.read_csv)
+    time.sleep(0.2)
+    store.get(str(tmp_path / "new.csv"), pd.read_csv)
+    assert store.evict_idle(0.1) == 1
+    assert store.evict_idle(60) == 0
+    store.get(str(tmp_path / "new.csv"), pd.read_csv)
+    assert store.loads == 2
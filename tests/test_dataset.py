@@ -0,0 +1,96 @@
+import pandas as pd
+import pytest
+
+from data_agent.agent import actions
+from data_agent.agent.actions import DATAFRAMES, load_dataframe
+from data_agent.agent.dataset import parse_partition_filter, read_dataset, resolve_parts
+from data_agent.agent.filters import parse_filters
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    DATAFRAMES.clear()
+    yield
+    DATAFRAMES.clear()
+
+
+@pytest.fixture
+def hive_dataset(tmp_path):
+    """year=2023|2024 / region=EU|US, one parquet part each, plus a marker file."""
+    root = tmp_path / "snapshots"
+    value = 0
+    for year in (2023, 2024):
+        for region in ("EU", "US"):
+            directory = root / f"year={year}" / f"region={region}"
+            directory.mkdir(parents=True)
+            pd.DataFrame({"id": [value, value + 1], "amount": [1.0, 2.0]}).to_parquet(
+                directory / "part-0.parquet"
+            )
+            value += 2
+    (root / "_SUCCESS").write_text("")
+    return root
+
+
+def test_resolve_parts_of_hive_directory(hive_dataset):
+    root, parts = resolve_parts(str(hive_dataset))
+    assert root == str(hive_dataset)
+    assert len(parts) == 4
+    assert parts[0].partitions == {"year": "2023", "region": "EU"}
+
+
+def test_read_dataset_adds_partition_columns(hive_dataset):
+    df, report = read_dataset(str(hive_dataset))
+    assert len(df) == 8
+    assert df["id"].tolist() == list(range(8))
+    assert isinstance(df["year"].dtype, pd.CategoricalDtype)
+    assert df["region"].astype(str).tolist() == ["EU", "EU", "US", "US"] * 2
+    assert len(report.files_read) == 4
+    assert report.bytes_scanned > 0
+
+
+def test_partition_filter_prunes_files(hive_dataset):
+    df, report = read_dataset(str(hive_dataset), "year>=2024 and region in (US, 'EU')")
+    assert report.files_matched == 4
+    assert len(report.files_read) == 2
+    assert set(df["year"].astype(str)) == {"2024"}
+
+    df, _ = read_dataset(str(hive_dataset), "year = 2023, region != EU")
+    assert df["id"].tolist() == [2, 3]
+
+
+def test_partition_filter_errors(hive_dataset):
+    with pytest.raises(ValueError, match="Unknown partition key"):
+        read_dataset(str(hive_dataset), "month=1")
+    with pytest.raises(ValueError, match="excludes all files"):
+        read_dataset(str(hive_dataset), "year>2030")
+    with pytest.raises(ValueError, match="Invalid partition filter"):
+        parse_partition_filter("year ~ 2024")
+
+
+def test_load_dataframe_from_glob_of_csv_parts(tmp_path, monkeypatch):
+    monkeypatch.setattr(actions, "DATA_DIR", str(tmp_path))
+    for i in range(3):
+        pd.DataFrame({"id": [i], "value": [i * 10]}).to_csv(tmp_path / f"part_{i}.csv", index=False)
+
+    message = load_dataframe("part_*.csv", "parts")
+    assert DATAFRAMES["parts"]["value"].tolist() == [0, 10, 20]
+    assert "3 file(s) read (0 pruned)" in message
+    assert "part_0.csv" in message
+
+
+def test_load_dataframe_rejects_filter_for_single_file(tmp_path):
+    path = tmp_path / "single.csv"
+    pd.DataFrame({"id": [1]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="partition_filter"):
+        load_dataframe(str(path), "single", partition_filter="year=2024")
+
+
+def test_read_dataset_pushes_columns_and_filters_to_parts(hive_dataset):
+    filters = [{"column": "id", "op": ">=", "value": 5}]
+    df, _ = read_dataset(str(hive_dataset), columns=["id", "year"], filters=parse_filters(filters))
+    assert df.columns.tolist() == ["id", "year"]
+    assert df["id"].tolist() == [5, 6, 7]
+    with pytest.raises(ValueError, match="partition_filter"):
+        read_dataset(
+            str(hive_dataset), filters=parse_filters([{"column": "year", "op": "==", "value": 1}])
+        )
@@ -0,0 +1,123 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_agent.agent import actions
+from data_agent.agent.actions import DATAFRAMES, compare_distributions
+from data_agent.agent.drift import (
+    DriftThresholds,
+    drift_report,
+    ks_statistic,
+    numeric_psi,
+)
+
+
+@pytest.fixture
+def snapshots():
+    rng = np.random.default_rng(0)
+    n = 2000
+    prev = pd.DataFrame(
+        {
+            "stable": rng.normal(10, 1, n),
+            "shifted": rng.normal(10, 1, n),
+            "sector": rng.choice(["a", "b", "c"], n),
+            "status": rng.choice(["x", "y"], n),
+            "dropped": np.arange(n),
+        }
+    )
+    curr = pd.DataFrame(
+        {
+            "stable": rng.normal(10, 1, n),
+            "shifted": rng.normal(11, 1, n),
+            "sector": rng.choice(["a", "b", "c"], n),
+            "status": rng.choice(["x", "y", "z"], n),
+            "added": np.arange(n),
+        }
+    )
+    curr.loc[: n // 10, "stable"] = np.nan
+    return prev, curr
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    DATAFRAMES.clear()
+    yield
+    DATAFRAMES.clear()
+
+
+def test_ks_statistic_of_disjoint_and_identical_samples():
+    assert ks_statistic(np.array([1.0, 2.0]), np.array([3.0, 4.0])) == 1.0
+    assert ks_statistic(np.array([1.0, 2.0, 3.0]), np.array([1.0, 2.0, 3.0])) == 0.0
+    assert ks_statistic(np.array([1.0, 2.0, 3.0, 4.0]), np.array([3.0, 4.0])) == 0.5
+
+
+def test_psi_is_zero_for_identical_samples():
+    values = np.random.default_rng(1).normal(size=1000)
+    assert numeric_psi(values, values) == pytest.approx(0.0)
+
+
+def test_drift_report_ranks_and_flags_columns(snapshots):
+    report = drift_report(*snapshots)
+    by_column = {r["column"]: r for r in report["columns"]}
+
+    assert report["columns_compared"] == 4
+    assert report["only_in_prev"] == ["dropped"]
+    assert report["only_in_curr"] == ["added"]
+    assert {r["column"] for r in report["columns"][:2]} == {"shifted", "status"}
+    assert {"ks", "psi", "quantile_shift"} <= set(by_column["shifted"]["flags"])
+    assert by_column["sector"]["flags"] == []
+    assert by_column["stable"]["flags"] == ["null_rate_change"]
+    assert report["columns_flagged"] == 3
+
+    status = by_column["status"]
+    assert status["new_categories"] == 1
+    assert status["new_examples"] == ["z"]
+    assert status["vanished_categories"] == 0
+    severities = [r["severity"] for r in report["columns"]]
+    assert severities == sorted(severities, reverse=True)
+
+
+def test_drift_report_thresholds_and_columns(snapshots):
+    report = drift_report(
+        *snapshots, columns=["stable", "sector"], thresholds=DriftThresholds(null_rate_change=0.5)
+    )
+    assert {r["column"] for r in report["columns"]} == {"stable", "sector"}
+    assert report["columns_flagged"] == 0
+    assert report["thresholds"]["null_rate_change"] == 0.5
+
+
+def test_drift_report_of_constant_columns():
+    prev = pd.DataFrame({"constant": [5.0] * 4, "zero": [0.0] * 4})
+    curr = pd.DataFrame({"constant": [5.0, 6.0, 7.0, 8.0], "zero": [0.0, 0.0, 1.0, 1.0]})
+    report = drift_report(prev, curr)
+    json.dumps(report, allow_nan=False)  # no NaN or Infinity in the JSON
+    columns = {c["column"]: c for c in report["columns"]}
+
+    constant = columns["constant"]
+    assert constant["psi"] > 1 and "psi" in constant["flags"]
+    assert constant["quantile_shifts"]["0.95"] == pytest.approx((7.85 - 5) / 5)
+    assert all(np.isfinite(c["severity"]) for c in report["columns"])
+    assert set(columns["zero"]["quantile_shifts"].values()) == {None}
+
+
+def test_drift_report_datetime_column():
+    prev = pd.DataFrame({"date": pd.date_range("2024-01-01", periods=100)})
+    curr = pd.DataFrame({"date": pd.date_range("2025-01-01", periods=100)})
+    (column,) = drift_report(prev, curr)["columns"]
+    assert column["kind"] == "numeric"
+    assert column["ks"] == 1.0
+    assert "mean_change" not in column
+
+
+def test_compare_distributions_with_aliases_and_paths(snapshots, tmp_path, monkeypatch):
+    prev, curr = snapshots
+    monkeypatch.setattr(actions, "DATA_DIR", str(tmp_path))
+    curr.to_parquet(tmp_path / "curr.parquet")
+    DATAFRAMES["prev"] = prev
+
+    result = compare_distributions("prev", "curr.parquet", thresholds={"psi": 0.2})
+    assert result["columns_flagged"] == 3
+    assert result["thresholds"]["psi"] == 0.2
+    json.dumps(result, allow_nan=False)
@@ -0,0 +1,138 @@
+import pandas as pd
+import pytest
+
+from data_agent.agent.actions import DATAFRAMES, LoadDataFrameParams, load_dataframe
+from data_agent.agent.filters import (
+    apply_filters,
+    parse_filters,
+    read_csv_chunked,
+    read_parquet_pushdown,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    DATAFRAMES.clear()
+    yield
+    DATAFRAMES.clear()
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "id": range(100),
+            "sector": ["Banks", "Energy", "Retail", None] * 25,
+            "amount": [float(i) for i in range(100)],
+            "updated": pd.date_range("2024-01-01", periods=100, freq="D"),
+        }
+    )
+
+
+@pytest.fixture
+def parquet_path(frame, tmp_path):
+    path = tmp_path / "snapshot.parquet"
+    frame.to_parquet(path, row_group_size=10)  # sorted ids: row groups have disjoint ranges
+    return str(path)
+
+
+def test_parse_filters_validates_specs():
+    (condition,) = parse_filters([{"column": "id", "op": ">", "value": 3}])
+    assert condition.op == ">"
+    with pytest.raises(ValueError, match="must be a list"):
+        parse_filters([{"column": "id", "op": "in", "value": 3}])
+    with pytest.raises(ValueError, match="needs a value"):
+        parse_filters([{"column": "id", "op": "=="}])
+    with pytest.raises(ValueError):
+        parse_filters([{"column": "id", "op": "like", "value": "x"}])
+
+
+def test_parquet_pushdown_skips_row_groups(parquet_path, frame):
+    filters = parse_filters(
+        [
+            {"column": "id", "op": ">=", "value": 90},
+            {"column": "sector", "op": "==", "value": "Banks"},
+        ]
+    )
+    df, stats = read_parquet_pushdown(parquet_path, ["id", "amount"], filters)
+    assert stats == {"row_groups": 10, "row_groups_read": 1}
+    assert df.columns.tolist() == ["id", "amount"]
+    assert df["id"].tolist() == [92, 96]
+
+
+def test_parquet_pushdown_casts_values_to_column_types(parquet_path):
+    filters = parse_filters(
+        [
+            {"column": "updated", "op": "<", "value": "2024-01-03"},
+            {"column": "sector", "op": "not_null"},
+        ]
+    )
+    df, _ = read_parquet_pushdown(parquet_path, None, filters)
+    assert df["id"].tolist() == [0, 1]
+
+
+def test_csv_chunks_match_in_memory_filters(frame, tmp_path):
+    path = tmp_path / "snapshot.csv"
+    frame.to_csv(path, index=False)
+    filters = parse_filters(
+        [
+            {"column": "sector", "op": "in", "value": ["Energy", "Retail"]},
+            {"column": "amount", "op": "<", "value": 20},
+        ]
+    )
+    df, stats = read_csv_chunked(str(path), ["id", "sector"], filters, chunk_rows=7)
+    assert stats == {"rows_scanned": 100}
+    expected = apply_filters(pd.read_csv(path), ["id", "sector"], filters)
+    pd.testing.assert_frame_equal(df, expected.reset_index(drop=True))
+
+
+@pytest.mark.parametrize(
+    "spec",
+    [
+        {"column": "sector", "op": "!=", "value": "Banks"},
+        {"column": "amount", "op": "!=", "value": 3.0},
+        {"column": "sector", "op": "not_in", "value": ["Banks", "Energy"]},
+        {"column": "amount", "op": "not_in", "value": [1.0, 2.0]},
+        {"column": "amount", "op": "<=", "value": 4.0},
+    ],
+)
+def test_parquet_csv_and_memory_readers_return_the_same_rows(spec, tmp_path):
+    frame = pd.DataFrame(
+        {
+            "id": range(8),
+            "sector": ["Banks", None, "Energy", "Retail"] * 2,
+            "amount": [1.0, 2.0, None, 3.0, 4.0, None, 5.0, 6.0],
+        }
+    )
+    frame.to_parquet(tmp_path / "snapshot.parquet", row_group_size=3)
+    frame.to_csv(tmp_path / "snapshot.csv", index=False)
+    filters = parse_filters([spec])
+
+    from_parquet, _ = read_parquet_pushdown(str(tmp_path / "snapshot.parquet"), ["id"], filters)
+    from_csv, _ = read_csv_chunked(str(tmp_path / "snapshot.csv"), ["id"], filters, chunk_rows=3)
+    in_memory = apply_filters(frame, ["id"], filters)
+    ids = from_parquet["id"].tolist()
+    assert ids == from_csv["id"].tolist() == in_memory["id"].tolist()
+    assert not frame.loc[frame["id"].isin(ids), spec["column"]].isna().any()
+
+
+def test_is_null_and_unknown_columns(frame):
+    df = apply_filters(frame, [], parse_filters([{"column": "sector", "op": "is_null"}]))
+    assert len(df) == 25
+    with pytest.raises(ValueError, match="Unknown column"):
+        apply_filters(frame, ["missing"], [])
+
+
+def test_load_dataframe_with_pushdown(parquet_path):
+    args = LoadDataFrameParams.model_validate(
+        {
+            "alias": "banks",
+            "path": parquet_path,
+            "columns": ["id", "sector"],
+            "filters": [{"column": "sector", "op": "==", "value": "Banks"}],
+        }
+    ).model_dump(exclude_unset=True)
+    message = load_dataframe(**args)
+    assert "(10 of 10 row group(s) read)" in message
+    assert DATAFRAMES["banks"].shape == (25, 2)
+    assert set(DATAFRAMES["banks"]["sector"]) == {"Banks"}
@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from data_agent.agent import actions
+from data_agent.agent.history import HistoryStore, change_events, key_buckets
+
+
+def snapshot(ids, status, year):
+    return pd.DataFrame({"sbti_id": ids, "status": status, "year": year})
+
+
+SNAPSHOTS = {
+    "20250101": snapshot([1, 2, 3], ["Committed", "Targets set", None], [2030.0, 2035.0, None]),
+    "20250201": snapshot([1, 2, 4], ["Targets set", "Targets set", None], [2030.0, 2040.0, 2050.0]),
+    "20250301": snapshot(
+        [1, 2, 4], ["Targets set", "Removed", "Committed"], [2030.0, 2040.0, 2050.0]
+    ),
+}
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    directory = tmp_path / "data"
+    directory.mkdir()
+    for date, frame in SNAPSHOTS.items():
+        frame.to_parquet(directory / f"sbti_{date}.parquet", index=False)
+    return directory
+
+
+@pytest.fixture
+def store(tmp_path, data_dir):
+    store = HistoryStore(str(tmp_path / "history"))
+    store.ingest_new(str(data_dir))
+    return store
+
+
+def test_change_events_between_two_snapshots():
+    events = change_events(SNAPSHOTS["20250101"], SNAPSHOTS["20250201"], "sbti_id", "20250201")
+    events = events.astype(object).where(events.notna(), None)
+    rows = set(events[["key", "event", "column", "old", "new"]].itertuples(False, None))
+    assert rows == {
+        ("4", "added", None, None, None),
+        ("3", "removed", None, None, None),
+        ("1", "changed", "status", "Committed", "Targets set"),
+        ("2", "changed", "year", "2035.0", "2040.0"),
+    }
+    assert set(events["snapshot"]) == {"20250201"}
+
+
+def test_change_events_of_nullable_columns():
+    prev = pd.DataFrame(
+        {
+            "sbti_id": [1, 2, 3, 4],
+            "year": pd.array([2030, None, None, 2040], dtype="Int64"),
+            "status": pd.array(["a", None, "b", None], dtype="string[python]"),
+            "flag": pd.array([True, None, False, None], dtype="boolean"),
+        }
+    )
+    curr = prev.copy()
+    curr["year"] = pd.array([2030, 2035, None, None], dtype="Int64")
+    curr["status"] = pd.array(["a", "c", None, None], dtype="string[python]")
+    curr["flag"] = pd.array([True, None, True, None], dtype="boolean")
+    events = change_events(prev, curr, "sbti_id", "20250201")
+    events = events.astype(object).where(events.notna(), None)
+    assert set(events[["key", "column", "old", "new"]].itertuples(False, None)) == {
+        ("2", "year", None, "2035"),
+        ("4", "year", "2040", None),
+        ("2", "status", None, "c"),
+        ("3", "status", "b", None),
+        ("3", "flag", "False", "True"),
+    }
+
+
+def test_a_crash_before_the_manifest_reingests_against_the_last_state(
+    tmp_path, data_dir, monkeypatch
+):
+    expected = HistoryStore(str(tmp_path / "expected"))
+    expected.ingest_new(str(data_dir))
+
+    store = HistoryStore(str(tmp_path / "history"))
+    store.ingest(str(data_dir / "sbti_20250101.parquet"))
+
+    def crash():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_write_manifest", crash)
+    with pytest.raises(OSError):
+        store.ingest(str(data_dir / "sbti_20250201.parquet"))
+
+    reopened = HistoryStore(store.directory)
+    assert reopened.snapshots == ["20250101"]
+    reopened.ingest_new(str(data_dir))
+    assert reopened.manifest == expected.manifest
+    events = pd.read_parquet(f"{store.directory}/events").sort_values(["snapshot", "key", "column"])
+    assert events.reset_index(drop=True).equals(
+        pd.read_parquet(f"{expected.directory}/events")
+        .sort_values(["snapshot", "key", "column"])
+        .reset_index(drop=True)
+    )
+    assert sorted(os.listdir(f"{store.directory}/state")) == ["20250301.parquet"]
+
+
+def test_ingestion_is_append_only(tmp_path, data_dir, store):
+    assert store.snapshots == ["20250101", "20250201", "20250301"]
+    assert [s["changed"] for s in store.manifest["snapshots"]] == [0, 2, 2]
+    assert store.ingest(str(data_dir / "sbti_20250201.parquet")) is None
+    assert store.ingest_new(str(data_dir)) == []
+
+    SNAPSHOTS["20250101"].to_parquet(data_dir / "sbti_20241201.parquet", index=False)
+    with pytest.raises(ValueError, match="older than the last ingested"):
+        store.ingest(str(data_dir / "sbti_20241201.parquet"))
+
+    reopened = HistoryStore(store.directory)
+    assert reopened.snapshots == store.snapshots and reopened.key == "sbti_id"
+
+
+def test_key_history(store):
+    history = store.key_history(2)
+    assert list(history["snapshot"]) == ["20250101", "20250201", "20250301"]
+    assert list(history["event"]) == ["added", "changed", "changed"]
+    assert list(history["column"].iloc[1:]) == ["year", "status"]
+
+    assert list(store.key_history("2", column="status")["new"]) == ["Removed"]
+    assert list(store.key_history(2, since="20250201", until="20250201")["column"]) == ["year"]
+    assert store.key_history(99).empty
+
+
+def test_events_are_bucketed_and_sorted_by_key(store):
+    keys = pd.Series([str(k) for k in range(100)])
+    assert np.array_equal(key_buckets(keys), key_buckets(keys.copy()))
+
+    events = pd.read_parquet(f"{store.directory}/events")
+    assert len(events) == 3 + 4 + 2  # events of each snapshot
+    for key, bucket in zip(events["key"], key_buckets(events["key"])):
+        table = pq.read_table(f"{store.directory}/events/bucket={bucket:02d}")
+        assert key in table.column("key").to_pylist()
+    bucket = key_buckets(pd.Series(["1"]))[0]
+    part = pq.read_table(f"{store.directory}/events/bucket={bucket:02d}/20250101.parquet")
+    assert part.column("key").to_pylist() == sorted(part.column("key").to_pylist())
+
+
+def test_column_trend_and_change_counts(store):
+    trend = store.column_trend("year")
+    assert list(trend["snapshot"]) == ["20250101", "20250201", "20250301"]
+    assert list(trend["null_count"]) == [1, 0, 0]
+    assert list(trend["max"]) == [2035.0, 2050.0, 2050.0]
+
+    counts = store.change_counts()
+    assert counts.values.tolist() == [
+        ["20250201", "status", 1],
+        ["20250201", "year", 1],
+        ["20250301", "status", 2],
+    ]
+    assert store.change_counts("year", since="20250301").empty
+
+
+def test_history_actions(tmp_path, data_dir, monkeypatch):
+    monkeypatch.setattr(actions, "DATA_DIR", str(data_dir))
+    monkeypatch.setattr(actions, "HISTORY_DIR", str(tmp_path / "history"))
+    with pytest.raises(ValueError, match="call update_history first"):
+        actions.query_history("change_counts")
+
+    assert actions.update_history()["ingested"] == ["20250101", "20250201", "20250301"]
+    assert actions.update_history()["ingested"] == []
+
+    result = actions.query_history("key_history", key=4, limit=2)
+    assert result["columns"] == ["key", "snapshot", "event", "column", "old", "new"]
+    assert result["data"][0] == ["4", "20250201", "added", None, None, None]
+    assert result["total_rows"] == 2 and not result["truncated"]
+    with pytest.raises(ValueError, match="needs a column"):
+        actions.query_history("column_trend")
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+# Cold-start budget for importing the full agent (registry, actions and agent loop)
+IMPORT_TIME_BUDGET_S = 2.0
+HEAVY_MODULES = ["litellm", "langchain_core"]
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARK_SCRIPT = f"""
+import json, sys, time
+start = time.perf_counter()
+import data_agent.agents.data_analyst
+elapsed = time.perf_counter() - start
+loaded = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps({{"elapsed": elapsed, "loaded": loaded}}))
+"""
+
+
+def run_import_benchmark(cwd) -> dict:
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    output = subprocess.run(
+        [sys.executable, "-c", BENCHMARK_SCRIPT],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_cold_import_defers_heavy_dependencies(tmp_path):
+    result = run_import_benchmark(tmp_path)
+    assert result["loaded"] == []
+
+
+def test_cold_import_within_budget(tmp_path):
+    # Best of a few runs, to be robust against a noisy machine
+    elapsed = min(run_import_benchmark(tmp_path)["elapsed"] for _ in range(3))
+    assert elapsed < IMPORT_TIME_BUDGET_S, f"Cold import took {elapsed:.2f}s"
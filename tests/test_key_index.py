@@ -0,0 +1,143 @@
+import pandas as pd
+import pytest
+
+from data_agent.agent import key_index
+from data_agent.agent.actions import (
+    DATAFRAMES,
+    compare_similarity_column_joined_on_key,
+    merge_dataframes,
+    outer_join_on_key,
+)
+from data_agent.agent.key_index import (
+    KeyIndex,
+    KeyIndexCache,
+    estimate_merge_rows,
+    merge_on_key,
+)
+
+
+# --- Fixtures ---
+@pytest.fixture
+def frames():
+    prev = pd.DataFrame(
+        {
+            "sbti_id": [5, 1, 3, 2],
+            "sector": ["A", "B", None, "C"],
+            "year": [2030, 2035, 2040, 2045],
+            "active": [True, False, True, True],
+        }
+    )
+    curr = pd.DataFrame(
+        {"sbti_id": [3, 9, 1, 7], "sector": ["A", "B", "B", "D"], "score": [1.5, 2.5, 3.5, 4.5]}
+    )
+    return prev, curr
+
+
+@pytest.fixture
+def snapshot_files(tmp_path, frames):
+    prev, curr = frames
+    prev_path, curr_path = tmp_path / "prev.parquet", tmp_path / "curr.parquet"
+    prev.to_parquet(prev_path)
+    curr.to_parquet(curr_path)
+    return str(prev_path), str(curr_path)
+
+
+# --- Tests ---
+def test_key_index_build():
+    index = KeyIndex.build(pd.Series([3, None, 1, 3], name="k"))
+    assert list(index.sorted_keys) == [1, 3, 3]
+    assert list(index.positions) == [2, 0, 3]
+    assert index.duplicate_count == 1
+    assert index.null_count == 1
+    assert not index.joinable
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "right", "outer"])
+@pytest.mark.parametrize("indicator", [False, True])
+@pytest.mark.parametrize("as_str", [False, True])
+def test_indexed_merge_matches_pd_merge(frames, how, indicator, as_str):
+    prev, curr = frames
+    if as_str:
+        prev, curr = prev.astype({"sbti_id": str}), curr.astype({"sbti_id": str})
+    expected = pd.merge(prev, curr, on="sbti_id", how=how, indicator=indicator)
+    merged = merge_on_key(
+        prev,
+        curr,
+        on="sbti_id",
+        how=how,
+        indicator=indicator,
+        left_index=KeyIndex.build(prev["sbti_id"]),
+        right_index=KeyIndex.build(curr["sbti_id"]),
+    )
+    pd.testing.assert_frame_equal(merged, expected)
+
+
+def test_merge_falls_back_without_usable_index(frames, monkeypatch):
+    prev, curr = frames
+    curr = pd.concat([curr, curr.head(1)])
+    monkeypatch.setattr(key_index, "_indexed_merge", None)  # must not be used
+    merged = merge_on_key(
+        prev,
+        curr,
+        on="sbti_id",
+        left_index=KeyIndex.build(prev["sbti_id"]),
+        right_index=KeyIndex.build(curr["sbti_id"]),
+    )
+    pd.testing.assert_frame_equal(merged, pd.merge(prev, curr, on="sbti_id"))
+
+
+def test_cache_reuses_indexes(frames, snapshot_files):
+    prev, _ = frames
+    cache = KeyIndexCache()
+    assert cache.for_frame(prev, "sbti_id") is cache.for_frame(prev, "sbti_id")
+    assert cache.for_frame(prev, "sbti_id") is not cache.for_frame(prev.copy(), "sbti_id")
+
+    prev_path, _ = snapshot_files
+    assert cache.for_file(prev_path, "sbti_id", prev) is cache.for_file(prev_path, "sbti_id", prev)
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "right", "outer"])
+def test_estimate_merge_rows_is_exact(how):
+    left = pd.Series(["a", "a", "b", None, "c", "a"], name="k")
+    right = pd.Series(["a", "b", "b", None, None, "d"], name="k")
+    expected = pd.merge(left.to_frame(), right.to_frame(), on="k", how=how)
+    assert estimate_merge_rows(KeyIndex.build(left), KeyIndex.build(right), how) == len(expected)
+
+
+def test_merge_dataframes_checks_the_output_size(frames):
+    prev, curr = frames
+    DATAFRAMES["dup_prev"] = pd.concat([prev, prev])
+    DATAFRAMES["dup_curr"] = pd.concat([curr, curr])
+    with pytest.raises(ValueError, match="would produce 8 rows.*Duplicate values"):
+        merge_dataframes("dup_prev", "dup_curr", "sbti_id", alias="dup_merged", max_output_rows=5)
+
+    # Many-to-many merges below the limit go through, with a warning
+    message = merge_dataframes("dup_prev", "dup_curr", on="sbti_id", alias="dup_merged")
+    assert "many-to-many merge of 8 rows" in message
+    assert DATAFRAMES["dup_merged"].shape[0] == 8
+
+    # One-to-many merges do not inflate the output
+    DATAFRAMES["uniq_curr"] = curr
+    message = merge_dataframes("dup_prev", "uniq_curr", "sbti_id", alias="dup_merged")
+    assert "Warning" not in message
+
+
+def test_outer_join_on_key(frames, snapshot_files):
+    prev, curr = frames
+    prev_path, curr_path = snapshot_files
+    expected = prev.merge(
+        curr, how="outer", on="sbti_id", suffixes=("_prev", "_curr"), indicator=True
+    )
+    pd.testing.assert_frame_equal(outer_join_on_key(prev_path, curr_path), expected)
+
+    msg = compare_similarity_column_joined_on_key(prev_path, curr_path, "sector")
+    assert "50.000%" in msg  # 'sector' differs for sbti_id 3 but not for 1
+
+
+def test_outer_join_on_key_rejects_duplicates(tmp_path, frames, snapshot_files):
+    prev, _ = frames
+    _, curr_path = snapshot_files
+    dup_path = tmp_path / "dup.parquet"
+    pd.concat([prev, prev.head(1)]).to_parquet(dup_path)
+    with pytest.raises(ValueError, match="1 in left"):
+        outer_join_on_key(str(dup_path), curr_path)
@@ -0,0 +1,175 @@
+import threading
+from email.utils import formatdate
+from time import time
+
+import pytest
+
+from data_agent.agent.agent import TEXT_MODEL, Prompt, generate_response
+from data_agent.agent.llm_client import (
+    MODEL_CONFIGS,
+    LLMClient,
+    LocalProvider,
+    ModelConfig,
+    ProviderError,
+    SharedLimits,
+    TokenBucket,
+    configure_model,
+    retry_after,
+    set_client,
+)
+
+TEST_MODEL = "test/model"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture(autouse=True)
+def test_model():
+    MODEL_CONFIGS[TEST_MODEL] = ModelConfig(
+        requests_per_minute=0, tokens_per_minute=0, base_delay=0.001
+    )
+    yield
+    MODEL_CONFIGS.pop(TEST_MODEL)
+    set_client(None)
+
+
+def failing(errors, response="ok"):
+    """Completion that raises the given errors first, then returns the response."""
+    errors = list(errors)
+
+    def completion(**kwargs):
+        if errors:
+            raise errors.pop(0)
+        return response
+
+    return completion
+
+
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=10, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire(10) == 0
+    assert bucket.acquire(5) == pytest.approx(0.5)
+    bucket.charge(10)  # debt: the next token needs a full second of refill
+    assert bucket.acquire(1) == pytest.approx(1.1)
+    assert bucket.acquire(100) == pytest.approx(1.0)  # clamped to the capacity
+
+
+def test_retry_after_parsing():
+    assert retry_after(ProviderError("limited", 429, retry_after=2.5)) == 2.5
+    error = ProviderError("limited", 429)
+    error.response.headers["retry-after"] = formatdate(time() + 30, usegmt=True)
+    assert 25 < retry_after(error) <= 30
+    assert retry_after(ProviderError("limited", 429)) is None
+
+
+def test_retries_honour_retry_after():
+    sleeps = []
+    client = LLMClient(
+        failing([ProviderError("limited", 429, retry_after=3)] * 2),
+        limits=SharedLimits(max_in_flight=1),
+        sleep=sleeps.append,
+    )
+    assert client.completion(TEST_MODEL, []) == "ok"
+    assert client.retries == 2
+    assert len(sleeps) == 2 and all(3 <= s <= 3.3 for s in sleeps)
+
+
+def test_non_retryable_errors_and_exhausted_retries_raise():
+    client = LLMClient(failing([ValueError("bad request")]), sleep=lambda s: None)
+    with pytest.raises(ValueError):
+        client.completion(TEST_MODEL, [])
+    assert client.retries == 0
+
+    configure_model(TEST_MODEL, max_retries=2)
+    client = LLMClient(failing([ProviderError("down", 503)] * 3), sleep=lambda s: None)
+    with pytest.raises(ProviderError):
+        client.completion(TEST_MODEL, [])
+    assert client.retries == 2
+
+
+def test_backoff_is_jittered_and_bounded():
+    client = LLMClient(sleep=lambda s: None)
+    config = ModelConfig(base_delay=1.0, max_delay=4.0)
+    delays = [client.backoff(attempt, ValueError(), config) for attempt in range(10)]
+    assert all(0 <= d <= 4.0 for d in delays)
+    assert len(set(delays)) == len(delays)
+
+
+def run_concurrently(client, sessions=8):
+    errors = []
+
+    def session():
+        try:
+            client.completion(TEST_MODEL, [{"role": "user", "content": "hi"}])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=session) for _ in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def test_in_flight_cap_is_shared_across_sessions():
+    provider = LocalProvider(latency=0.02, capacity=2)
+    clients = [LLMClient(provider, limits=SharedLimits(max_in_flight=2)) for _ in range(2)]
+    clients[1].limits = clients[0].limits
+    errors = run_concurrently(clients[0], 4) + run_concurrently(clients[1], 4)
+    assert errors == []
+    assert provider.max_in_flight <= 2
+    assert provider.rate_limited == 0
+
+
+def test_rate_limited_provider_is_retried_until_success():
+    provider = LocalProvider(latency=0.01, rate_limit_probability=0.5, retry_after=0.001, seed=1)
+    client = LLMClient(provider, limits=SharedLimits(max_in_flight=8))
+    assert run_concurrently(client) == []
+    assert provider.rate_limited > 0
+    assert client.retries == provider.rate_limited
+
+
+def test_request_bucket_limits_the_request_rate():
+    limits = SharedLimits()
+    clock = FakeClock()
+    limits.buckets_for(TEST_MODEL, ModelConfig(requests_per_minute=60, tokens_per_minute=0))
+    limits.buckets[TEST_MODEL]["requests"] = TokenBucket(1, 1, clock=clock, sleep=clock.sleep)
+    client = LLMClient(LocalProvider(), limits=limits)
+    for _ in range(3):
+        client.completion(TEST_MODEL, [])
+    assert clock.sleeps == [1.0, 1.0]
+
+
+def test_stream_holds_its_slot_until_consumed():
+    limits = SharedLimits(max_in_flight=1)
+    client = LLMClient(lambda **kwargs: iter([1, 2]), limits=limits)
+    stream = client.completion(TEST_MODEL, [], stream=True)
+    assert not limits.in_flight.acquire(blocking=False)
+    assert list(stream) == [1, 2]
+    assert limits.in_flight.acquire(blocking=False)
+    limits.in_flight.release()
+
+    client.completion(TEST_MODEL, [], stream=True).close()  # abandoned streams release too
+    assert limits.in_flight.acquire(blocking=False)
+
+
+def test_generate_response_goes_through_the_client():
+    provider = LocalProvider()
+    set_client(LLMClient(provider, sleep=lambda s: None))
+    assert generate_response(Prompt(messages=[{"role": "user", "content": "hi"}])) == (
+        f"Response of {TEXT_MODEL}"
+    )
+    assert provider.calls == 1
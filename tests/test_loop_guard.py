@@ -0,0 +1,150 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from data_agent.agent.actions import (
+    Action,
+    ActionRegistry,
+    CallDataFrameMethodParams,
+    ListFilesParams,
+    LoadDataFrameParams,
+    call_dataframe_method,
+    load_dataframe,
+)
+from data_agent.agent.agent import Agent, AgentFunctionCallingActionLanguage
+from data_agent.agent.environment import Environment
+from data_agent.agent.goals import Goal
+from data_agent.agent.invocation import ToolInvocation
+from data_agent.agent.loop_guard import LoopGuard, LoopPolicy
+
+GOALS = [Goal(priority=1, name="Test", description="Test loop detection.")]
+TERMINATE = json.dumps({"message": "done"})
+
+
+def call(tool: str, args: str = "{}", call_id: str = "c1") -> ToolInvocation:
+    return ToolInvocation.from_tool_call(
+        SimpleNamespace(id=call_id, function=SimpleNamespace(name=tool, arguments=args))
+    )
+
+
+@pytest.fixture
+def listing():
+    calls = []
+
+    def list_files():
+        calls.append(1)
+        return ["a.csv"]
+
+    registry = ActionRegistry()
+    registry.register(
+        Action(
+            name="list_files",
+            function=list_files,
+            description="List files.",
+            pydantic_base_model=ListFilesParams,
+        )
+    )
+    return registry, calls
+
+
+def run(registry, responses, policy=None, max_iterations=20, environment=None):
+    responses = list(responses)
+    agent = Agent(
+        GOALS,
+        AgentFunctionCallingActionLanguage(),
+        registry,
+        lambda prompt: responses.pop(0),
+        environment or Environment(),
+        loop_policy=policy,
+    )
+    memory = agent.run("List the files", max_iterations=max_iterations)
+    return agent, memory, responses
+
+
+def test_repeated_calls_are_answered_from_the_earlier_result(listing):
+    registry, calls = listing
+    responses = [call("list_files", call_id=f"c{i}") for i in range(2)] + [
+        call("terminate", TERMINATE)
+    ]
+    agent, memory, _ = run(registry, responses)
+
+    assert len(calls) == 1
+    result = json.loads(memory.get_memories()[4]["content"])
+    assert result["repeated_call"] and result["result"] == ["a.csv"]
+    assert result["tool_call_id"] == "c1"
+    assert "already made in iteration 1" in result["note"]
+    assert agent.run_metrics()["loop"]["repeats"] == 1
+
+
+def test_repeated_calls_rerun_after_an_alias_was_reassigned(tmp_path):
+    for name, value in (("x", 1), ("y", 2)):
+        (tmp_path / f"{name}.csv").write_text(f"a\n{value}\n")
+    registry = ActionRegistry()
+    for name, function, model in (
+        ("load_dataframe", load_dataframe, LoadDataFrameParams),
+        ("call_dataframe_method", call_dataframe_method, CallDataFrameMethodParams),
+    ):
+        registry.register(Action(name, function, name, pydantic_base_model=model))
+    head = json.dumps({"alias": "df", "method": "head"})
+    responses = [
+        call("load_dataframe", json.dumps({"path": str(tmp_path / "x.csv"), "alias": "df"}), "c1"),
+        call("call_dataframe_method", head, "c2"),
+        call("load_dataframe", json.dumps({"path": str(tmp_path / "y.csv"), "alias": "df"}), "c3"),
+        call("call_dataframe_method", head, "c4"),
+        call("terminate", TERMINATE, "c5"),
+    ]
+    agent, memory, _ = run(registry, responses, environment=Environment(registry={}))
+
+    results = [
+        json.loads(m["content"]) for m in memory.get_memories() if m["type"] == "tool_result"
+    ]
+    assert results[1]["result"] == [{"a": 1}]
+    assert results[3]["result"] == [{"a": 2}] and "repeated_call" not in results[3]
+    assert agent.run_metrics()["loop"]["repeats"] == 0
+
+
+def test_stalled_runs_are_asked_to_terminate_then_stopped(listing):
+    registry, calls = listing
+    policy = LoopPolicy(stall_limit=2, force_after=2)
+    responses = [call("list_files", call_id=f"c{i}") for i in range(10)]
+    agent, memory, remaining = run(registry, responses, policy)
+
+    # 1 call, 4 repeats: asked to terminate after 2 stalled iterations, stopped 2 later
+    assert len(remaining) == 5
+    requests = [m for m in memory.get_memories() if "terminate tool" in m.get("content", "")]
+    assert len(requests) == 1
+    metrics = agent.run_metrics()["loop"]
+    assert metrics["stalls"] == 4
+    assert metrics["termination_requests"] == 1
+    assert metrics["forced_termination"]
+
+
+def test_progress_resets_the_stall_count(listing):
+    registry, _ = listing
+    policy = LoopPolicy(stall_limit=2, force_after=1)
+    responses = [
+        "not json",
+        "not json",
+        call("list_files"),
+        "not json",
+        call("terminate", TERMINATE),
+    ]
+    agent, memory, remaining = run(registry, responses, policy)
+    assert remaining == []
+    metrics = agent.run_metrics()["loop"]
+    assert metrics["stalls"] == 3 and not metrics["forced_termination"]
+
+
+def test_cycles_are_detected():
+    guard = LoopGuard(LoopPolicy(window=10, max_cycle_length=3))
+    sequence = ["a", "b", "c", "a", "b", "c"]
+    for i, tool in enumerate(sequence):
+        guard.record(call(tool), i + 1, {"tool_executed": True}, progressed=True)
+    assert guard.cycles == 1
+    assert guard.stalled_in_a_row == 1
+
+    escalations = LoopGuard()
+    for i, response in enumerate([call("x", "{bad"), call("a"), call("x", "{bad"), call("a")]):
+        escalations.record(response, i + 1, {"tool_executed": False}, progressed=False)
+    assert escalations.cycles == 1
@@ -0,0 +1,127 @@
+import pandas as pd
+import pytest
+
+from data_agent.agent import merge_plan
+from data_agent.agent.actions import (
+    DATAFRAMES,
+    call_column_method,
+    call_dataframe_method,
+    merge_dataframes,
+)
+from data_agent.agent.merge_plan import MergePlan
+
+
+# --- Fixtures ---
+@pytest.fixture
+def frames():
+    prev = pd.DataFrame(
+        {"sbti_id": [1, 2, 3, 4], "sector": ["A", "B", "A", "C"], "year": [2030, 2030, 2035, 2040]}
+    )
+    curr = pd.DataFrame(
+        {"sbti_id": [2, 3, 4, 5], "sector": ["B", "A", "D", "E"], "status": ["x", "y", "x", "z"]}
+    )
+    return prev, curr
+
+
+@pytest.fixture
+def merge_counter(monkeypatch):
+    """Count the merges made by merge plans, and the columns they received."""
+    calls = []
+    original = merge_plan.merge_on_key
+
+    def counting_merge(left, right, *args, **kwargs):
+        calls.append(list(left.columns) + list(right.columns))
+        return original(left, right, *args, **kwargs)
+
+    monkeypatch.setattr(merge_plan, "merge_on_key", counting_merge)
+    return calls
+
+
+# --- Tests ---
+@pytest.mark.parametrize("how", ["inner", "left", "right", "outer"])
+def test_plan_matches_eager_merge(frames, how):
+    prev, curr = frames
+    plan = MergePlan(prev, curr, on="sbti_id", how=how)
+    expected = pd.merge(prev, curr, on="sbti_id", how=how)
+
+    assert plan.columns == list(expected.columns)
+    pd.testing.assert_frame_equal(plan.materialize(), expected)
+
+
+def test_plan_projection_and_suffixes(frames):
+    prev, curr = frames
+    plan = MergePlan(prev, curr, on="sbti_id", how="outer", suffixes=("_prev", "_curr"))
+    expected = pd.merge(prev, curr, on="sbti_id", how="outer", suffixes=("_prev", "_curr"))
+
+    projected = plan.materialize(["sector_curr"])
+    pd.testing.assert_frame_equal(projected, expected[["sector_curr"]])
+
+
+def test_plan_is_lazy_and_cached(frames, merge_counter):
+    prev, curr = frames
+    plan = MergePlan(prev, curr, on="sbti_id")
+    assert merge_counter == []
+
+    plan.materialize(["year"])
+    assert merge_counter == [["sbti_id", "year", "sbti_id"]]
+
+    # Cached columns are not merged again, new ones only merge what is missing
+    plan.materialize(["year"])
+    plan.materialize(["year", "status"])
+    assert merge_counter[1:] == [["sbti_id", "sbti_id", "status"]]
+
+
+def test_nested_plans(frames):
+    prev, curr = frames
+    extra = pd.DataFrame({"sbti_id": [1, 2, 3], "score": [0.1, 0.2, 0.3]})
+    plan = MergePlan(MergePlan(prev, curr, on="sbti_id", how="outer"), extra, on="sbti_id")
+    expected = pd.merge(pd.merge(prev, curr, on="sbti_id", how="outer"), extra, on="sbti_id")
+    pd.testing.assert_frame_equal(plan.materialize(), expected)
+
+
+def test_plan_missing_key(frames):
+    prev, curr = frames
+    with pytest.raises(KeyError):
+        MergePlan(prev, curr, on="unknown")
+
+
+def test_merge_dataframes_action_is_lazy(frames, merge_counter):
+    prev, curr = frames
+    DATAFRAMES["prev"], DATAFRAMES["curr"] = prev, curr
+
+    msg = merge_dataframes("prev", "curr", on="sbti_id", how="inner", alias="merged")
+    assert isinstance(DATAFRAMES["merged"], MergePlan)
+    assert "(3, 5)" in msg
+
+    assert call_dataframe_method("merged", "columns") == [
+        "sbti_id",
+        "sector_x",
+        "year",
+        "sector_y",
+        "status",
+    ]
+    assert call_column_method("merged", "year", "max") == 2040
+    # Only the key (for the shape) and the 'year' column were merged
+    assert merge_counter == [["sbti_id", "sbti_id"], ["sbti_id", "year", "sbti_id"]]
+
+
+@pytest.mark.parametrize("how", ["inner", "left", "right", "outer"])
+def test_compact_plan_matches_eager_merge(how, merge_counter):
+    prev = pd.DataFrame({"isin": ["US1", "FR2", None, "DE3"], "year": [2030, 2035, 2040, 2045]})
+    curr = pd.DataFrame({"isin": ["FR2", "GB4", "US1", None], "score": [1.5, 2.5, 3.5, 4.5]})
+    plan = MergePlan(prev, curr, on="isin", how=how, encode_keys=True)
+    expected = pd.merge(prev, curr, on="isin", how=how)
+
+    pd.testing.assert_frame_equal(plan.materialize(), expected)
+    assert all(codes.dtype == "int32" for codes in plan._encoded_keys()[:2])
+
+
+def test_plan_restricted_to_selected_columns(frames):
+    prev, curr = frames
+    plan = MergePlan(prev, curr, on="sbti_id", columns=["year", "status"])
+    assert plan.columns == ["sbti_id", "year", "status"]
+    expected = pd.merge(prev, curr, on="sbti_id")[["sbti_id", "year", "status"]]
+    pd.testing.assert_frame_equal(plan.materialize(), expected)
+
+    with pytest.raises(KeyError, match="missing"):
+        MergePlan(prev, curr, on="sbti_id", columns=["missing"])
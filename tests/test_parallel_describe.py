@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_agent.agent.parallel_describe import (
+    describe_frame,
+    partition_columns,
+    shareable_positions,
+)
+
+
+@pytest.fixture
+def wide_frame():
+    rng = np.random.default_rng(0)
+    n = 200
+    columns = {}
+    for i in range(4):
+        columns[f"float_{i}"] = rng.normal(size=n)
+        columns[f"int_{i}"] = rng.integers(0, 100, n)
+        columns[f"str_{i}"] = rng.choice(["a", "b", "c", None], n)
+        columns[f"cat_{i}"] = pd.Categorical(rng.choice(["x", "y"], n))
+        columns[f"date_{i}"] = pd.date_range("2024-01-01", periods=n, freq="h")
+        columns[f"bool_{i}"] = rng.random(n) > 0.5
+        columns[f"mixed_{i}"] = pd.Series([1, "x"] * (n // 2), dtype=object)
+        columns[f"nullable_{i}"] = pd.array(rng.integers(0, 5, n), dtype="Int64")
+    return pd.DataFrame(columns, index=np.arange(n) * 2)
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_parallel_describe_is_identical_to_serial(wide_frame, executor):
+    expected = wide_frame.describe(include="all")
+    result = describe_frame(wide_frame, max_workers=3, executor=executor)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_duplicate_column_names(wide_frame):
+    frame = wide_frame.iloc[:, [0, 2, 0, 1]]
+    assert shareable_positions(frame) == []
+    pd.testing.assert_frame_equal(
+        describe_frame(frame, max_workers=2, executor="process"), frame.describe(include="all")
+    )
+
+
+def test_partitions_group_columns_by_dtype(wide_frame):
+    chunks = partition_columns(wide_frame, parts=8)
+    assert sorted(i for chunk in chunks for i in chunk) == list(range(wide_frame.shape[1]))
+    for chunk in chunks:
+        assert len({str(wide_frame.dtypes.iloc[i]) for i in chunk}) == 1
+
+
+def test_mixed_object_columns_stay_local(wide_frame):
+    shared = {wide_frame.columns[i] for i in shareable_positions(wide_frame)}
+    assert not any(name.startswith("mixed") for name in shared)
+    assert {"float_0", "str_0", "cat_0", "date_0", "nullable_0"} <= shared
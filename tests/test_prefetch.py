@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pytest
+
+from data_agent.agent import actions
+from data_agent.agent.actions import DATAFRAMES, Action, ListFilesParams, load_dataframe
+from data_agent.agent.environment import Environment
+from data_agent.agent.prefetch import Prefetcher, get_prefetcher, set_prefetcher
+
+SNAPSHOTS = ["sbti_20250701.parquet", "sbti_20250804.parquet", "sbti_20250831.parquet"]
+
+
+# --- Fixtures ---
+@pytest.fixture
+def data_dir(tmp_path):
+    df = pd.DataFrame({"sbti_id": [1, 2, 3], "sector": ["A", "B", "C"]})
+    for name in SNAPSHOTS:
+        df.to_parquet(tmp_path / name)
+    df.to_csv(tmp_path / "other.csv", index=False)
+    return tmp_path
+
+
+@pytest.fixture
+def prefetcher(data_dir):
+    prefetcher = Prefetcher(data_dir=str(data_dir))
+    set_prefetcher(prefetcher)
+    yield prefetcher
+    set_prefetcher(None)
+    prefetcher.shutdown()
+
+
+@pytest.fixture
+def count_reads(monkeypatch):
+    reads = []
+    original = actions.read_frame
+    monkeypatch.setattr(actions, "read_frame", lambda path: reads.append(path) or original(path))
+    return reads
+
+
+# --- Tests ---
+def test_rank_prefers_newest_snapshots():
+    prefetcher = Prefetcher(max_files=2)
+    assert prefetcher.rank(SNAPSHOTS + ["other.csv"]) == [
+        "sbti_20250831.parquet",
+        "sbti_20250804.parquet",
+    ]
+
+
+def test_prefetched_load_is_a_cache_hit(data_dir, prefetcher, count_reads):
+    scheduled = prefetcher.prefetch(os.listdir(data_dir))
+    assert len(scheduled) == 2
+
+    load_dataframe(path=str(data_dir / "sbti_20250831.parquet"), alias="curr")
+    assert count_reads == []
+    assert prefetcher.hits == 1
+    assert list(DATAFRAMES["curr"]["sbti_id"]) == [1, 2, 3]
+
+    # Files that were not prefetched are read as usual
+    load_dataframe(path=str(data_dir / "sbti_20250701.parquet"), alias="old")
+    assert len(count_reads) == 1
+
+
+def test_changed_file_is_not_served(data_dir, prefetcher, count_reads):
+    prefetcher.prefetch(SNAPSHOTS)
+    path = data_dir / "sbti_20250831.parquet"
+    pd.DataFrame({"sbti_id": [4, 5, 6, 7]}).to_parquet(path)
+    os.utime(path, ns=(0, 0))
+
+    load_dataframe(path=str(path), alias="curr")
+    assert len(count_reads) == 1
+    assert list(DATAFRAMES["curr"]["sbti_id"]) == [4, 5, 6, 7]
+
+
+def test_memory_budget(data_dir):
+    prefetcher = Prefetcher(data_dir=str(data_dir), memory_budget_bytes=1)
+    assert prefetcher.prefetch(SNAPSHOTS) == []
+    prefetcher.shutdown()
+
+
+def test_environment_prefetches_after_list_files(data_dir):
+    prefetcher = Prefetcher()
+    environment = Environment(prefetcher=prefetcher)
+    assert get_prefetcher() is prefetcher
+
+    list_files = Action("list_files", lambda: SNAPSHOTS, "List files.", ListFilesParams)
+    environment.prefetcher.data_dir = str(data_dir)
+    environment.after_action(list_files, SNAPSHOTS)
+    try:
+        assert prefetcher.get(str(data_dir / "sbti_20250831.parquet")) is not None
+    finally:
+        set_prefetcher(None)
+        prefetcher.shutdown()
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from data_agent.agent.actions import Action, ListFilesParams
+from data_agent.agent.environment import Environment
+from data_agent.agent.profiling import ActionProfiler, ProfileStore, main
+
+
+def make_action(name, function):
+    return Action(
+        name=name, function=function, description=name, pydantic_base_model=ListFilesParams
+    )
+
+
+def allocate():
+    blocks = [bytearray(1024) for _ in range(2048)]  # ~2 MiB
+    return len(blocks)
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / "profiles"))
+
+
+def test_selected_tools_are_profiled(store):
+    profiler = ActionProfiler(store, tools=["allocate"], session="s1")
+    environment = Environment(profiler=profiler)
+    environment.start_iteration(3)
+    assert environment.execute_action(make_action("allocate", allocate), {})["result"] == 2048
+    environment.execute_action(make_action("other", lambda: 1), {})
+
+    (record,) = store.records()
+    assert (record["session"], record["iteration"], record["tool"]) == ("s1", 3, "allocate")
+    assert record["peak_bytes"] > 2 * 2**20
+    assert any("allocate" in row["function"] for row in record["cpu"])
+    assert any("test_profiling.py" in row["line"] for row in record["allocations"])
+    assert record["path"].endswith("s1/0003-allocate.json")
+
+
+def test_only_slow_calls_are_kept(store):
+    profiler = ActionProfiler(store, slow_seconds=0.05, session="s1")
+    profiler.run(make_action("fast", lambda: None), {})
+    profiler.run(make_action("slow", lambda: time.sleep(0.06)), {}, iteration=1)
+    assert [r["tool"] for r in store.records()] == ["slow"]
+
+
+def test_failed_calls_are_recorded(store):
+    environment = Environment(profiler=ActionProfiler(store, tools=["fail"], session="s1"))
+    result = environment.execute_action(make_action("fail", fail), {})
+    assert not result["tool_executed"]
+    (record,) = store.records()
+    assert "boom" in record["error"]
+
+
+def test_cli_lists_the_worst_calls(store, capsys):
+    for session, seconds in (("s1", 0.02), ("s2", 0.001)):
+        profiler = ActionProfiler(store, slow_seconds=0, session=session)
+        profiler.run(make_action("sleep", lambda s=seconds: time.sleep(s)), {}, iteration=1)
+
+    main(["--dir", store.directory, "worst", "-n", "1"])
+    assert "s1#1  sleep" in capsys.readouterr().out
+    main(["--dir", store.directory, "tools"])
+    assert "2 calls  sleep" in capsys.readouterr().out
+    main(["--dir", store.directory, "show", "s2"])
+    assert "cum" in capsys.readouterr().out
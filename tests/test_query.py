@@ -0,0 +1,127 @@
+from typing import get_args
+
+import pandas as pd
+import pytest
+from pydantic import ValidationError
+
+from data_agent.agent import actions
+from data_agent.agent.actions import DATAFRAMES, QueryDataFrameParams, query_dataframe
+from data_agent.agent.merge_plan import MergePlan
+from data_agent.agent.query import AggregationFunction
+
+
+@pytest.fixture(autouse=True)
+def frames():
+    DATAFRAMES.clear()
+    DATAFRAMES["targets"] = pd.DataFrame(
+        {
+            "sbti_id": range(8),
+            "sector": ["Banks", "Energy", "Banks", "Retail", "Energy", "Banks", None, "Retail"],
+            "year": [2030, 2030, 2035, 2040, 2035, 2030, 2030, 2050],
+            "score": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, None],
+        }
+    )
+    yield
+    DATAFRAMES.clear()
+
+
+def query(**pipeline):
+    args = QueryDataFrameParams.model_validate({"alias": "targets", **pipeline})
+    return query_dataframe(**args.model_dump(exclude_unset=True))
+
+
+def test_grouped_aggregate_matches_pandas():
+    result = query(
+        filters=[{"column": "year", "op": "<=", "value": 2040}],
+        group_by=["sector"],
+        aggregations=[
+            {"column": "score", "function": "mean"},
+            {"column": "sbti_id", "function": "count", "name": "targets"},
+        ],
+        sort=[{"column": "score_mean", "ascending": False}],
+        limit=2,
+    )
+    df = DATAFRAMES["targets"]
+    expected = (
+        df[df["year"] <= 2040]
+        .groupby("sector", dropna=False)
+        .agg(score_mean=("score", "mean"), targets=("sbti_id", "count"))
+        .reset_index()
+        .sort_values("score_mean", ascending=False)
+    )
+    assert result["columns"] == ["sector", "score_mean", "targets"]
+    expected = expected.astype(object).where(expected.notna(), None)  # null groups as JSON null
+    assert result["data"] == [list(row) for row in expected.head(2).itertuples(False)]
+    assert result["total_rows"] == 4 and result["truncated"]
+
+
+def test_select_filter_sort_head():
+    result = query(
+        select=["sbti_id", "score"],
+        filters=[{"column": "sector", "op": "in", "value": ["Banks", "Retail"]}],
+        sort=[{"column": "score", "ascending": False}],
+        limit=3,
+    )
+    assert result["columns"] == ["sbti_id", "score"]
+    assert result["data"] == [[5, 6.0], [3, 4.0], [2, 3.0]]
+    assert result["total_rows"] == 5
+
+
+def test_aggregate_without_groups():
+    result = query(aggregations=[{"column": "score", "function": "max"}])
+    assert result == {
+        "columns": ["score_max"],
+        "data": [[7.0]],
+        "total_rows": 1,
+        "truncated": False,
+    }
+
+
+@pytest.mark.parametrize("function", get_args(AggregationFunction))
+def test_every_aggregation_function_with_and_without_groups(function):
+    DATAFRAMES["targets"] = DATAFRAMES["targets"].assign(
+        group="all", score=[None, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, None]
+    )
+    aggregations = [{"column": "score", "function": function}]
+    ungrouped = query(aggregations=aggregations)
+    grouped = query(group_by=["group"], aggregations=aggregations)
+    assert ungrouped["columns"] == [f"score_{function}"]
+    assert ungrouped["data"] == [grouped["data"][0][1:]]
+    assert ungrouped["data"][0][0] is not None
+
+
+@pytest.mark.parametrize(
+    "pipeline",
+    [
+        {"group_by": ["sector"]},
+        {"select": ["score"], "aggregations": [{"column": "score", "function": "sum"}]},
+        {"aggregations": [{"column": "score", "function": "eval"}]},
+        {"limit": 10_000},
+        {"filters": [{"column": "year", "op": "in", "value": 2030}]},
+    ],
+)
+def test_invalid_pipelines_are_rejected(pipeline):
+    with pytest.raises(ValidationError):
+        QueryDataFrameParams.model_validate({"alias": "targets", **pipeline})
+
+
+def test_unknown_columns():
+    with pytest.raises(ValueError, match="Unknown column"):
+        query(select=["missing"])
+    with pytest.raises(ValueError, match="not in the output"):
+        query(select=["score"], sort=[{"column": "year"}])
+
+
+def test_merge_plans_only_materialize_the_columns_read(monkeypatch):
+    other = pd.DataFrame({"sbti_id": range(8), "status": list("abababab")})
+    DATAFRAMES["merged"] = MergePlan(DATAFRAMES["targets"], other, on="sbti_id")
+    requested = []
+    original = actions._get_dataframe
+    monkeypatch.setattr(
+        actions, "_get_dataframe", lambda a, c=None: requested.append(c) or original(a, c)
+    )
+    result = query_dataframe(
+        "merged", group_by=["status"], aggregations=[{"column": "score", "function": "sum"}]
+    )
+    assert requested == [["status", "score"]]
+    assert result["data"] == [["a", 16.0], ["b", 12.0]]
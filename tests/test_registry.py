@@ -0,0 +1,132 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_agent.agent import actions
+from data_agent.agent.actions import (
+    DATAFRAMES,
+    Action,
+    LoadDataFrameParams,
+    load_dataframe,
+)
+from data_agent.agent.environment import Environment
+from data_agent.agent.registry import FRAME_STORE, FrameStore, use_registry
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    DATAFRAMES.clear()
+    FRAME_STORE.clear()
+    yield
+    DATAFRAMES.clear()
+    FRAME_STORE.clear()
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    path = tmp_path / "snapshot.parquet"
+    pd.DataFrame({"id": range(1000), "value": np.arange(1000.0)}).to_parquet(path)
+    return str(path)
+
+
+LOAD = Action(
+    name="load_dataframe",
+    function=load_dataframe,
+    description="Load.",
+    pydantic_base_model=LoadDataFrameParams,
+)
+
+
+def test_sessions_keep_their_own_aliases(snapshot):
+    first, second = Environment(registry={}), Environment(registry={})
+    first.execute_action(LOAD, {"path": snapshot, "alias": "df"})
+    assert "df" in first.registry
+    assert "df" not in second.registry and "df" not in DATAFRAMES
+
+    second.execute_action(LOAD, {"path": snapshot, "alias": "other"})
+    assert list(first.registry) == ["df"]
+    assert list(second.registry) == ["other"]
+
+
+def test_sessions_share_one_copy_of_a_file(snapshot):
+    registries = [{} for _ in range(10)]
+    loads = FRAME_STORE.loads
+
+    def session(registry):
+        with use_registry(registry):
+            load_dataframe(snapshot, "df")
+
+    threads = [threading.Thread(target=session, args=(r,)) for r in registries]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert FRAME_STORE.loads == loads + 1
+    frames = [r["df"] for r in registries]
+    assert all(np.shares_memory(frames[0]["value"], f["value"]) for f in frames[1:])
+
+
+def test_changes_in_a_session_are_copy_on_write(snapshot):
+    with use_registry({}) as first:
+        load_dataframe(snapshot, "df")
+    with use_registry({}) as second:
+        load_dataframe(snapshot, "df")
+
+    first["df"].loc[0, "value"] = -1.0
+    first["df"]["extra"] = 1
+    assert second["df"].loc[0, "value"] == 0.0
+    assert "extra" not in second["df"].columns
+    with use_registry({}) as third:
+        load_dataframe(snapshot, "df")
+    assert third["df"].loc[0, "value"] == 0.0
+
+
+def test_in_place_edits_stay_in_their_session(snapshot):
+    with use_registry({}) as first:
+        load_dataframe(snapshot, "df")
+    with use_registry({}) as second:
+        load_dataframe(snapshot, "df")
+    expected = second["df"].copy(deep=True)
+
+    edited = first["df"]
+    edited.iat[1, 1] = -1.0
+    edited.iloc[2:5, 1] = np.nan
+    edited.fillna(-2.0, inplace=True)
+    edited.sort_values("value", inplace=True)
+    edited.drop(columns="id", inplace=True)
+    assert edited["value"].iloc[0] == -2.0
+
+    pd.testing.assert_frame_equal(second["df"], expected)
+    with use_registry({}) as third:
+        load_dataframe(snapshot, "df")
+    pd.testing.assert_frame_equal(third["df"], expected)
+
+
+def test_store_reloads_changed_files_and_respects_its_budget(tmp_path):
+    store = FrameStore(max_bytes=20_000)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.csv"
+        pd.DataFrame({"a": range(1000)}).to_csv(path, index=False)  # ~8 kB in memory
+        paths.append(str(path))
+    for path in paths:
+        store.get(path, pd.read_csv)
+    assert store.loads == 3 and store.used_bytes <= 20_000
+    store.get(paths[2], pd.read_csv)
+    assert store.hits == 1
+
+    pd.DataFrame({"a": [1]}).to_csv(paths[2], index=False)
+    assert len(store.get(paths[2], pd.read_csv)) == 1
+    assert store.loads == 4
+
+
+def test_default_registry_outside_sessions():
+    DATAFRAMES["df"] = pd.DataFrame({"a": [1]})
+    with use_registry({}):
+        assert "df" not in DATAFRAMES
+    with use_registry(None):  # environments without their own registry
+        assert "df" in DATAFRAMES
+    assert actions._lookup("df") is DATAFRAMES["df"]
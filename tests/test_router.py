@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pytest
+
+from data_agent.agent.actions import Action, ActionRegistry, LoadDataFrameParams
+from data_agent.agent.agent import Agent, AgentFunctionCallingActionLanguage, Prompt
+from data_agent.agent.environment import Environment
+from data_agent.agent.goals import Goal
+from data_agent.agent.invocation import ToolInvocation
+from data_agent.agent.router import ModelRouter, RoutingPolicy
+
+FAST, STRONG = "test/fast", "test/strong"
+POLICY = RoutingPolicy(fast_model=FAST, strong_model=STRONG)
+
+
+def call(tool: str, args: str = "{}", call_id: str = "c1") -> ToolInvocation:
+    return ToolInvocation.from_tool_call(
+        SimpleNamespace(id=call_id, function=SimpleNamespace(name=tool, arguments=args))
+    )
+
+
+class ScriptedModels:
+    """Stand-in generator answering with a scripted response per model."""
+
+    def __init__(self, **responses):
+        self.responses = {FAST: responses.get("fast", []), STRONG: responses.get("strong", [])}
+        self.models = []
+
+    def __call__(self, prompt: Prompt):
+        model = prompt.metadata["model"]
+        self.models.append(model)
+        prompt.metadata["usage"] = SimpleNamespace(prompt_tokens=1000, completion_tokens=100)
+        return self.responses[model].pop(0)
+
+
+@pytest.fixture
+def registry():
+    registry = ActionRegistry()
+    registry.register(
+        Action(
+            name="load_dataframe",
+            function=lambda path, alias: f"loaded {alias}",
+            description="Load.",
+            pydantic_base_model=LoadDataFrameParams,
+        )
+    )
+    return registry
+
+
+def prompt_for(registry):
+    language = AgentFunctionCallingActionLanguage()
+    return Prompt(messages=[], tools=language.format_actions(registry.get_actions()))
+
+
+def test_routine_turn_stays_on_fast_model(registry):
+    models = ScriptedModels(fast=[call("load_dataframe", '{"path": "a.csv", "alias": "a"}')])
+    router = ModelRouter(models, POLICY, registry)
+    response = router(prompt_for(registry))
+    assert response.tool == "load_dataframe"
+    assert models.models == [FAST]
+    assert router.summary()["routes"] == {"fast": 1}
+
+
+@pytest.mark.parametrize(
+    "fast_response, reason",
+    [
+        ("not a tool call", "parse_error"),
+        (call("load_dataframe", '{"path": "a.csv"}'), "invalid_arguments"),
+        (call("drop_table"), "unknown_tool"),
+        (call("terminate", '{"message": "done"}'), "strong_tool"),
+    ],
+)
+def test_escalation_to_strong_model(registry, fast_response, reason):
+    strong_response = call("terminate", '{"message": "final"}', "c2")
+    models = ScriptedModels(fast=[fast_response], strong=[strong_response])
+    router = ModelRouter(models, POLICY, registry)
+    assert router(prompt_for(registry)) is strong_response
+    assert models.models == [FAST, STRONG]
+    assert router.escalations == {reason: 1}
+
+
+def test_escalations_in_a_row_make_routing_sticky(registry):
+    policy = RoutingPolicy(fast_model=FAST, strong_model=STRONG, sticky_after=2)
+    models = ScriptedModels(fast=["bad", "bad"], strong=[call("terminate")] * 3)
+    router = ModelRouter(models, policy, registry)
+    for _ in range(3):
+        router(prompt_for(registry))
+    assert models.models == [FAST, STRONG, FAST, STRONG, STRONG]
+
+
+def test_summary_accounts_cost_per_model(registry, monkeypatch):
+    from data_agent.agent import router as router_module
+
+    monkeypatch.setattr(
+        router_module, "usage_cost", lambda model, p, c: 1.0 if model == STRONG else 0.1
+    )
+    models = ScriptedModels(fast=[call("terminate")], strong=[call("terminate")])
+    router = ModelRouter(models, POLICY, registry)
+    router(prompt_for(registry))
+    summary = router.summary()
+    assert summary["models"][FAST]["calls"] == 1
+    assert summary["models"][STRONG]["prompt_tokens"] == 1000
+    assert summary["total_cost"] == pytest.approx(1.1)
+
+
+def test_fast_calls_that_will_be_escalated_are_not_dispatched_early(registry):
+    dispatched = []
+
+    def generate(prompt):
+        invocation = call("terminate")
+        prompt.metadata["on_tool_call"](invocation)
+        return invocation
+
+    router = ModelRouter(generate, POLICY, registry)
+    prompt = prompt_for(registry)
+    prompt.metadata["on_tool_call"] = dispatched.append
+    router(prompt)
+    assert len(dispatched) == 1  # only the strong model's call
+
+
+def test_agent_run_with_router(registry):
+    models = ScriptedModels(
+        fast=[call("load_dataframe", '{"path": "a.csv", "alias": "a"}'), call("terminate")],
+        strong=[call("terminate", '{"message": "report"}', "c3")],
+    )
+    router = ModelRouter(models, POLICY, registry)
+    goals = [Goal(priority=1, name="Test", description="Test routing.")]
+    agent = Agent(goals, AgentFunctionCallingActionLanguage(), registry, router, Environment())
+    memory = agent.run("Load a.csv", max_iterations=5)
+    assert models.models == [FAST, FAST, STRONG]
+    assert "report" in memory.get_memories()[-1]["content"]
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+from langchain_core.utils.function_calling import convert_to_openai_function
+from pydantic import BaseModel, Field
+
+from data_agent.agent import schema_cache
+from data_agent.agent.actions import Action, LoadDataFrameParams
+from data_agent.agent.schema_cache import get_tool_parameters, model_fingerprint
+
+
+class SampleParams(BaseModel):
+    """Sample parameters."""
+
+    alias: str = Field(..., description="Alias of the dataframe.")
+
+
+# --- Fixtures ---
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATA_AGENT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(schema_cache, "_SCHEMAS", {})
+    return tmp_path / "tool_schemas"
+
+
+# --- Tests ---
+def test_parameters_match_langchain_conversion(cache_dir):
+    expected = convert_to_openai_function(LoadDataFrameParams)["parameters"]
+    assert get_tool_parameters(LoadDataFrameParams) == expected
+
+
+def test_schema_is_read_from_disk(cache_dir, monkeypatch):
+    parameters = get_tool_parameters(SampleParams)
+    assert os.listdir(cache_dir) == [f"{model_fingerprint(SampleParams)}.json"]
+
+    # A new process (empty in-memory cache) must not regenerate the schema
+    monkeypatch.setattr(schema_cache, "_SCHEMAS", {})
+    monkeypatch.setattr(schema_cache, "_generate_parameters", None)
+    assert get_tool_parameters(SampleParams) == parameters
+
+
+def test_fingerprint_changes_with_model_source():
+    class OtherParams(BaseModel):
+        """Sample parameters."""
+
+        alias: int = Field(..., description="Alias of the dataframe.")
+
+    assert model_fingerprint(SampleParams) != model_fingerprint(OtherParams)
+
+
+def test_action_schema_is_lazy(cache_dir, monkeypatch):
+    monkeypatch.setattr(schema_cache, "_generate_parameters", None)
+    action = Action("sample", lambda alias: alias, "Sample action.", SampleParams)
+    assert action.name == "sample"  # no schema generated yet, or the patched None would fail
@@ -0,0 +1,125 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from data_agent.agent.actions import Action, ActionRegistry, ListFilesParams
+from data_agent.agent.agent import Agent, AgentFunctionCallingActionLanguage, Prompt
+from data_agent.agent.environment import Environment
+from data_agent.agent.goals import Goal
+from data_agent.agent.streaming import (
+    PartialStringFieldReader,
+    StreamingResponseGenerator,
+    ToolCallAssembler,
+)
+
+GOALS = [Goal(priority=1, name="Test", description="Test streaming.")]
+
+
+def text_chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+def tool_chunk(index, arguments, name=None, call_id=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    tool_call = SimpleNamespace(index=index, id=call_id, function=function)
+    delta = SimpleNamespace(content=None, tool_calls=[tool_call])
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+def split(text, size=4):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def streamed_tool_call(index, name, call_id, args):
+    arguments = split(json.dumps(args))
+    chunks = [tool_chunk(index, arguments[0], name=name, call_id=call_id)]
+    return chunks + [tool_chunk(index, piece) for piece in arguments[1:]]
+
+
+class StreamingStandIn:
+    """Local stand-in for a streaming completion(), replaying one scripted stream per call."""
+
+    def __init__(self, streams):
+        self.streams = list(streams)
+        self.calls = []
+
+    def __call__(self, messages, **kwargs):
+        self.calls.append(kwargs)
+        return iter(self.streams.pop(0)())
+
+
+# --- Tests ---
+def test_partial_string_reader():
+    reader = PartialStringFieldReader("message")
+    raw = json.dumps({"message": 'Line 1\nSays "hi" é \U0001F600 done'})
+    text = "".join(reader.read(raw[:end]) for end in range(len(raw) + 1))
+    assert text == 'Line 1\nSays "hi" é \U0001F600 done'
+
+
+def test_assembler_completes_calls_before_stream_end():
+    assembler = ToolCallAssembler()
+    chunks = streamed_tool_call(0, "load_dataframe", "c1", {"path": "a.csv", "alias": "a"})
+    completed = []
+    for chunk in chunks:
+        completed += assembler.feed(chunk.choices[0].delta.tool_calls)
+    assert [(inv.tool, inv.args) for inv in completed] == [
+        ("load_dataframe", {"path": "a.csv", "alias": "a"})
+    ]
+    assert assembler.finish() == completed
+
+
+def test_text_and_terminate_message_are_streamed():
+    def stream():
+        yield text_chunk("Let me wrap up. ")
+        yield from streamed_tool_call(0, "terminate", "c1", {"message": "All good."})
+
+    received = []
+    generator = StreamingResponseGenerator(StreamingStandIn([stream]), on_text=received.append)
+    invocation = generator(Prompt(messages=[], tools=[{"type": "function"}]))
+
+    assert invocation.tool == "terminate"
+    assert invocation.raw_message["content"] == "Let me wrap up. "
+    assert "".join(received) == "Let me wrap up. All good."
+    assert len(received) > 2  # the message arrived in pieces
+
+
+def test_agent_executes_tool_while_streaming():
+    executed = threading.Event()
+
+    def list_files():
+        executed.set()
+        return ["a.csv"]
+
+    def first_turn():
+        yield from streamed_tool_call(0, "list_files", "c1", {})
+        # The stream only continues once the action ran, so it must have been dispatched early
+        assert executed.wait(timeout=5)
+        yield text_chunk("")
+
+    def second_turn():
+        yield from streamed_tool_call(0, "terminate", "c2", {"message": "Done."})
+
+    registry = ActionRegistry()
+    registry.register(Action("list_files", list_files, "List files.", ListFilesParams))
+    received = []
+    generator = StreamingResponseGenerator(
+        StreamingStandIn([first_turn, second_turn]), on_text=received.append
+    )
+    agent = Agent(GOALS, AgentFunctionCallingActionLanguage(), registry, generator, Environment())
+    memory = agent.run("List files", max_iterations=3)
+
+    result = json.loads(memory.get_memories()[2]["content"])
+    assert result["result"] == ["a.csv"]
+    assert result["tool_call_id"] == "c1"
+    assert "".join(received) == "Done."
+
+
+@pytest.mark.parametrize("broken", ['{"message": "unterminated'])
+def test_incomplete_arguments_escalate(broken):
+    def stream():
+        yield tool_chunk(0, broken, name="terminate", call_id="c1")
+
+    generator = StreamingResponseGenerator(StreamingStandIn([stream]), on_text=lambda t: None)
+    assert generator(Prompt(tools=[{"type": "function"}])).is_escalation
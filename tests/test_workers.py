@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from data_agent.agent.actions import (
+    DATAFRAMES,
+    Action,
+    LoadDataFrameParams,
+    call_column_method,
+    load_dataframe,
+    merge_dataframes,
+)
+from data_agent.agent.merge_plan import MergePlan
+from data_agent.agent.workers import (
+    ActionCancelledError,
+    ActionTimeoutError,
+    WorkerEnvironment,
+    WorkerPool,
+)
+
+
+def sleep_for(seconds: float) -> str:
+    time.sleep(seconds)
+    return "woke up"
+
+
+# --- Fixtures ---
+@pytest.fixture
+def sample_csv(tmp_path):
+    data = pd.DataFrame({"id": [1, 2, 3], "value": [10, 20, 30], "category": ["A", "B", "A"]})
+    file_path = tmp_path / "sample.csv"
+    data.to_csv(file_path, index=False)
+    return str(file_path), data
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(timeout=30)
+    yield pool
+    pool.close()
+
+
+# --- Tests ---
+def test_worker_results_are_mapped_back(pool, sample_csv):
+    path, expected = sample_csv
+    msg = pool.run(load_dataframe, {"path": path, "alias": "worker_df"}, name="load_dataframe")
+    assert "worker_df" in msg
+    pd.testing.assert_frame_equal(DATAFRAMES["worker_df"], expected)
+
+    # The worker sees the frames of the agent process, including those it did not load itself
+    DATAFRAMES["local_df"] = expected.assign(value=[1, 2, 3])
+    assert pool.run(
+        call_column_method, {"alias": "local_df", "column": "value", "method": "sum"}
+    ) == (1 + 2 + 3)
+
+    pool.run(
+        merge_dataframes,
+        {"left": "worker_df", "right": "local_df", "on": "id", "alias": "merged"},
+    )
+    assert isinstance(DATAFRAMES["merged"], MergePlan)
+    assert list(DATAFRAMES["merged"].materialize(["value_y"])["value_y"]) == [1, 2, 3]
+
+
+def test_worker_errors_are_raised(pool):
+    with pytest.raises(RuntimeError, match="No dataframe registered"):
+        pool.run(call_column_method, {"alias": "missing", "column": "x", "method": "sum"})
+
+
+def test_timeout_kills_and_replaces_worker(pool):
+    pool.timeouts = {"sleep_for": 0.5}
+    with pytest.raises(ActionTimeoutError):
+        pool.run(sleep_for, {"seconds": 30}, name="sleep_for")
+    assert pool.recycled == 1
+    assert pool.run(sleep_for, {"seconds": 0}, name="sleep_for") == "woke up"
+
+
+def test_cancel_running_action(pool):
+    errors = []
+
+    def run():
+        try:
+            pool.run(sleep_for, {"seconds": 30})
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    deadline = time.monotonic() + 30
+    while not pool._busy and time.monotonic() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.5)
+    pool.cancel()
+    thread.join(timeout=10)
+    assert isinstance(errors[0], ActionCancelledError)
+
+
+def test_worker_recycled_above_memory_limit(sample_csv):
+    path, _ = sample_csv
+    pool = WorkerPool(max_worker_bytes=1)
+    try:
+        pool.run(load_dataframe, {"path": path, "alias": "tiny"})
+        assert pool.recycled == 1
+    finally:
+        pool.close()
+
+
+def test_worker_environment_formats_results(pool, sample_csv):
+    path, _ = sample_csv
+    environment = WorkerEnvironment(pool=pool)
+    action = Action("load_dataframe", load_dataframe, "Load.", LoadDataFrameParams)
+    result = environment.execute_action(action, {"path": path, "alias": "env_df"})
+    assert result["tool_executed"]
+
+    slow = Action("sleep_for", sleep_for, "Sleep.", LoadDataFrameParams)
+    pool.timeouts = {"sleep_for": 0.5}
+    result = environment.execute_action(slow, {"seconds": 30})
+    assert not result["tool_executed"]
+    assert "timed out" in result["error"]